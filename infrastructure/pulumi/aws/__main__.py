@@ -229,6 +229,11 @@ posts_table = aws.dynamodb.Table(
             "projection_type": "ALL",
         },
     ],
+    # Rate limiter items (PK=RATELIMIT#...) expire once their budget is full again
+    ttl={
+        "attribute_name": "expiresAt",
+        "enabled": True,
+    },
     tags=common_tags,
 )
 
@@ -182,6 +182,13 @@ cosmos_container = azure.documentdb.SqlResourceSqlContainer(
             indexing_mode="Consistent",
             included_paths=[azure.documentdb.IncludedPathArgs(path="/*")],
             excluded_paths=[azure.documentdb.ExcludedPathArgs(path='/"_etag"/?')],
+            # API の list_posts (ORDER BY c.createdAt DESC, c.id DESC) 用
+            composite_indexes=[
+                [
+                    azure.documentdb.CompositePathArgs(path="/createdAt", order="descending"),
+                    azure.documentdb.CompositePathArgs(path="/id", order="descending"),
+                ]
+            ],
         ),
     ),
     opts=pulumi.ResourceOptions(depends_on=[cosmos_database]),
@@ -150,6 +150,24 @@ app_secret = gcp.secretmanager.Secret(
 # Secret versions are managed manually via gcloud:
 #   gcloud secrets versions add {project_name}-{stack}-app-config --data-file=secret.json
 
+# ========================================
+# Firestore Composite Index (tag timeline)
+# ========================================
+# GcpBackend.list_posts with ?tag= runs array_contains(tags) ordered by
+# createdAt DESC, __name__ DESC (keyset cursor) and needs this composite index.
+posts_tag_timeline_index = gcp.firestore.Index(
+    "posts-tag-timeline-index",
+    project=project,
+    database="(default)",
+    collection="posts",
+    fields=[
+        gcp.firestore.IndexFieldArgs(field_path="tags", array_config="CONTAINS"),
+        gcp.firestore.IndexFieldArgs(field_path="createdAt", order="DESCENDING"),
+        gcp.firestore.IndexFieldArgs(field_path="__name__", order="DESCENDING"),
+    ],
+    opts=pulumi.ResourceOptions(depends_on=enabled_services),
+)
+
 # ========================================
 # Cloud Storage Bucket for Function Source
 # ========================================
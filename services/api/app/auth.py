@@ -1,5 +1,6 @@
 import logging
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
@@ -24,9 +25,9 @@ class UserInfo:
 
 
 def get_jwt_verifier():
-    """JWT verifierインスタンスを取得（設定に基づいて）"""
+    """JWT verifierインスタンスを取得（設定ごとのプロセス共通シングルトン）"""
     from app.config import settings
-    from app.jwt_verifier import JWTVerifier
+    from app.jwt_verifier import get_verifier
 
     if not settings.auth_provider:
         return None
@@ -57,7 +58,22 @@ def get_jwt_verifier():
         logger.warning(f"Unknown auth provider: {settings.auth_provider}")
         return None
 
-    return JWTVerifier(settings.auth_provider, config)
+    return get_verifier(settings.auth_provider, config)
+
+
+@lru_cache(maxsize=1)
+def get_token_cache():
+    """検証済みトークンキャッシュを取得 (JWKS ローテーション時に全破棄)"""
+    from app.config import settings
+    from app.jwt_verifier import add_jwks_rotation_listener
+    from app.token_cache import VerifiedTokenCache
+
+    cache = VerifiedTokenCache(
+        settings.auth_token_cache_max_entries,
+        settings.auth_token_cache_ttl_seconds,
+    )
+    add_jwks_rotation_listener(cache.clear)
+    return cache
 
 
 async def get_current_user(
@@ -76,6 +92,12 @@ async def get_current_user(
     if not credentials:
         return None
 
+    # 検証済みトークンはキャッシュから返す (署名検証をスキップ)
+    token_cache = get_token_cache()
+    cached_user = token_cache.get(credentials.credentials)
+    if cached_user is not None:
+        return cached_user
+
     # JWT検証
     verifier = get_jwt_verifier()
     if not verifier:
@@ -91,11 +113,13 @@ async def get_current_user(
 
         # ユーザー情報を抽出
         user_info_dict = verifier.extract_user_info(claims)
-        return UserInfo(
+        user = UserInfo(
             user_id=user_info_dict["user_id"],
             email=user_info_dict.get("email"),
             groups=user_info_dict.get("groups", []),
         )
+        token_cache.put(credentials.credentials, user, claims.get("exp"))
+        return user
     except Exception as e:
         logger.error(f"Error verifying token: {e}")
         return None
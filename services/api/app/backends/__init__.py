@@ -1,9 +1,15 @@
+import importlib.util
+import logging
 from functools import lru_cache
 
+from app.backends.async_base import AsyncBackendBase as AsyncBackendBase
+from app.backends.async_base import ThreadedAsyncBackend
 from app.backends.base import BackendBase as BackendBase
 from app.config import settings
 from app.models import CloudProvider
 
+logger = logging.getLogger(__name__)
+
 
 @lru_cache(maxsize=1)
 def get_backend():
@@ -37,3 +43,29 @@ def get_backend():
 
     else:
         raise ValueError(f"Unsupported cloud provider: {provider}")
+
+
+@lru_cache(maxsize=1)
+def get_async_backend() -> AsyncBackendBase:
+    """
+    async def ルート用のバックエンドを取得
+
+    Returns:
+        AWS / ローカルは aioboto3 のネイティブ実装 (NATIVE_ASYNC_BACKEND=false
+        または aioboto3 未インストール時を除く)。それ以外は get_backend() の実装を
+        専用スレッドリミッタで包んだ AsyncBackendBase (Azure / GCP のネイティブ実装は未対応)
+    """
+    backend = get_backend()
+    provider = settings.cloud_provider
+    if settings.native_async_backend and provider in (CloudProvider.LOCAL, CloudProvider.AWS):
+        if importlib.util.find_spec("aioboto3") is None:
+            logger.warning("aioboto3 not available, running the backend on threads")
+        elif provider == CloudProvider.LOCAL:
+            from app.backends.dynamodb_async import AioLocalBackend
+
+            return AioLocalBackend(backend, settings.backend_max_concurrency)
+        else:
+            from app.backends.dynamodb_async import AioAwsBackend
+
+            return AioAwsBackend(backend, settings.backend_max_concurrency)
+    return ThreadedAsyncBackend(backend, settings.backend_max_concurrency)
@@ -0,0 +1,168 @@
+"""Async backend interface used by the ``async def`` routes
+
+AsyncBackendBase mirrors BackendBase with coroutine methods. AWS and local use
+the native aioboto3 implementations in app/backends/dynamodb_async.py.
+ThreadedAsyncBackend implements it for every other provider (and as the
+fallback without aioboto3) by running the existing BackendBase implementation
+on a dedicated worker-thread limiter:
+
+- the event loop never blocks on SDK I/O, and request handling (auth,
+  validation, serialization) no longer holds a threadpool slot;
+- backend calls get their own CapacityLimiter (BACKEND_MAX_CONCURRENCY)
+  instead of sharing Starlette's default 40-thread pool with every other
+  sync dependency, so a single worker can keep that many backend calls in
+  flight.
+"""
+
+from abc import ABC, abstractmethod
+
+import anyio
+import anyio.to_thread
+
+from app.auth import UserInfo
+from app.backends.base import BackendBase
+from app.models import (
+    CreatePostBody,
+    Post,
+    ProfileResponse,
+    ProfileUpdateRequest,
+    UpdatePostBody,
+)
+
+
+class AsyncBackendBase(ABC):
+    """
+    非同期バックエンドの抽象基底クラス
+
+    各メソッドの意味・引数・戻り値は BackendBase の同名メソッドと同じ
+    """
+
+    @abstractmethod
+    async def list_posts(
+        self,
+        limit: int,
+        next_token: str | None,
+        tag: str | None,
+    ) -> tuple[list[Post], str | None]:
+        """投稿一覧を取得"""
+
+    @abstractmethod
+    async def create_post(self, body: CreatePostBody, user: UserInfo) -> dict:
+        """投稿を作成"""
+
+    @abstractmethod
+    async def delete_post(self, post_id: str, user: UserInfo) -> dict:
+        """投稿を削除"""
+
+    @abstractmethod
+    async def create_posts(self, bodies: list[CreatePostBody], user: UserInfo) -> list[dict]:
+        """投稿を一括作成 (要素ごとの結果)"""
+
+    @abstractmethod
+    async def delete_posts(self, post_ids: list[str], user: UserInfo) -> list[dict]:
+        """投稿を一括削除 (要素ごとの結果)"""
+
+    @abstractmethod
+    async def update_post(self, post_id: str, body: UpdatePostBody, user: UserInfo) -> dict:
+        """投稿を更新"""
+
+    @abstractmethod
+    async def get_post(self, post_id: str) -> Post | None:
+        """
+        投稿を1件取得
+
+        存在しない場合はどのバックエンドも None を返す (404 は送出しない)。
+        404 への変換は呼び出し側のルートで行う。
+        """
+
+    @abstractmethod
+    async def get_profile(self, user_id: str) -> ProfileResponse:
+        """プロフィールを取得"""
+
+    @abstractmethod
+    async def update_profile(
+        self,
+        user: UserInfo,
+        body: ProfileUpdateRequest,
+    ) -> ProfileResponse:
+        """プロフィールを更新"""
+
+    @abstractmethod
+    async def refresh_author_snapshot(self, user_id: str, nickname: str | None) -> int:
+        """投稿に非正規化した著者情報 (nickname) を書き換える"""
+
+    @abstractmethod
+    async def generate_upload_urls(
+        self,
+        count: int,
+        user: UserInfo,
+        content_types: list[str] | None = None,
+    ) -> list[dict[str, str]]:
+        """画像アップロード用の署名付きURLを生成"""
+
+    @abstractmethod
+    async def aclose(self) -> None:
+        """保持している接続を閉じる (アプリ終了時)"""
+
+
+class ThreadedAsyncBackend(AsyncBackendBase):
+    """同期 BackendBase 実装を専用のスレッドリミッタ上で実行する AsyncBackendBase"""
+
+    def __init__(self, backend: BackendBase, max_concurrency: int):
+        """
+        Args:
+            backend: 委譲先の同期バックエンド
+            max_concurrency: 同時に実行するバックエンド呼び出しの上限
+        """
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self._limiter: anyio.CapacityLimiter | None = None
+
+    @property
+    def limiter(self) -> anyio.CapacityLimiter:
+        # CapacityLimiter はイベントループ上で生成する
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.max_concurrency)
+        return self._limiter
+
+    async def _run(self, func, *args):
+        return await anyio.to_thread.run_sync(func, *args, limiter=self.limiter)
+
+    async def list_posts(self, limit, next_token, tag):
+        return await self._run(self.backend.list_posts, limit, next_token, tag)
+
+    async def create_post(self, body, user):
+        return await self._run(self.backend.create_post, body, user)
+
+    async def delete_post(self, post_id, user):
+        return await self._run(self.backend.delete_post, post_id, user)
+
+    async def create_posts(self, bodies, user):
+        return await self._run(self.backend.create_posts, bodies, user)
+
+    async def delete_posts(self, post_ids, user):
+        return await self._run(self.backend.delete_posts, post_ids, user)
+
+    async def update_post(self, post_id, body, user):
+        return await self._run(self.backend.update_post, post_id, body, user)
+
+    async def get_post(self, post_id):
+        return await self._run(self.backend.get_post, post_id)
+
+    async def get_profile(self, user_id):
+        return await self._run(self.backend.get_profile, user_id)
+
+    async def update_profile(self, user, body):
+        return await self._run(self.backend.update_profile, user, body)
+
+    async def refresh_author_snapshot(self, user_id, nickname):
+        return await self._run(self.backend.refresh_author_snapshot, user_id, nickname)
+
+    async def generate_upload_urls(self, count, user, content_types=None):
+        return await self._run(
+            self.backend.generate_upload_urls, count, user, content_types
+        )
+
+    async def aclose(self):
+        # 同期バックエンドの SDK クライアントはプロセスの終了まで使い回す
+        pass
@@ -1,18 +1,54 @@
-"""AWS Backend Implementation with DynamoDB Single Table Design"""
+"""AWS Backend Implementation with DynamoDB Single Table Design
+
+Posts carry an author snapshot (nickname) copied at write time. When a profile
+changes, refresh_author_snapshot rewrites it via the UserPostsIndex GSI
+(hash key: userId, range key: createdAt), so the read path never joins profiles.
+
+Tag timelines read TAG#<tag> index items maintained on create/update/delete
+(see app/backends/dynamodb_utils.py) instead of filtering the POSTS partition.
+"""
 
 import logging
 import os
 import uuid
-from datetime import datetime, timezone
+from datetime import UTC, datetime
 
 import boto3
+from botocore.exceptions import ClientError
 
 from app.auth import UserInfo
 from app.backends.base import BackendBase
-from app.models import CreatePostBody, Post, ProfileResponse, ProfileUpdateRequest
+from app.backends.dynamodb_utils import (
+    batch_delete_posts,
+    batch_write_failure,
+    batch_write_items,
+    condition_failure,
+    conditional_post_write,
+    decode_post_handle,
+    encode_post_handle,
+    post_update_fields,
+    posts_partition_for,
+    query_posts_page,
+    query_tag_page,
+    sync_tag_index,
+    tag_index_items,
+    tag_index_keys,
+)
+from app.backends.signed_url_cache import SignedUrlCache
+from app.config import settings
+from app.models import (
+    CreatePostBody,
+    Post,
+    ProfileResponse,
+    ProfileUpdateRequest,
+    UpdatePostBody,
+)
 
 logger = logging.getLogger(__name__)
 
+# 画像読み取り用 presigned GET URL の有効期間 (秒)
+_READ_URL_EXPIRY = 3600
+
 
 class AwsBackend(BackendBase):
     """AWS実装 (DynamoDB Single Table Design + S3 + Cognito)"""
@@ -29,16 +65,36 @@ class AwsBackend(BackendBase):
             raise ValueError("POSTS_TABLE_NAME environment variable is required")
 
         self.table = self.dynamodb.Table(self.table_name)
+        self._read_url_cache = SignedUrlCache(
+            url_expiry_seconds=_READ_URL_EXPIRY,
+            refresh_margin_seconds=settings.signed_url_refresh_margin_seconds,
+            max_entries=settings.signed_url_cache_max_entries,
+        )
         logger.info(
             f"Initialized AwsBackend with table={self.table_name}, bucket={self.bucket_name}"
         )
 
+    def warm_up(self) -> None:
+        """DynamoDB の TLS 接続と S3 の署名用モデル読み込みを前倒しする"""
+        # 存在しないキーの GetItem は 1 RCU 未満で、接続プールに接続を 1 本残す
+        self.table.get_item(Key={"PK": "WARMUP", "SK": "WARMUP"})
+        if self.bucket_name:
+            # presign はローカル処理のみだが、初回はサービスモデルの読み込みが走る
+            self._sign_get_url("warmup")
+
     def _key_to_presigned_url(self, key: str) -> str:
-        """S3キーを署名付きGET URLに変換 (1時間有効)"""
+        """S3キーを署名付きGET URLに変換 (1時間有効, プロセス内キャッシュ経由)
+
+        同じキーには失効間際まで同一 URL を返すため、ブラウザ/CloudFront でも
+        画像をキャッシュできる。
+        """
+        return self._read_url_cache.get_or_sign(key, self._sign_get_url)
+
+    def _sign_get_url(self, key: str) -> str:
         return self.s3_client.generate_presigned_url(
             "get_object",
             Params={"Bucket": self.bucket_name, "Key": key},
-            ExpiresIn=3600,
+            ExpiresIn=_READ_URL_EXPIRY,
         )
 
     def _resolve_image_urls(self, keys: list) -> list[str]:
@@ -68,53 +124,86 @@ class AwsBackend(BackendBase):
                         )
         return result
 
+    def _item_to_post(self, item: dict) -> Post:
+        """DynamoDBアイテムをPostモデルに変換"""
+        raw_urls = item.get("imageKeys") or item.get("imageUrls") or []
+        return Post(
+            postId=item["postId"],
+            userId=item["userId"],
+            nickname=item.get("nickname"),
+            content=item["content"],
+            isMarkdown=bool(item.get("isMarkdown", False)),
+            tags=item.get("tags", []),
+            createdAt=item["createdAt"],
+            updatedAt=item.get("updatedAt"),
+            imageUrls=self._resolve_image_urls(raw_urls),
+            postHandle=encode_post_handle(item),
+        )
+
+    def _get_post_item(self, post_id: str) -> dict:
+        """PostIdIndex で postId から投稿アイテムを取得 (存在しない場合は ValueError)
+
+        ハンドルの場合はベーステーブルを GetItem する (GSI の反映遅延を受けない)。
+        """
+        decoded = decode_post_handle(post_id)
+        if decoded is not None:
+            key, post_id = decoded
+            item = self.table.get_item(Key=key).get("Item")
+            if not item or item.get("postId") != post_id:
+                raise ValueError(f"Post not found: {post_id}")
+            return item
+        response = self.table.query(
+            IndexName="PostIdIndex",
+            KeyConditionExpression="postId = :postId",
+            ExpressionAttributeValues={":postId": post_id},
+        )
+        if not response.get("Items"):
+            raise ValueError(f"Post not found: {post_id}")
+        return response["Items"][0]
+
+    def _resolve_post_key(self, post_id: str, user: UserInfo, action: str) -> tuple[dict, str]:
+        """更新・削除対象のベーステーブルキーと postId を解決
+
+        ハンドルならキーをそのまま使い、所有者チェックは条件式に任せる (読み取りなし)。
+        通常の postId は PostIdIndex で引き、ここで所有者をチェックする。
+        """
+        decoded = decode_post_handle(post_id)
+        if decoded is not None:
+            return decoded
+        item = self._get_post_item(post_id)
+        if item["userId"] != user.user_id and not user.is_admin:
+            raise PermissionError(f"You do not have permission to {action} this post")
+        return {"PK": item["PK"], "SK": item["SK"]}, item["postId"]
+
+    @staticmethod
+    def _raise_condition_failure(error: Exception, post_id: str, action: str) -> None:
+        reason = condition_failure(error)
+        if reason == "not_found":
+            raise ValueError(f"Post not found: {post_id}") from error
+        if reason == "forbidden":
+            raise PermissionError(
+                f"You do not have permission to {action} this post"
+            ) from error
+
     def list_posts(
         self,
         limit: int,
         next_token: str | None,
         tag: str | None,
     ) -> tuple[list[Post], str | None]:
-        """投稿一覧を取得 (DynamoDB Query)"""
+        """投稿一覧を取得 (DynamoDB Query。タグ指定時は TAG#<tag> インデックス)"""
         try:
-            query_kwargs = {
-                "KeyConditionExpression": "PK = :pk",
-                "ExpressionAttributeValues": {":pk": "POSTS"},
-                "ScanIndexForward": False,  # 降順 (新しい順)
-                "Limit": limit,
-            }
-
-            if next_token:
-                query_kwargs["ExclusiveStartKey"] = {"PK": "POSTS", "SK": next_token}
-
-            # タグフィルター
             if tag:
-                query_kwargs["FilterExpression"] = "contains(tags, :tag)"
-                query_kwargs["ExpressionAttributeValues"][":tag"] = tag
-
-            response = self.table.query(**query_kwargs)
-
-            posts = []
-            for item in response.get("Items", []):
-                raw_urls = item.get("imageKeys") or item.get("imageUrls") or []
-                posts.append(
-                    Post(
-                        postId=item["postId"],
-                        userId=item["userId"],
-                        nickname=item.get("nickname"),
-                        content=item["content"],
-                        tags=item.get("tags", []),
-                        createdAt=item["createdAt"],
-                        updatedAt=item.get("updatedAt"),
-                        imageUrls=self._resolve_image_urls(raw_urls),
-                    )
+                items, next_token = query_tag_page(
+                    self.table, self.dynamodb, tag, limit, next_token
                 )
+                return [self._item_to_post(item) for item in items], next_token
 
-            # ページネーショントークン
-            next_token = None
-            if "LastEvaluatedKey" in response:
-                next_token = response["LastEvaluatedKey"]["SK"]
-
-            return posts, next_token
+            # 各シャードを降順 (新しい順) に Query してマージ
+            items, next_token = query_posts_page(
+                self.table, settings.posts_shard_count, limit, next_token
+            )
+            return [self._item_to_post(item) for item in items], next_token
 
         except Exception as e:
             logger.error("Error listing posts: %r", e)
@@ -123,111 +212,167 @@ class AwsBackend(BackendBase):
     def create_post(self, body: CreatePostBody, user: UserInfo) -> dict:
         """投稿を作成 (DynamoDB PutItem)"""
         try:
-            post_id = str(uuid.uuid4())
-            now = datetime.now(timezone.utc).isoformat()
+            item = self._new_post_item(body, user, self._get_author_nickname(user.user_id))
 
-            # プロフィールからnicknameを取得
-            nickname = None
-            try:
-                profile_item = self.table.get_item(
-                    Key={"PK": "PROFILES", "SK": user.user_id}
-                ).get("Item")
-                if profile_item:
-                    nickname = profile_item.get("nickname")
-            except Exception as e:
-                logger.warning(f"Failed to fetch nickname for {user.user_id}: {e}")
-
-            image_keys = body.image_keys if body.image_keys else []
-
-            item = {
-                "PK": "POSTS",
-                "SK": now + "#" + post_id,  # タイムスタンプ + UUID
-                "postId": post_id,
-                "userId": user.user_id,
-                "nickname": nickname,
-                "content": body.content,
-                "tags": body.tags if body.tags else [],
-                "createdAt": now,
-                "updatedAt": now,
-                "imageKeys": image_keys,  # 生のS3キーを保存
-            }
+            with self.table.batch_writer() as batch:
+                batch.put_item(Item=item)
+                for tag_item in tag_index_items(item):
+                    batch.put_item(Item=tag_item)
 
-            self.table.put_item(Item=item)
-
-            presigned_urls = self._resolve_image_urls(image_keys)
-
-            return {
-                "postId": post_id,
-                "userId": user.user_id,
-                "nickname": nickname,
-                "content": body.content,
-                "tags": item["tags"],
-                "createdAt": now,
-                "imageUrls": presigned_urls,
-                # snake_case aliases
-                "post_id": post_id,
-                "user_id": user.user_id,
-                "created_at": now,
-                "image_urls": presigned_urls,
-            }
+            return self._created_post_dict(item)
 
         except Exception as e:
             logger.error("Error creating post: %r", e)
             raise
 
+    def create_posts(self, bodies: list[CreatePostBody], user: UserInfo) -> list[dict]:
+        """投稿を一括作成 (BatchWriteItem, 未処理アイテムはバックオフ付きで再試行)"""
+        nickname = self._get_author_nickname(user.user_id)
+        items = [self._new_post_item(body, user, nickname) for body in bodies]
+        requests: list[dict] = []
+        owners: list[int] = []
+        for index, item in enumerate(items):
+            for write_item in (item, *tag_index_items(item)):
+                requests.append({"PutRequest": {"Item": write_item}})
+                owners.append(index)
+        failed = batch_write_items(self.dynamodb, self.table_name, requests, owners)
+
+        return [
+            batch_write_failure(index, item["postId"]) if index in failed else {
+                "index": index,
+                "postId": item["postId"],
+                "status": 201,
+                "post": self._created_post_dict(item),
+            }
+            for index, item in enumerate(items)
+        ]
+
+    def delete_posts(self, post_ids: list[str], user: UserInfo) -> list[dict]:
+        """投稿を一括削除 (BatchGetItem / 並列 GSI Query で解決し BatchWriteItem で削除)"""
+        return batch_delete_posts(
+            self.table,
+            self.dynamodb,
+            self.table_name,
+            post_ids,
+            owner_id=None if user.is_admin else user.user_id,
+        )
+
+    def _get_author_nickname(self, user_id: str) -> str | None:
+        """プロフィールから nickname を取得 (失敗時は None)"""
+        try:
+            profile_item = self.table.get_item(
+                Key={"PK": "PROFILES", "SK": user_id}
+            ).get("Item")
+            if profile_item:
+                return profile_item.get("nickname")
+        except Exception as e:
+            logger.warning(f"Failed to fetch nickname for {user_id}: {e}")
+        return None
+
+    @staticmethod
+    def _new_post_item(body: CreatePostBody, user: UserInfo, nickname: str | None) -> dict:
+        post_id = str(uuid.uuid4())
+        now = datetime.now(UTC).isoformat()
+        return {
+            "PK": posts_partition_for(post_id, settings.posts_shard_count),
+            "SK": now + "#" + post_id,  # タイムスタンプ + UUID
+            "postId": post_id,
+            "userId": user.user_id,
+            "nickname": nickname,
+            "content": body.content,
+            "tags": body.tags if body.tags else [],
+            "createdAt": now,
+            "updatedAt": now,
+            "imageKeys": body.image_keys if body.image_keys else [],  # 生のS3キーを保存
+        }
+
+    def _created_post_dict(self, item: dict) -> dict:
+        presigned_urls = self._resolve_image_urls(item["imageKeys"])
+        return {
+            "postId": item["postId"],
+            "postHandle": encode_post_handle(item),
+            "userId": item["userId"],
+            "nickname": item["nickname"],
+            "content": item["content"],
+            "tags": item["tags"],
+            "createdAt": item["createdAt"],
+            "imageUrls": presigned_urls,
+            # snake_case aliases
+            "post_id": item["postId"],
+            "user_id": item["userId"],
+            "created_at": item["createdAt"],
+            "image_urls": presigned_urls,
+        }
+
     def get_post(self, post_id: str):
         """投稿を1件取得 (PostIdIndex で検索)"""
         try:
-            response = self.table.query(
-                IndexName="PostIdIndex",
-                KeyConditionExpression="postId = :postId",
-                ExpressionAttributeValues={":postId": post_id},
-            )
-            items = response.get("Items", [])
-            if not items:
-                return None
-            item = items[0]
-            raw_urls = item.get("imageKeys") or item.get("imageUrls") or []
-            return Post(
-                postId=item["postId"],
-                userId=item["userId"],
-                nickname=item.get("nickname"),
-                content=item["content"],
-                tags=item.get("tags", []),
-                createdAt=item["createdAt"],
-                updatedAt=item.get("updatedAt"),
-                imageUrls=self._resolve_image_urls(raw_urls),
-            )
+            return self._item_to_post(self._get_post_item(post_id))
+        except ValueError:
+            return None
         except Exception as e:
             logger.error(f"Error getting post {post_id}: {e}")
             raise
 
     def delete_post(self, post_id: str, user: UserInfo) -> dict:
-        """投稿を削除 (DynamoDB DeleteItem)"""
-        try:
-            # まず postId から SK を取得
-            response = self.table.query(
-                IndexName="PostIdIndex",
-                KeyConditionExpression="postId = :postId",
-                ExpressionAttributeValues={":postId": post_id},
-            )
+        """投稿を削除 (条件付き DeleteItem + タグインデックス削除)
 
-            if not response.get("Items"):
-                raise ValueError(f"Post not found: {post_id}")
-
-            item = response["Items"][0]
+        post_id には postId またはハンドル (postHandle) を指定できる。
+        """
+        try:
+            key, resolved_id = self._resolve_post_key(post_id, user, "delete")
+            try:
+                old = self.table.delete_item(
+                    Key=key,
+                    ReturnValues="ALL_OLD",
+                    **conditional_post_write(
+                        resolved_id, None if user.is_admin else user.user_id
+                    ),
+                )["Attributes"]
+            except ClientError as e:
+                self._raise_condition_failure(e, resolved_id, "delete")
+                raise
+
+            tag_keys = tag_index_keys(old)
+            if tag_keys:
+                with self.table.batch_writer() as batch:
+                    for tag_key in tag_keys:
+                        batch.delete_item(Key=tag_key)
+
+            return {"status": "deleted", "post_id": resolved_id}
 
-            # ユーザー権限チェック
-            if item["userId"] != user.user_id and not user.is_admin:
-                raise PermissionError("You do not have permission to delete this post")
+        except Exception as e:
+            logger.error("Error deleting post: %r", e)
+            raise
 
-            # 削除
-            self.table.delete_item(Key={"PK": "POSTS", "SK": item["SK"]})
+    def update_post(self, post_id: str, body: UpdatePostBody, user: UserInfo) -> dict:
+        """投稿を更新 (条件付き UpdateItem, タグ変更時はタグインデックスも更新)
 
-            return {"status": "deleted", "post_id": post_id}
+        post_id には postId またはハンドル (postHandle) を指定できる。
+        """
+        try:
+            key, resolved_id = self._resolve_post_key(post_id, user, "update")
+            fields = post_update_fields(body, datetime.now(UTC).isoformat())
+            try:
+                # 旧タグの差分更新のため ALL_OLD を受け取り、更新後の値はローカルで合成する
+                old = self.table.update_item(
+                    Key=key,
+                    ReturnValues="ALL_OLD",
+                    **conditional_post_write(
+                        resolved_id, None if user.is_admin else user.user_id, fields
+                    ),
+                )["Attributes"]
+            except ClientError as e:
+                self._raise_condition_failure(e, resolved_id, "update")
+                raise
+
+            if body.tags is not None:
+                sync_tag_index(self.table, old, body.tags)
+
+            return self._item_to_post({**old, **fields}).model_dump()
 
         except Exception as e:
-            logger.error("Error deleting post: %r", e)
+            logger.error("Error updating post %r: %r", post_id, e)
             raise
 
     def get_profile(self, user_id: str) -> ProfileResponse:
@@ -242,65 +387,89 @@ class AwsBackend(BackendBase):
                     bio=None,
                     avatar_url=None,
                 )
-            return ProfileResponse(
-                user_id=user_id,
-                nickname=item.get("nickname"),
-                bio=item.get("bio"),
-                avatar_url=item.get("avatar_url"),
-                created_at=item.get("created_at"),
-                updated_at=item.get("updated_at"),
-            )
+            return self._item_to_profile(user_id, item)
         except Exception as e:
             logger.error("Error getting profile for %r: %r", user_id, e)
             raise
 
+    @staticmethod
+    def _item_to_profile(user_id: str, item: dict) -> ProfileResponse:
+        return ProfileResponse(
+            user_id=user_id,
+            nickname=item.get("nickname"),
+            bio=item.get("bio"),
+            avatar_url=item.get("avatar_url"),
+            created_at=item.get("created_at"),
+            updated_at=item.get("updated_at"),
+        )
+
     def update_profile(
         self,
         user: UserInfo,
         body: ProfileUpdateRequest,
     ) -> ProfileResponse:
-        """プロフィールを更新 (DynamoDB)"""
-        now = datetime.now(timezone.utc).isoformat()
+        """プロフィールを更新 (DynamoDB, update_item 1 回で更新後の値も受け取る)"""
+        now = datetime.now(UTC).isoformat()
 
-        # 既存プロフィールを取得して created_at を保持し、未指定フィールドをマージ
-        existing = self.table.get_item(Key={"PK": "PROFILES", "SK": user.user_id}).get(
-            "Item"
+        # 未指定フィールドは既存値を保持し、created_at は初回作成時のみ設定
+        update_expr = (
+            "SET user_id = :user_id, updated_at = :now, "
+            "created_at = if_not_exists(created_at, :now)"
         )
-        created_at = existing.get("created_at", now) if existing else now
-
-        item: dict = {
-            "PK": "PROFILES",
-            "SK": user.user_id,
-            "user_id": user.user_id,
-            "created_at": created_at,
-            "updated_at": now,
-        }
-        # 既存データをベースにしてリクエストで指定されたフィールドのみ上書き
-        if existing:
-            for field in ("nickname", "bio", "avatar_url"):
-                if field in existing:
-                    item[field] = existing[field]
-        if body.nickname is not None:
-            item["nickname"] = body.nickname
-        if body.bio is not None:
-            item["bio"] = body.bio
-        if body.avatar_key is not None:
-            item["avatar_url"] = body.avatar_key
+        expr_values: dict = {":user_id": user.user_id, ":now": now}
+        for attr, value in (
+            ("nickname", body.nickname),
+            ("bio", body.bio),
+            ("avatar_url", body.avatar_key),
+        ):
+            if value is not None:
+                update_expr += f", {attr} = :{attr}"
+                expr_values[f":{attr}"] = value
 
         try:
-            self.table.put_item(Item=item)
+            response = self.table.update_item(
+                Key={"PK": "PROFILES", "SK": user.user_id},
+                UpdateExpression=update_expr,
+                ExpressionAttributeValues=expr_values,
+                ReturnValues="ALL_NEW",
+            )
         except Exception as e:
             logger.error("Error updating profile for %r: %r", user.user_id, e)
             raise
 
-        return ProfileResponse(
-            user_id=user.user_id,
-            nickname=item.get("nickname"),
-            bio=item.get("bio"),
-            avatar_url=item.get("avatar_url"),
-            created_at=created_at,
-            updated_at=now,
-        )
+        return self._item_to_profile(user.user_id, response["Attributes"])
+
+    def refresh_author_snapshot(self, user_id: str, nickname: str | None) -> int:
+        """UserPostsIndex を Query してユーザーの全投稿の nickname を更新"""
+        query_kwargs: dict = {
+            "IndexName": "UserPostsIndex",
+            "KeyConditionExpression": "userId = :uid",
+            "ExpressionAttributeValues": {":uid": user_id},
+            "ProjectionExpression": "PK, SK",
+        }
+        updated = 0
+        while True:
+            response = self.table.query(**query_kwargs)
+            for ref in response.get("Items", []):
+                if not str(ref.get("PK", "")).startswith("POSTS"):
+                    continue
+                try:
+                    self.table.update_item(
+                        Key={"PK": ref["PK"], "SK": ref["SK"]},
+                        UpdateExpression="SET nickname = :nickname",
+                        ConditionExpression="attribute_exists(PK)",
+                        ExpressionAttributeValues={":nickname": nickname},
+                    )
+                    updated += 1
+                except ClientError as e:
+                    # GSI は結果整合のため、削除済み投稿が返ることがある
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        raise
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        logger.info("Refreshed author snapshot on %d posts for %r", updated, user_id)
+        return updated
 
     def generate_upload_urls(
         self,
@@ -2,15 +2,38 @@
 
 import logging
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 from app.auth import UserInfo
-from app.backends.base import BackendBase
+from app.backends.base import BackendBase, batch_error_result
+from app.backends.pagination import decode_page_token, encode_page_token
+from app.backends.signed_url_cache import SignedUrlCache
 from app.config import settings
 from app.models import CreatePostBody, Post, ProfileResponse, ProfileUpdateRequest
 
 logger = logging.getLogger(__name__)
 
+# 画像読み取り用 SAS の有効期間 (秒)
+_READ_SAS_EXPIRY = 24 * 3600
+# パーティションごとのトランザクションバッチを並列に実行する最大スレッド数
+_BATCH_MAX_WORKERS = 16
+# list_posts の ORDER BY c.createdAt DESC, c.id DESC 用の複合インデックス
+# (create_container_if_not_exists は既存コンテナのポリシーを変更しないため、
+# 既存環境は infrastructure/pulumi/azure の定義で更新する)
+POSTS_INDEXING_POLICY = {
+    "indexingMode": "consistent",
+    "automatic": True,
+    "includedPaths": [{"path": "/*"}],
+    "excludedPaths": [{"path": '/"_etag"/?'}],
+    "compositeIndexes": [
+        [
+            {"path": "/createdAt", "order": "descending"},
+            {"path": "/id", "order": "descending"},
+        ]
+    ],
+}
+
 try:
     from azure.cosmos import CosmosClient, PartitionKey
     from azure.cosmos import exceptions as cosmos_exceptions
@@ -57,6 +80,7 @@ class AzureBackend(BackendBase):
         self.posts_container = self.database.create_container_if_not_exists(
             id="posts",
             partition_key=PartitionKey(path="/postId"),
+            indexing_policy=POSTS_INDEXING_POLICY,
         )
         # profiles コンテナ
         self.profiles_container = self.database.create_container_if_not_exists(
@@ -68,6 +92,11 @@ class AzureBackend(BackendBase):
         self.storage_account = settings.azure_storage_account_name
         self.storage_key = settings.azure_storage_account_key
         self.images_container = settings.azure_storage_container
+        self._read_url_cache = SignedUrlCache(
+            url_expiry_seconds=_READ_SAS_EXPIRY,
+            refresh_margin_seconds=settings.signed_url_refresh_margin_seconds,
+            max_entries=settings.signed_url_cache_max_entries,
+        )
 
         logger.info(
             f"AzureBackend initialized: db={db_name}, "
@@ -75,19 +104,22 @@ class AzureBackend(BackendBase):
         )
 
     def _blob_key_to_read_sas_url(self, blob_name: str) -> str:
-        """Blobキーを読み取り用SAS URLに変換 (24時間有効)"""
+        """Blobキーを読み取り用SAS URLに変換 (24時間有効, プロセス内キャッシュ経由)"""
         if not _blob_available or not self.storage_key:
             return (
                 f"https://{self.storage_account}.blob.core.windows.net/"
                 f"{self.images_container}/{blob_name}"
             )
+        return self._read_url_cache.get_or_sign(blob_name, self._sign_read_sas_url)
+
+    def _sign_read_sas_url(self, blob_name: str) -> str:
         sas_token = generate_blob_sas(
             account_name=self.storage_account,
             container_name=self.images_container,
             blob_name=blob_name,
             account_key=self.storage_key,
             permission=BlobSasPermissions(read=True),
-            expiry=datetime.now(timezone.utc) + timedelta(hours=24),
+            expiry=datetime.now(timezone.utc) + timedelta(seconds=_READ_SAS_EXPIRY),
         )
         return (
             f"https://{self.storage_account}.blob.core.windows.net/"
@@ -154,51 +186,46 @@ class AzureBackend(BackendBase):
         next_token: str | None,
         tag: str | None,
     ) -> tuple[list[Post], str | None]:
-        """Cosmos DBから投稿一覧を取得"""
+        """Cosmos DBから投稿一覧を取得 (keyset ページネーション)
+
+        next_token は最終アイテムの (createdAt, id) を持つ不透明トークン。
+        OFFSET と異なり深いページでも 1 ページ目と同じ RU で取得できる。
+        移行期間中は旧形式の数値トークン (OFFSET) も受け付け、次ページからは
+        keyset トークンを返す。
+        """
         try:
+            conditions = []
+            parameters = [{"name": "@limit", "value": limit + 1}]
             if tag:
-                query = (
-                    "SELECT * FROM c WHERE ARRAY_CONTAINS(c.tags, @tag) "
-                    "ORDER BY c.createdAt DESC OFFSET 0 LIMIT @limit"
-                )
-                parameters = [
-                    {"name": "@tag", "value": tag},
-                    {"name": "@limit", "value": limit + 1},
-                ]
-            else:
-                query = (
-                    "SELECT * FROM c ORDER BY c.createdAt DESC OFFSET 0 LIMIT @limit"
+                conditions.append("ARRAY_CONTAINS(c.tags, @tag)")
+                parameters.append({"name": "@tag", "value": tag})
+
+            offset_clause = ""
+            cursor = decode_page_token(next_token)
+            if cursor is not None:
+                # (createdAt, id) の降順で並べ、同じ createdAt の中は id で順序を確定させる
+                conditions.append(
+                    "(c.createdAt < @createdAt OR "
+                    "(c.createdAt = @createdAt AND c.id < @id))"
                 )
-                parameters = [{"name": "@limit", "value": limit + 1}]
-
-            # next_token (offset) を数値トークンとして扱う
-            offset = 0
-            if next_token:
+                parameters.append({"name": "@createdAt", "value": cursor.get("c")})
+                parameters.append({"name": "@id", "value": cursor.get("id")})
+            elif next_token and settings.azure_legacy_offset_tokens:
                 try:
-                    offset = int(next_token)
+                    offset = max(int(next_token), 0)
                 except (ValueError, TypeError):
                     offset = 0
-
-            if offset > 0:
-                if tag:
-                    query = (
-                        "SELECT * FROM c WHERE ARRAY_CONTAINS(c.tags, @tag) "
-                        "ORDER BY c.createdAt DESC OFFSET @offset LIMIT @limit"
-                    )
-                    parameters = [
-                        {"name": "@tag", "value": tag},
-                        {"name": "@offset", "value": offset},
-                        {"name": "@limit", "value": limit + 1},
-                    ]
-                else:
-                    query = (
-                        "SELECT * FROM c ORDER BY c.createdAt DESC "
-                        "OFFSET @offset LIMIT @limit"
-                    )
-                    parameters = [
-                        {"name": "@offset", "value": offset},
-                        {"name": "@limit", "value": limit + 1},
-                    ]
+                if offset:
+                    offset_clause = "OFFSET @offset "
+                    parameters.append({"name": "@offset", "value": offset})
+
+            where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+            # 2 キーの ORDER BY には POSTS_INDEXING_POLICY の複合インデックスが必要
+            order_by = "ORDER BY c.createdAt DESC, c.id DESC"
+            if offset_clause:
+                query = f"SELECT * FROM c {where}{order_by} {offset_clause}LIMIT @limit"
+            else:
+                query = f"SELECT TOP @limit * FROM c {where}{order_by}"
 
             items = list(
                 self.posts_container.query_items(
@@ -211,7 +238,10 @@ class AzureBackend(BackendBase):
             output_next_token = None
             if len(items) > limit:
                 items = items[:limit]
-                output_next_token = str(offset + limit)
+                last = items[-1]
+                output_next_token = encode_page_token(
+                    c=last.get("createdAt"), id=last.get("id")
+                )
 
             posts = [self._item_to_post(item) for item in items]
             return posts, output_next_token
@@ -223,55 +253,151 @@ class AzureBackend(BackendBase):
     def create_post(self, body: CreatePostBody, user: UserInfo) -> dict:
         """Cosmos DBに投稿を作成"""
         try:
-            post_id = str(uuid.uuid4())
-            now_str = datetime.now(timezone.utc).isoformat()
+            item = self._new_post_item(body, user, self._get_author_nickname(user.user_id))
+            self.posts_container.create_item(body=item)
+            logger.info("Created post %r by user %r", item["postId"], user.user_id)
+            return self._created_post_dict(item)
 
-            # プロフィールからnicknameを取得
-            nickname = None
-            try:
-                profile_item = self.profiles_container.read_item(
-                    item=user.user_id, partition_key=user.user_id
-                )
-                if profile_item:
-                    nickname = profile_item.get("nickname")
-            except Exception as e:
-                logger.warning("Failed to fetch nickname for %r: %r", user.user_id, e)
+        except Exception as e:
+            logger.error("Error creating post in Cosmos DB: %r", e)
+            raise
 
-            # 画像キーをそのまま保存 (取得時にSAS URLに変換)
-            image_keys = list(body.image_keys) if body.image_keys else []
-
-            item = {
-                "id": post_id,
-                "postId": post_id,
-                "userId": user.user_id,
-                "nickname": nickname,
-                "content": body.content,
-                "isMarkdown": body.is_markdown,
-                "imageKeys": image_keys,  # 生のBlobキーを保存 (SASなし)
-                "tags": body.tags or [],
-                "createdAt": now_str,
-                "updatedAt": None,
+    def create_posts(self, bodies: list[CreatePostBody], user: UserInfo) -> list[dict]:
+        """投稿を一括作成 (パーティションキーごとのトランザクションバッチ)
+
+        posts コンテナのパーティションキーは /postId のため 1 バッチは 1 投稿になる。
+        バッチ間は独立しているので並列に実行する。
+        """
+        nickname = self._get_author_nickname(user.user_id)
+        items = [self._new_post_item(body, user, nickname) for body in bodies]
+        groups: dict[str, list[tuple[int, tuple]]] = {}
+        for index, item in enumerate(items):
+            groups.setdefault(item["postId"], []).append((index, ("create", (item,))))
+        errors = self._execute_partition_batches(groups)
+
+        return [
+            batch_error_result(index, errors[index], item["postId"]) if index in errors else {
+                "index": index,
+                "postId": item["postId"],
+                "status": 201,
+                "post": self._created_post_dict(item),
             }
+            for index, item in enumerate(items)
+        ]
 
-            self.posts_container.create_item(body=item)
-            logger.info("Created post %r by user %r", post_id, user.user_id)
+    def delete_posts(self, post_ids: list[str], user: UserInfo) -> list[dict]:
+        """投稿を一括削除 (並列に読み取って所有者を確認し、ETag 条件付きのバッチで削除)"""
+        from fastapi import HTTPException
+
+        def read(post_id: str) -> dict | None:
+            try:
+                return self.posts_container.read_item(item=post_id, partition_key=post_id)
+            except cosmos_exceptions.CosmosResourceNotFoundError:
+                return None
+
+        unique_ids = list(dict.fromkeys(post_ids))
+        with ThreadPoolExecutor(max_workers=min(_BATCH_MAX_WORKERS, len(unique_ids) or 1)) as pool:
+            items = dict(zip(unique_ids, pool.map(read, unique_ids), strict=True))
+
+        errors: dict[int, Exception] = {}
+        groups: dict[str, list[tuple[int, tuple]]] = {}
+        first_index: dict[str, int] = {}
+        for index, post_id in enumerate(post_ids):
+            item = items[post_id]
+            if item is None:
+                errors[index] = HTTPException(status_code=404, detail="Post not found")
+            elif item.get("userId") != user.user_id:
+                errors[index] = HTTPException(status_code=403, detail="Not authorized")
+            elif post_id not in first_index:
+                first_index[post_id] = index
+                # 読み取り後に更新・削除された投稿は ETag 不一致で失敗させる
+                groups.setdefault(post_id, []).append(
+                    (index, ("delete", (post_id,), {"if_match_etag": item["_etag"]}))
+                )
+        errors.update(self._execute_partition_batches(groups))
+
+        results = []
+        for index, post_id in enumerate(post_ids):
+            # 重複指定された投稿は最初の要素と同じ結果を返す
+            error = errors.get(index) or errors.get(first_index.get(post_id, index))
+            # 結果の postId は読み取ったアイテムの値 (読めなかった要素は指定値のまま)
+            item = items[post_id]
+            resolved_id = item.get("postId", post_id) if item is not None else post_id
+            if error is not None:
+                results.append(batch_error_result(index, error, resolved_id))
+            else:
+                results.append({"index": index, "postId": resolved_id, "status": 200})
+        return results
 
-            presigned_urls = self._resolve_image_urls(image_keys)
+    def _execute_partition_batches(
+        self, groups: dict[str, list[tuple[int, tuple]]]
+    ) -> dict[int, Exception]:
+        """パーティションキー -> [(要素番号, 操作)] をトランザクションバッチで実行
 
-            return Post(
-                postId=post_id,
-                userId=user.user_id,
-                nickname=nickname,
-                content=body.content,
-                isMarkdown=body.is_markdown,
-                imageUrls=presigned_urls,
-                tags=body.tags or [],
-                createdAt=now_str,
-            ).model_dump()
+        Returns:
+            失敗した要素番号 -> 例外 (バッチ内の 1 操作が失敗するとそのバッチ全体が失敗)
+        """
+        def run(partition_key: str, operations: list[tuple[int, tuple]]) -> None:
+            self.posts_container.execute_item_batch(
+                batch_operations=[operation for _, operation in operations],
+                partition_key=partition_key,
+            )
 
+        errors: dict[int, Exception] = {}
+        if not groups:
+            return errors
+        with ThreadPoolExecutor(max_workers=min(_BATCH_MAX_WORKERS, len(groups))) as pool:
+            futures = {
+                pool.submit(run, pk, operations): operations
+                for pk, operations in groups.items()
+            }
+            for future, operations in futures.items():
+                exc = future.exception()
+                if exc is not None:
+                    logger.warning("Cosmos transactional batch failed: %r", exc)
+                    errors.update({index: exc for index, _ in operations})
+        return errors
+
+    def _get_author_nickname(self, user_id: str) -> str | None:
+        """プロフィールから nickname を取得 (失敗時は None)"""
+        try:
+            profile_item = self.profiles_container.read_item(
+                item=user_id, partition_key=user_id
+            )
+            if profile_item:
+                return profile_item.get("nickname")
         except Exception as e:
-            logger.error("Error creating post in Cosmos DB: %r", e)
-            raise
+            logger.warning("Failed to fetch nickname for %r: %r", user_id, e)
+        return None
+
+    @staticmethod
+    def _new_post_item(body: CreatePostBody, user: UserInfo, nickname: str | None) -> dict:
+        post_id = str(uuid.uuid4())
+        return {
+            "id": post_id,
+            "postId": post_id,
+            "userId": user.user_id,
+            "nickname": nickname,
+            "content": body.content,
+            "isMarkdown": body.is_markdown,
+            # 画像キーをそのまま保存 (取得時にSAS URLに変換)
+            "imageKeys": list(body.image_keys) if body.image_keys else [],
+            "tags": body.tags or [],
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "updatedAt": None,
+        }
+
+    def _created_post_dict(self, item: dict) -> dict:
+        return Post(
+            postId=item["postId"],
+            userId=item["userId"],
+            nickname=item["nickname"],
+            content=item["content"],
+            isMarkdown=item["isMarkdown"],
+            imageUrls=self._resolve_image_urls(item["imageKeys"]),
+            tags=item["tags"],
+            createdAt=item["createdAt"],
+        ).model_dump()
 
     def get_post(self, post_id: str):
         """Cosmos DBから投稿を1件取得"""
@@ -317,20 +443,24 @@ class AzureBackend(BackendBase):
             item = self.profiles_container.read_item(
                 item=user_id, partition_key=user_id
             )
-            return ProfileResponse(
-                userId=user_id,
-                nickname=item.get("nickname"),
-                bio=item.get("bio"),
-                avatarUrl=item.get("avatarUrl"),
-                createdAt=item.get("createdAt"),
-                updatedAt=item.get("updatedAt"),
-            )
+            return self._item_to_profile(user_id, item)
         except cosmos_exceptions.CosmosResourceNotFoundError:
             return ProfileResponse(userId=user_id)
         except Exception as e:
             logger.error("Error getting profile %r: %r", user_id, e)
             raise
 
+    @staticmethod
+    def _item_to_profile(user_id: str, item: dict) -> ProfileResponse:
+        return ProfileResponse(
+            userId=user_id,
+            nickname=item.get("nickname"),
+            bio=item.get("bio"),
+            avatarUrl=item.get("avatarUrl"),
+            createdAt=item.get("createdAt"),
+            updatedAt=item.get("updatedAt"),
+        )
+
     def update_profile(
         self,
         user: UserInfo,
@@ -363,13 +493,37 @@ class AzureBackend(BackendBase):
                 )
             existing["updatedAt"] = now_str
 
-            self.profiles_container.upsert_item(body=existing)
-            return self.get_profile(user_id)
+            # upsert_item は保存後のドキュメントを返すため再読込しない (1 read + 1 write)
+            saved = self.profiles_container.upsert_item(body=existing)
+            return self._item_to_profile(user_id, saved)
 
         except Exception as e:
             logger.error("Error updating profile %r: %r", user.user_id, e)
             raise
 
+    def refresh_author_snapshot(self, user_id: str, nickname: str | None) -> int:
+        """ユーザーの全投稿の nickname を Patch で更新 (userId で Query)"""
+        items = self.posts_container.query_items(
+            query="SELECT c.id FROM c WHERE c.userId = @userId",
+            parameters=[{"name": "@userId", "value": user_id}],
+            enable_cross_partition_query=True,
+        )
+        updated = 0
+        for item in items:
+            try:
+                self.posts_container.patch_item(
+                    item=item["id"],
+                    partition_key=item["id"],
+                    patch_operations=[
+                        {"op": "set", "path": "/nickname", "value": nickname}
+                    ],
+                )
+                updated += 1
+            except cosmos_exceptions.CosmosResourceNotFoundError:
+                continue
+        logger.info("Refreshed author snapshot on %d posts for %r", updated, user_id)
+        return updated
+
     def generate_upload_urls(
         self,
         count: int,
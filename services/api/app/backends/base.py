@@ -1,9 +1,25 @@
 from abc import ABC, abstractmethod
 from typing import Optional, Tuple  # noqa: F401
+
+from fastapi import HTTPException
+
 from app.models import Post, CreatePostBody, ProfileResponse, ProfileUpdateRequest
 from app.auth import UserInfo
 
 
+def batch_error_result(index: int, exc: Exception, post_id: str | None = None) -> dict:
+    """バッチ API の要素ごとの失敗結果 (例外を HTTP ステータスに対応付ける)"""
+    if isinstance(exc, HTTPException):
+        status, error = exc.status_code, str(exc.detail)
+    elif isinstance(exc, ValueError):
+        status, error = 404, str(exc)
+    elif isinstance(exc, PermissionError):
+        status, error = 403, str(exc)
+    else:
+        status, error = 500, "Internal error"
+    return {"index": index, "postId": post_id, "status": status, "error": error}
+
+
 class BackendBase(ABC):
     """
     バックエンドの抽象基底クラス
@@ -59,6 +75,57 @@ class BackendBase(ABC):
         """
         pass
     
+    def create_posts(self, bodies: list[CreatePostBody], user: UserInfo) -> list[dict]:
+        """
+        投稿を一括作成 (要素ごとに結果を返し、1 件の失敗で全体を中断しない)
+
+        既定実装は create_post を順に呼ぶ。各バックエンドはバッチ書き込みで上書きする。
+
+        Args:
+            bodies: 投稿内容のリスト
+            user: ユーザー情報
+
+        Returns:
+            [{"index": 0, "postId": "...", "status": 201, "post": {...}}, ...]
+            失敗した要素は {"index", "postId", "status", "error"}
+        """
+        results = []
+        for index, body in enumerate(bodies):
+            try:
+                post = self.create_post(body, user)
+            except Exception as exc:
+                results.append(batch_error_result(index, exc))
+                continue
+            results.append(
+                {"index": index, "postId": post["postId"], "status": 201, "post": post}
+            )
+        return results
+
+    def delete_posts(self, post_ids: list[str], user: UserInfo) -> list[dict]:
+        """
+        投稿を一括削除 (要素ごとに結果を返し、1 件の失敗で全体を中断しない)
+
+        既定実装は delete_post を順に呼ぶ。各バックエンドはバッチ書き込みで上書きする。
+
+        Args:
+            post_ids: 投稿ID (DynamoDB ではハンドルも可) のリスト
+            user: ユーザー情報
+
+        Returns:
+            [{"index": 0, "postId": "...", "status": 200}, ...]
+            失敗した要素は {"index", "postId", "status", "error"}
+            postId は解決後の投稿ID (ハンドルで指定された要素は "postHandle" も含む)
+        """
+        results = []
+        for index, post_id in enumerate(post_ids):
+            try:
+                self.delete_post(post_id, user)
+            except Exception as exc:
+                results.append(batch_error_result(index, exc, post_id))
+                continue
+            results.append({"index": index, "postId": post_id, "status": 200})
+        return results
+
     @abstractmethod
     def get_post(self, post_id: str) -> Optional[Post]:
         """
@@ -103,6 +170,24 @@ class BackendBase(ABC):
         """
         pass
     
+    @abstractmethod
+    def refresh_author_snapshot(self, user_id: str, nickname: str | None) -> int:
+        """
+        投稿に非正規化した著者情報 (nickname) を書き換える
+
+        投稿は作成時に著者の nickname をコピーして保持する (author snapshot)。
+        update_profile 後にバックグラウンドで呼ばれ、そのユーザーの全投稿へ
+        新しい nickname をファンアウトする。読み取り側はプロフィールを JOIN しない。
+
+        Args:
+            user_id: ユーザーID
+            nickname: 新しいニックネーム
+
+        Returns:
+            更新した投稿数
+        """
+        pass
+
     @abstractmethod
     def generate_upload_urls(
         self,
@@ -122,3 +207,12 @@ class BackendBase(ABC):
             [{"url": "...", "key": "..."}, ...]
         """
         pass
+
+    def warm_up(self) -> None:
+        """
+        SDK クライアントの遅延初期化 (接続確立・エンドポイント解決など) を前倒しする
+
+        起動時 (lifespan / Lambda INIT) に app.warmup から呼ばれる。
+        既定では何もしない。失敗しても起動は継続する。
+        """
+        return None
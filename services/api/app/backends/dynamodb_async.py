@@ -0,0 +1,484 @@
+"""Native asyncio DynamoDB backends for AWS and local (aioboto3)
+
+AioAwsBackend / AioLocalBackend implement AsyncBackendBase on aioboto3, so the
+request paths await DynamoDB on the event loop instead of holding a worker
+thread for every round-trip:
+
+- list_posts (shard Queries run concurrently with asyncio.gather, tag pages
+  resolve their posts with an async BatchGetItem)
+- get_post, create_post, update_post, delete_post, get_profile
+
+Both wrap the synchronous AwsBackend / LocalBackend and reuse its item <-> model
+conversion (CPU only) and the helpers in dynamodb_utils, so responses, errors
+and page tokens are the same in both modes. Batch create / delete, profile
+updates, the author-snapshot fan-out and upload URL signing are rare or
+CPU-bound and still run on ThreadedAsyncBackend's limiter.
+
+The aioboto3 resource is opened on first use on the running event loop and
+closed by ``aclose()`` (FastAPI lifespan shutdown).
+
+Azure (Cosmos DB) and GCP (Firestore) are not covered yet: they still run on
+ThreadedAsyncBackend. Native versions on azure-cosmos's aio client and
+Firestore's AsyncClient are a follow-up.
+"""
+
+import asyncio
+import logging
+from abc import abstractmethod
+from contextlib import AsyncExitStack
+from datetime import UTC, datetime
+from typing import Any
+
+from botocore.exceptions import ClientError
+from fastapi import HTTPException, status
+
+from app.auth import UserInfo
+from app.backends.async_base import ThreadedAsyncBackend
+from app.backends.dynamodb_utils import (
+    BATCH_GET_BACKOFF_BASE,
+    BATCH_GET_MAX_KEYS,
+    BATCH_GET_MAX_RETRIES,
+    conditional_post_write,
+    decode_post_handle,
+    decode_shard_cursors,
+    merge_shard_pages,
+    post_update_fields,
+    posts_partition_keys,
+    shard_query_kwargs,
+    tag_index_items,
+    tag_index_keys,
+    tag_page,
+    tag_query_kwargs,
+    tag_ref_keys,
+)
+from app.config import settings
+from app.models import CreatePostBody, Post, ProfileResponse, UpdatePostBody
+
+logger = logging.getLogger(__name__)
+
+
+async def batch_get_items(
+    dynamodb: Any,
+    table_name: str,
+    keys: list[dict],
+    projection: str | None = None,
+) -> list[dict]:
+    """dynamodb_utils.batch_get_items の async 版 (100 件ごとの BatchGetItem を並行実行)"""
+
+    async def chunk(chunk_keys: list[dict]) -> list[dict]:
+        request: dict[str, Any] = {"Keys": chunk_keys}
+        if projection:
+            request["ProjectionExpression"] = projection
+        request_items = {table_name: request}
+        found: list[dict] = []
+        for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+            res = await dynamodb.batch_get_item(RequestItems=request_items)
+            found.extend(res.get("Responses", {}).get(table_name, []))
+            request_items = res.get("UnprocessedKeys") or {}
+            if not request_items:
+                break
+            await asyncio.sleep(BATCH_GET_BACKOFF_BASE * (2 ** attempt))
+        else:
+            logger.warning("BatchGetItem left unprocessed keys after retries")
+        return found
+
+    pages = await asyncio.gather(*(
+        chunk(keys[start:start + BATCH_GET_MAX_KEYS])
+        for start in range(0, len(keys), BATCH_GET_MAX_KEYS)
+    ))
+    return [item for page in pages for item in page]
+
+
+async def write_items(
+    table: Any, put_items: list[dict], delete_keys: list[dict] | None = None
+) -> None:
+    """batch_writer でまとめて書き込む (未処理アイテムは batch_writer が再送する)"""
+    if not put_items and not delete_keys:
+        return
+    async with table.batch_writer() as batch:
+        for key in delete_keys or []:
+            await batch.delete_item(Key=key)
+        for item in put_items:
+            await batch.put_item(Item=item)
+
+
+class AioDynamoDBBackend(ThreadedAsyncBackend):
+    """
+    aioboto3 で DynamoDB を直接 await する AsyncBackendBase の共通部分
+
+    プロバイダーごとの差 (エラー型・書き込むアイテム・レスポンス形) は
+    サブクラスのフックで埋める。フックの無い操作は ThreadedAsyncBackend と同じく
+    同期バックエンドをスレッドで実行する。
+    """
+
+    def __init__(self, backend: Any, max_concurrency: int):
+        """
+        Args:
+            backend: 同期バックエンド (AwsBackend / LocalBackend)
+            max_concurrency: スレッド実行に残す操作の同時実行数の上限
+        """
+        super().__init__(backend, max_concurrency)
+        self._opening: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stack: AsyncExitStack | None = None
+
+    def _resource_kwargs(self) -> dict:
+        return {}
+
+    async def _open(self) -> tuple[Any, Any]:
+        import aioboto3
+
+        stack = AsyncExitStack()
+        dynamodb = await stack.enter_async_context(
+            aioboto3.Session().resource("dynamodb", **self._resource_kwargs())
+        )
+        self._stack = stack
+        return dynamodb, await dynamodb.Table(self.backend.table_name)
+
+    async def _resources(self) -> tuple[Any, Any]:
+        """(dynamodb resource, Table) を返す (初回呼び出しで接続を開く)"""
+        loop = asyncio.get_running_loop()
+        if self._opening is None or self._loop is not loop:
+            # aiohttp のセッションはイベントループに紐づくため、ループごとに開き直す
+            self._loop = loop
+            self._opening = loop.create_task(self._open())
+        opening = self._opening
+        try:
+            return await opening
+        except Exception:
+            if self._opening is opening:
+                self._opening = None
+            raise
+
+    async def aclose(self) -> None:
+        """aioboto3 の接続を閉じる (アプリ終了時)"""
+        stack, self._stack, self._opening = self._stack, None, None
+        if stack is not None:
+            await stack.aclose()
+
+    # ------------------------------------------------------------------
+    # Provider hooks
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    def _not_found(self, post_id: str) -> Exception:
+        """投稿が無いときに送出する例外 (同期バックエンドと同じ型)"""
+
+    @abstractmethod
+    def _forbidden(self, action: str) -> Exception:
+        """他人の投稿を更新・削除しようとしたときに送出する例外"""
+
+    @abstractmethod
+    def _raise_condition_failure(self, error: Exception, post_id: str, action: str) -> None:
+        """条件付き書き込みの失敗を 404 / 403 相当の例外に変換する"""
+
+    @abstractmethod
+    async def _items_to_posts(self, items: list[dict]) -> list[Post]:
+        """投稿アイテムを Post に変換"""
+
+    @abstractmethod
+    async def _author_nickname(self, user_id: str) -> str | None:
+        """新規投稿に非正規化する nickname"""
+
+    @abstractmethod
+    def _post_write_items(self, item: dict) -> list[dict]:
+        """投稿 1 件の作成で書き込むアイテム (本体 + インデックス)"""
+
+    @abstractmethod
+    def _post_delete_keys(self, old: dict) -> list[dict]:
+        """投稿本体の削除後に消すインデックスアイテムのキー"""
+
+    @abstractmethod
+    def _created_post_dict(self, item: dict, body: CreatePostBody) -> dict:
+        """create_post のレスポンス"""
+
+    @abstractmethod
+    def _deleted(self, post_id: str) -> dict:
+        """delete_post のレスポンス"""
+
+    @abstractmethod
+    async def _post_response(self, item: dict) -> Any:
+        """get_post のレスポンス"""
+
+    @abstractmethod
+    async def _updated_post_dict(self, item: dict) -> dict:
+        """update_post のレスポンス (更新後の値をローカルで合成したアイテムから)"""
+
+    # ------------------------------------------------------------------
+    # Shared DynamoDB access
+    # ------------------------------------------------------------------
+
+    async def _find_post_item(self, post_id: str) -> dict | None:
+        """postId (PostIdIndex) またはハンドル (GetItem) で投稿アイテムを取得 (無ければ None)"""
+        _, table = await self._resources()
+        decoded = decode_post_handle(post_id)
+        if decoded is not None:
+            key, post_id = decoded
+            item = (await table.get_item(Key=key)).get("Item")
+            items = [item] if item and item.get("postId") == post_id else []
+        else:
+            response = await table.query(
+                IndexName="PostIdIndex",
+                KeyConditionExpression="postId = :pid",
+                ExpressionAttributeValues={":pid": post_id},
+            )
+            items = response.get("Items", [])
+        return items[0] if items else None
+
+    async def _get_post_item(self, post_id: str) -> dict:
+        """_find_post_item と同じ (無ければ _not_found を送出)"""
+        item = await self._find_post_item(post_id)
+        if item is None:
+            raise self._not_found(post_id)
+        return item
+
+    async def _resolve_post_key(
+        self, post_id: str, user: UserInfo, action: str
+    ) -> tuple[dict, str]:
+        """同期版 _resolve_post_key と同じ (ハンドルなら読み取りなし)"""
+        decoded = decode_post_handle(post_id)
+        if decoded is not None:
+            return decoded
+        item = await self._get_post_item(post_id)
+        if item["userId"] != user.user_id and not user.is_admin:
+            raise self._forbidden(action)
+        return {"PK": item["PK"], "SK": item["SK"]}, item["postId"]
+
+    async def _conditional_write(
+        self,
+        method: str,
+        post_id: str,
+        user: UserInfo,
+        action: str,
+        fields: dict[str, Any] | None = None,
+    ) -> tuple[dict, str]:
+        """条件付き DeleteItem / UpdateItem を実行し (変更前のアイテム, postId) を返す"""
+        _, table = await self._resources()
+        key, resolved_id = await self._resolve_post_key(post_id, user, action)
+        try:
+            response = await getattr(table, method)(
+                Key=key,
+                ReturnValues="ALL_OLD",
+                **conditional_post_write(
+                    resolved_id, None if user.is_admin else user.user_id, fields
+                ),
+            )
+        except ClientError as e:
+            self._raise_condition_failure(e, resolved_id, action)
+            raise
+        return response["Attributes"], resolved_id
+
+    async def _query_posts_page(
+        self, limit: int, next_token: str | None
+    ) -> tuple[list[dict], str | None]:
+        """dynamodb_utils.query_posts_page と同じマージを、シャードの並行 Query で行う"""
+        _, table = await self._resources()
+        shard_count = settings.posts_shard_count
+        cursors = decode_shard_cursors(next_token, posts_partition_keys(shard_count))
+
+        async def query(pk: str) -> tuple[list[dict], bool]:
+            response = await table.query(**shard_query_kwargs(pk, cursors[pk], limit))
+            return response.get("Items", []), "LastEvaluatedKey" in response
+
+        active = [pk for pk in cursors if cursors[pk] is not None]
+        results = await asyncio.gather(*(query(pk) for pk in active))
+        return merge_shard_pages(shard_count, cursors, active, list(results), limit)
+
+    async def _query_tag_page(
+        self, tag: str, limit: int, next_token: str | None
+    ) -> tuple[list[dict], str | None]:
+        dynamodb, table = await self._resources()
+        response = await table.query(**tag_query_kwargs(tag, limit, next_token))
+        items = await batch_get_items(
+            dynamodb, self.backend.table_name, tag_ref_keys(response)
+        )
+        return tag_page(response, items)
+
+    # ------------------------------------------------------------------
+    # AsyncBackendBase implementation
+    # ------------------------------------------------------------------
+
+    async def list_posts(self, limit, next_token, tag):
+        if tag:
+            items, next_token = await self._query_tag_page(tag, limit, next_token)
+        else:
+            items, next_token = await self._query_posts_page(limit, next_token)
+        return await self._items_to_posts(items), next_token
+
+    async def get_post(self, post_id):
+        item = await self._find_post_item(post_id)
+        return await self._post_response(item) if item is not None else None
+
+    async def create_post(self, body, user):
+        _, table = await self._resources()
+        item = self.backend._new_post_item(
+            body, user, await self._author_nickname(user.user_id)
+        )
+        await write_items(table, self._post_write_items(item))
+        return self._created_post_dict(item, body)
+
+    async def delete_post(self, post_id, user):
+        _, table = await self._resources()
+        old, resolved_id = await self._conditional_write("delete_item", post_id, user, "delete")
+        await write_items(table, [], self._post_delete_keys(old))
+        return self._deleted(resolved_id)
+
+    async def update_post(self, post_id: str, body: UpdatePostBody, user: UserInfo) -> dict:
+        _, table = await self._resources()
+        fields = post_update_fields(body, datetime.now(UTC).isoformat())
+        # 旧タグの差分更新のため ALL_OLD を受け取り、更新後の値はローカルで合成する
+        old, _ = await self._conditional_write("update_item", post_id, user, "update", fields)
+        if body.tags is not None:
+            # dynamodb_utils.sync_tag_index と同じ差分
+            old_tags = set(old.get("tags") or [])
+            removed = sorted(old_tags - set(body.tags))
+            added = dict(old, tags=sorted(set(body.tags) - old_tags))
+            await write_items(
+                table, tag_index_items(added), tag_index_keys(old, removed)
+            )
+        return await self._updated_post_dict({**old, **fields})
+
+
+class AioAwsBackend(AioDynamoDBBackend):
+    """AwsBackend のネイティブ async 版 (PROFILES / SK=<userId> のプロフィール)"""
+
+    def _not_found(self, post_id: str) -> Exception:
+        return ValueError(f"Post not found: {post_id}")
+
+    def _forbidden(self, action: str) -> Exception:
+        return PermissionError(f"You do not have permission to {action} this post")
+
+    def _raise_condition_failure(self, error: Exception, post_id: str, action: str) -> None:
+        self.backend._raise_condition_failure(error, post_id, action)
+
+    async def _items_to_posts(self, items: list[dict]) -> list[Post]:
+        return [self.backend._item_to_post(item) for item in items]
+
+    async def _author_nickname(self, user_id: str) -> str | None:
+        _, table = await self._resources()
+        try:
+            item = (await table.get_item(Key={"PK": "PROFILES", "SK": user_id})).get("Item")
+        except Exception as e:
+            logger.warning(f"Failed to fetch nickname for {user_id}: {e}")
+            return None
+        return item.get("nickname") if item else None
+
+    def _post_write_items(self, item: dict) -> list[dict]:
+        return [item, *tag_index_items(item)]
+
+    def _post_delete_keys(self, old: dict) -> list[dict]:
+        return tag_index_keys(old)
+
+    def _created_post_dict(self, item: dict, body: CreatePostBody) -> dict:
+        return self.backend._created_post_dict(item)
+
+    def _deleted(self, post_id: str) -> dict:
+        return {"status": "deleted", "post_id": post_id}
+
+    async def _post_response(self, item: dict) -> Post:
+        return self.backend._item_to_post(item)
+
+    async def _updated_post_dict(self, item: dict) -> dict:
+        return self.backend._item_to_post(item).model_dump()
+
+    async def get_profile(self, user_id):
+        _, table = await self._resources()
+        item = (await table.get_item(Key={"PK": "PROFILES", "SK": user_id})).get("Item")
+        if not item:
+            return ProfileResponse(user_id=user_id, nickname=None, bio=None, avatar_url=None)
+        return self.backend._item_to_profile(user_id, item)
+
+
+class AioLocalBackend(AioDynamoDBBackend):
+    """LocalBackend のネイティブ async 版 (DynamoDB Local, USER#<id> の adjacency アイテム)"""
+
+    def _resource_kwargs(self) -> dict:
+        return self.backend.dynamodb_resource_kwargs()
+
+    def _not_found(self, post_id: str) -> Exception:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+
+    def _forbidden(self, action: str) -> Exception:
+        return HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"You can only {action} your own posts",
+        )
+
+    def _raise_condition_failure(self, error: Exception, post_id: str, action: str) -> None:
+        self.backend._raise_condition_failure(error, action)
+
+    async def _get_nicknames(self, user_ids: list[str]) -> dict[str, str | None]:
+        """LocalBackend._get_nicknames の async 版 (USER#<id>/PROFILE を BatchGetItem)"""
+        dynamodb, _ = await self._resources()
+        nicknames: dict[str, str | None] = {uid: None for uid in user_ids if uid}
+        try:
+            items = await batch_get_items(
+                dynamodb,
+                self.backend.table_name,
+                [{"PK": f"USER#{uid}", "SK": "PROFILE"} for uid in nicknames],
+                projection="userId, nickname",
+            )
+        except Exception as exc:
+            logger.warning(f"Failed to batch-get nicknames: {exc}")
+            return nicknames
+        for item in items:
+            nicknames[item["userId"]] = item.get("nickname")
+        return nicknames
+
+    async def _fill_legacy_nicknames(self, items: list[dict]) -> None:
+        """nickname スナップショットを持たない旧データだけプロフィールから補う"""
+        legacy = [item for item in items if "nickname" not in item]
+        if not legacy:
+            return
+        nicknames = await self._get_nicknames([item.get("userId") for item in legacy])
+        for item in legacy:
+            item["nickname"] = nicknames.get(item.get("userId"))
+
+    async def _items_to_posts(self, items: list[dict]) -> list[Post]:
+        await self._fill_legacy_nicknames(items)
+        return [self.backend._item_to_post(item) for item in items]
+
+    async def _author_nickname(self, user_id: str) -> str | None:
+        return (await self._get_nicknames([user_id])).get(user_id)
+
+    def _post_write_items(self, item: dict) -> list[dict]:
+        return self.backend._post_write_items(item)
+
+    def _post_delete_keys(self, old: dict) -> list[dict]:
+        return [self.backend._user_post_key(old), *tag_index_keys(old)]
+
+    def _created_post_dict(self, item: dict, body: CreatePostBody) -> dict:
+        return self.backend._created_post_dict(item, body)
+
+    def _deleted(self, post_id: str) -> dict:
+        return {"message": "Post deleted successfully"}
+
+    async def _post_response(self, item: dict) -> dict:
+        await self._fill_legacy_nicknames([item])
+        return self.backend._post_item_to_dict(item)
+
+    async def _updated_post_dict(self, item: dict) -> dict:
+        return await self._post_response(item)
+
+    async def get_profile(self, user_id):
+        _, table = await self._resources()
+        try:
+            response = await table.query(
+                IndexName="PostIdIndex",
+                KeyConditionExpression="postId = :pid",
+                ExpressionAttributeValues={":pid": f"PROFILE#{user_id}"},
+            )
+            items = response.get("Items", [])
+        except Exception as exc:
+            logger.error(f"Failed to get profile for {user_id}: {exc}")
+            items = []
+        if not items:
+            return ProfileResponse(
+                userId=user_id,
+                nickname=None,
+                bio=None,
+                avatarUrl=None,
+                createdAt=datetime.now(UTC).isoformat(),
+                updatedAt=None,
+            )
+        return self.backend._item_to_profile(user_id, items[0])
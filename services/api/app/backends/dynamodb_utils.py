@@ -0,0 +1,504 @@
+"""Helpers shared by the DynamoDB single-table backends (AwsBackend / LocalBackend)
+
+Tag index items:
+  PK=TAG#<tag>  SK=<post SK>  postPK=<post PK>
+
+A tag timeline is a Query on TAG#<tag> (descending, one page) followed by a
+BatchGetItem of the referenced post items, so it costs O(page) reads no matter
+how rare the tag is. Index items carry neither postId nor userId/createdAt and
+are therefore never projected into PostIdIndex / UserPostsIndex.
+
+Write sharding:
+  posts_shard_count = 1  ->  every post in PK=POSTS (legacy layout)
+  posts_shard_count = N  ->  PK=POSTS#<crc32(postId) % N>
+
+The timeline queries every shard (plus the legacy POSTS partition) in
+parallel and k-way merges the descending pages. Its page token carries one
+cursor per partition; an exhausted partition is recorded as null and is not
+queried again.
+
+Post handles:
+  postHandle = encode_page_token(pk=<post PK>, sk=<post SK>)
+
+Returned next to postId. A mutation addressed by handle goes straight to the
+base-table item (DeleteItem / UpdateItem with a ConditionExpression on postId
+and, for non-admins, userId) instead of first querying the eventually
+consistent PostIdIndex. Plain postIds keep using the GSI lookup.
+"""
+
+import heapq
+import logging
+import random
+import time
+import zlib
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any
+
+from app.backends.pagination import decode_page_token, encode_page_token
+
+logger = logging.getLogger(__name__)
+
+POSTS_PK = "POSTS"
+TAG_PK_PREFIX = "TAG#"
+
+_SHARD_QUERY_MAX_WORKERS = 16
+
+# BatchGetItem は 1 リクエストあたり最大 100 キー
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_MAX_RETRIES = 5
+BATCH_GET_BACKOFF_BASE = 0.05
+# BatchWriteItem は 1 リクエストあたり最大 25 件
+BATCH_WRITE_MAX_ITEMS = 25
+BATCH_WRITE_MAX_RETRIES = 8
+BATCH_WRITE_BACKOFF_BASE = 0.05
+BATCH_WRITE_BACKOFF_MAX = 2.0
+
+
+def posts_partition_keys(shard_count: int) -> list[str]:
+    """タイムラインを構成するパーティションキー (シャード有効時は旧 POSTS も含む)"""
+    if shard_count <= 1:
+        return [POSTS_PK]
+    return [POSTS_PK] + [f"{POSTS_PK}#{i}" for i in range(shard_count)]
+
+
+def posts_partition_for(post_id: str, shard_count: int) -> str:
+    """新規投稿の書き込み先パーティションキー (postId から決定的に算出)"""
+    if shard_count <= 1:
+        return POSTS_PK
+    return f"{POSTS_PK}#{zlib.crc32(post_id.encode()) % shard_count}"
+
+
+def encode_post_handle(post_item: dict) -> str:
+    """投稿アイテムのベーステーブルキーを埋め込んだハンドル"""
+    return encode_page_token(pk=post_item["PK"], sk=post_item["SK"])
+
+
+def decode_post_handle(value: str) -> tuple[dict, str] | None:
+    """ハンドルを (Key, postId) に展開 (通常の postId や不正な値は None)
+
+    POSTS パーティション以外のキー (USER# / TAG# など) を指すハンドルは拒否する。
+    """
+    data = decode_page_token(value)
+    if data is None:
+        return None
+    pk, sk = data.get("pk"), data.get("sk")
+    if not isinstance(pk, str) or not isinstance(sk, str) or "#" not in sk:
+        return None
+    if pk != POSTS_PK and not pk.startswith(f"{POSTS_PK}#"):
+        return None
+    return {"PK": pk, "SK": sk}, sk.rsplit("#", 1)[1]
+
+
+def post_update_fields(body: Any, now: str) -> dict[str, Any]:
+    """UpdatePostBody から SET する属性 (未指定フィールドは含めない)"""
+    fields: dict[str, Any] = {"updatedAt": now}
+    for attr, value in (
+        ("content", body.content),
+        ("isMarkdown", body.is_markdown),
+        ("tags", body.tags),
+        ("imageKeys", body.image_keys),
+    ):
+        if value is not None:
+            fields[attr] = value
+    return fields
+
+
+def conditional_post_write(
+    post_id: str, owner_id: str | None, fields: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """投稿への条件付き DeleteItem / UpdateItem の共通引数
+
+    postId の一致 (= アイテムが存在する) と、owner_id 指定時は userId の一致を条件にする。
+    fields を渡すと UpdateExpression も組み立てる。条件不成立時は
+    ReturnValuesOnConditionCheckFailure=ALL_OLD により 404 と 403 を区別できる。
+    """
+    condition = "postId = :condPostId"
+    values: dict[str, Any] = {":condPostId": post_id}
+    if owner_id is not None:
+        condition += " AND userId = :condUserId"
+        values[":condUserId"] = owner_id
+    kwargs: dict[str, Any] = {
+        "ConditionExpression": condition,
+        "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+    }
+    if fields:
+        kwargs["UpdateExpression"] = "SET " + ", ".join(
+            f"{attr} = :{attr}" for attr in fields
+        )
+        values.update({f":{attr}": value for attr, value in fields.items()})
+    kwargs["ExpressionAttributeValues"] = values
+    return kwargs
+
+
+def condition_failure(error: Exception) -> str | None:
+    """conditional_post_write の失敗理由 ("not_found" / "forbidden")。それ以外の例外は None"""
+    response = getattr(error, "response", None) or {}
+    if response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+        return None
+    return "forbidden" if response.get("Item") else "not_found"
+
+
+def decode_shard_cursors(
+    next_token: str | None, partitions: list[str]
+) -> dict[str, str | None]:
+    """ページトークンを パーティション -> カーソル SK に展開
+
+    "" は先頭から、None は読み切り済み。旧形式 (SK 文字列) は全パーティション共通の
+    カーソルとして扱う。トークンに無いパーティション (シャード数の増加) は
+    最も古いカーソル位置から読む。
+    """
+    if not next_token:
+        return {pk: "" for pk in partitions}
+    data = decode_page_token(next_token)
+    if data is None or not isinstance(data.get("s"), dict):
+        return {pk: next_token for pk in partitions}
+    cursors = data["s"]
+    known = [sk for sk in cursors.values() if sk]
+    fallback = min(known) if known else None
+    return {pk: cursors.get(pk, fallback) for pk in partitions}
+
+
+def query_posts_page(
+    table: Any,
+    shard_count: int,
+    limit: int,
+    next_token: str | None,
+) -> tuple[list[dict], str | None]:
+    """全シャードを降順に Query し、k-way マージで新しい順に limit 件を返す
+
+    Returns:
+        (新しい順の投稿アイテム, 次ページトークン)
+    """
+    cursors = decode_shard_cursors(next_token, posts_partition_keys(shard_count))
+
+    def query(pk: str) -> tuple[list[dict], bool]:
+        response = table.query(**shard_query_kwargs(pk, cursors[pk], limit))
+        return response.get("Items", []), "LastEvaluatedKey" in response
+
+    active = [pk for pk in cursors if cursors[pk] is not None]
+    if len(active) <= 1:
+        results = [query(pk) for pk in active]
+    else:
+        with ThreadPoolExecutor(
+            max_workers=min(len(active), _SHARD_QUERY_MAX_WORKERS)
+        ) as executor:
+            results = list(executor.map(query, active))
+    return merge_shard_pages(shard_count, cursors, active, results, limit)
+
+
+def shard_query_kwargs(pk: str, cursor: str, limit: int) -> dict[str, Any]:
+    """1 パーティションを cursor (SK) の続きから降順に Query する引数"""
+    kwargs: dict[str, Any] = {
+        "KeyConditionExpression": "PK = :pk",
+        "ExpressionAttributeValues": {":pk": pk},
+        "ScanIndexForward": False,
+        "Limit": limit,
+    }
+    if cursor:
+        kwargs["ExclusiveStartKey"] = {"PK": pk, "SK": cursor}
+    return kwargs
+
+
+def merge_shard_pages(
+    shard_count: int,
+    cursors: dict[str, str | None],
+    active: list[str],
+    results: list[tuple[list[dict], bool]],
+    limit: int,
+) -> tuple[list[dict], str | None]:
+    """各パーティションの (降順アイテム, 続きがあるか) をマージし、次ページトークンを作る
+
+    cursors は decode_shard_cursors の結果 (読み進めた位置で上書きする)。
+    """
+    items = list(islice(
+        heapq.merge(*(r[0] for r in results), key=lambda i: i["SK"], reverse=True),
+        limit,
+    ))
+
+    if shard_count <= 1:
+        # 単一パーティションは従来どおり SK そのものをトークンにする
+        has_more = bool(results) and results[0][1]
+        return items, (items[-1]["SK"] if has_more and items else None)
+
+    consumed: dict[str, int] = {}
+    for item in items:
+        cursors[item["PK"]] = item["SK"]
+        consumed[item["PK"]] = consumed.get(item["PK"], 0) + 1
+    for pk, (shard_items, has_more) in zip(active, results, strict=True):
+        if not has_more and consumed.get(pk, 0) == len(shard_items):
+            cursors[pk] = None
+
+    if all(sk is None for sk in cursors.values()):
+        return items, None
+    return items, encode_page_token(s=cursors)
+
+
+def tag_index_items(post_item: dict) -> list[dict]:
+    """投稿アイテムに対応するタグインデックスアイテムを生成"""
+    return [
+        {"PK": f"{TAG_PK_PREFIX}{tag}", "SK": post_item["SK"], "postPK": post_item["PK"]}
+        for tag in sorted(set(post_item.get("tags") or []))
+        if tag
+    ]
+
+
+def tag_index_keys(post_item: dict, tags: list[str] | None = None) -> list[dict]:
+    """投稿のタグインデックスアイテムのキー (tags 指定時はそのタグのみ)"""
+    if tags is None:
+        tags = post_item.get("tags") or []
+    return [
+        {"PK": f"{TAG_PK_PREFIX}{tag}", "SK": post_item["SK"]}
+        for tag in sorted(set(tags))
+        if tag
+    ]
+
+
+def sync_tag_index(table: Any, post_item: dict, new_tags: list[str]) -> None:
+    """タグ変更時に差分のタグインデックスアイテムだけを追加・削除"""
+    old_tags = set(post_item.get("tags") or [])
+    removed = sorted(old_tags - set(new_tags))
+    added = dict(post_item, tags=sorted(set(new_tags) - old_tags))
+    if not removed and not added["tags"]:
+        return
+    with table.batch_writer() as batch:
+        for key in tag_index_keys(post_item, removed):
+            batch.delete_item(Key=key)
+        for tag_item in tag_index_items(added):
+            batch.put_item(Item=tag_item)
+
+
+def batch_get_items(
+    dynamodb: Any,
+    table_name: str,
+    keys: list[dict],
+    projection: str | None = None,
+) -> list[dict]:
+    """BatchGetItem で keys のアイテムを取得 (100 件ごとに分割、UnprocessedKeys は再試行)
+
+    返却順は不定。存在しないキーは結果に含まれない。
+    """
+    results: list[dict] = []
+    for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+        request: dict[str, Any] = {"Keys": keys[start:start + BATCH_GET_MAX_KEYS]}
+        if projection:
+            request["ProjectionExpression"] = projection
+        request_items = {table_name: request}
+        for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+            res = dynamodb.batch_get_item(RequestItems=request_items)
+            results.extend(res.get("Responses", {}).get(table_name, []))
+            request_items = res.get("UnprocessedKeys") or {}
+            if not request_items:
+                break
+            time.sleep(BATCH_GET_BACKOFF_BASE * (2 ** attempt))
+        else:
+            logger.warning("BatchGetItem left unprocessed keys after retries")
+    return results
+
+
+def _write_request_key(request: dict) -> tuple[str, str]:
+    if "PutRequest" in request:
+        item = request["PutRequest"]["Item"]
+    else:
+        item = request["DeleteRequest"]["Key"]
+    return item["PK"], item["SK"]
+
+
+def batch_write_items(
+    dynamodb: Any,
+    table_name: str,
+    requests: list[dict],
+    owners: list[int],
+) -> set[int]:
+    """BatchWriteItem で requests を書き込み、書き込めなかった owner の集合を返す
+
+    requests は PutRequest / DeleteRequest のリストで、owners[i] は requests[i] が
+    属する呼び出し側の要素番号 (投稿 1 件 = 本体 + インデックスの複数リクエスト)。
+    25 件ごとに分割し、UnprocessedItems は指数バックオフ (ジッタ付き) で再試行する。
+    リトライ上限を超えた、または例外になったリクエストの owner を失敗として返す。
+    """
+    owner_by_key = {
+        _write_request_key(request): owner for request, owner in zip(requests, owners, strict=True)
+    }
+    failed: set[int] = set()
+    for start in range(0, len(requests), BATCH_WRITE_MAX_ITEMS):
+        pending = requests[start:start + BATCH_WRITE_MAX_ITEMS]
+        for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+            try:
+                res = dynamodb.batch_write_item(RequestItems={table_name: pending})
+            except Exception as exc:
+                logger.warning(f"BatchWriteItem failed: {exc!r}")
+                break
+            pending = (res.get("UnprocessedItems") or {}).get(table_name, [])
+            if not pending:
+                break
+            delay = min(BATCH_WRITE_BACKOFF_MAX, BATCH_WRITE_BACKOFF_BASE * (2 ** attempt))
+            time.sleep(random.uniform(delay / 2, delay))
+        else:
+            logger.warning(
+                f"BatchWriteItem left {len(pending)} unprocessed items after retries")
+        failed.update(owner_by_key[_write_request_key(r)] for r in pending)
+    return failed
+
+
+def get_post_items(
+    table: Any, dynamodb: Any, table_name: str, post_ids: list[str]
+) -> list[dict | None]:
+    """postId / ハンドルのリストを投稿アイテムに解決 (見つからない要素は None)
+
+    ハンドルは BatchGetItem でまとめて、通常の postId は PostIdIndex への Query を
+    並列に実行する。
+    """
+    found: list[dict | None] = [None] * len(post_ids)
+    by_key: dict[tuple[str, str], list[int]] = {}
+    plain: list[int] = []
+    for index, post_id in enumerate(post_ids):
+        decoded = decode_post_handle(post_id)
+        if decoded is None:
+            plain.append(index)
+        else:
+            key, _ = decoded
+            by_key.setdefault((key["PK"], key["SK"]), []).append(index)
+
+    if by_key:
+        keys = [{"PK": pk, "SK": sk} for pk, sk in by_key]
+        for item in batch_get_items(dynamodb, table_name, keys):
+            for index in by_key.get((item["PK"], item["SK"]), []):
+                if item.get("postId") == decode_post_handle(post_ids[index])[1]:
+                    found[index] = item
+
+    def lookup(index: int) -> dict | None:
+        items = table.query(
+            IndexName="PostIdIndex",
+            KeyConditionExpression="postId = :pid",
+            ExpressionAttributeValues={":pid": post_ids[index]},
+        ).get("Items", [])
+        return items[0] if items else None
+
+    if plain:
+        workers = min(_SHARD_QUERY_MAX_WORKERS, len(plain))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for index, item in zip(plain, pool.map(lookup, plain), strict=True):
+                found[index] = item
+    return found
+
+
+def batch_write_failure(index: int, post_id: str) -> dict:
+    """BatchWriteItem で書き込めなかった要素の結果 (スロットリング扱いで再試行を促す)
+
+    本体は書けてインデックスだけ失敗した可能性もあるため postId は返す。
+    """
+    return {
+        "index": index,
+        "postId": post_id,
+        "status": 503,
+        "error": "Write throttled, retry",
+    }
+
+
+def batch_delete_posts(
+    table: Any,
+    dynamodb: Any,
+    table_name: str,
+    post_ids: list[str],
+    owner_id: str | None,
+    extra_keys: Callable[[dict], list[dict]] | None = None,
+) -> list[dict]:
+    """投稿の一括削除 (本体 + タグインデックス + extra_keys(item) を BatchWriteItem で削除)
+
+    BatchWriteItem は条件式を持てないため、所有者チェック (owner_id 指定時) は
+    読み取り時点の値で行う。同じ投稿の重複指定は 1 回だけ削除し、同じ結果を返す。
+    結果の postId は解決後の値で、ハンドルで指定された要素は postHandle も返す。
+    """
+    items = get_post_items(table, dynamodb, table_name, post_ids)
+    results: list[dict | None] = [None] * len(post_ids)
+    duplicates: dict[int, int] = {}
+    first_index: dict[tuple[str, str], int] = {}
+    requests: list[dict] = []
+    owners: list[int] = []
+    for index, (post_id, item) in enumerate(zip(post_ids, items, strict=True)):
+        if item is None:
+            results[index] = {
+                "index": index, "postId": post_id, "status": 404, "error": "Post not found",
+            }
+            continue
+        if owner_id is not None and item["userId"] != owner_id:
+            results[index] = {
+                "index": index,
+                "postId": post_id,
+                "status": 403,
+                "error": "You can only delete your own posts",
+            }
+            continue
+        key = (item["PK"], item["SK"])
+        if key in first_index:
+            duplicates[index] = first_index[key]
+            continue
+        first_index[key] = index
+        delete_keys = [{"PK": item["PK"], "SK": item["SK"]}, *tag_index_keys(item)]
+        if extra_keys is not None:
+            delete_keys.extend(extra_keys(item))
+        for delete_key in delete_keys:
+            requests.append({"DeleteRequest": {"Key": delete_key}})
+            owners.append(index)
+
+    failed = batch_write_items(dynamodb, table_name, requests, owners)
+    for index in first_index.values():
+        if index in failed:
+            results[index] = batch_write_failure(index, post_ids[index])
+        else:
+            results[index] = {"index": index, "postId": post_ids[index], "status": 200}
+    for index, original in duplicates.items():
+        results[index] = {**results[original], "index": index, "postId": post_ids[index]}
+    for index, (post_id, item) in enumerate(zip(post_ids, items, strict=True)):
+        if item is not None and item["postId"] != post_id:
+            results[index] = {**results[index], "postId": item["postId"], "postHandle": post_id}
+    return results
+
+
+def query_tag_page(
+    table: Any,
+    dynamodb: Any,
+    tag: str,
+    limit: int,
+    next_token: str | None,
+) -> tuple[list[dict], str | None]:
+    """TAG#<tag> を降順に 1 ページ Query し、参照先の投稿アイテムを返す
+
+    Returns:
+        (新しい順の投稿アイテム, 次ページトークン = 最終タグアイテムの SK)
+    """
+    response = table.query(**tag_query_kwargs(tag, limit, next_token))
+    items = batch_get_items(dynamodb, table.name, tag_ref_keys(response))
+    return tag_page(response, items)
+
+
+def tag_query_kwargs(tag: str, limit: int, next_token: str | None) -> dict[str, Any]:
+    """TAG#<tag> を next_token (SK) の続きから降順に Query する引数"""
+    pk = f"{TAG_PK_PREFIX}{tag}"
+    kwargs: dict[str, Any] = {
+        "KeyConditionExpression": "PK = :pk",
+        "ExpressionAttributeValues": {":pk": pk},
+        "ScanIndexForward": False,
+        "Limit": limit,
+    }
+    if next_token:
+        kwargs["ExclusiveStartKey"] = {"PK": pk, "SK": next_token}
+    return kwargs
+
+
+def tag_ref_keys(response: dict) -> list[dict]:
+    """タグインデックスの Query 結果から参照先の投稿キーを取り出す"""
+    return [{"PK": ref["postPK"], "SK": ref["SK"]} for ref in response.get("Items", [])]
+
+
+def tag_page(response: dict, items: list[dict]) -> tuple[list[dict], str | None]:
+    """BatchGetItem で読んだ投稿を SK 降順に並べ、次ページトークンを付ける"""
+    # BatchGetItem は順序を保証しないため SK 降順に並べ直す
+    items.sort(key=lambda item: item["SK"], reverse=True)
+
+    output_next_token = None
+    if "LastEvaluatedKey" in response:
+        output_next_token = response["LastEvaluatedKey"]["SK"]
+    return items, output_next_token
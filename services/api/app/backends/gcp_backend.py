@@ -2,15 +2,24 @@
 
 import logging
 import uuid
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Any
 
 from app.auth import UserInfo
-from app.backends.base import BackendBase
+from app.backends.base import BackendBase, batch_error_result
+from app.backends.pagination import decode_page_token, encode_page_token
 from app.config import settings
 from app.models import CreatePostBody, Post, ProfileResponse, ProfileUpdateRequest
 
 logger = logging.getLogger(__name__)
 
+# Firestore WriteBatch は 1 バッチあたり最大 500 書き込み
+_FIRESTORE_BATCH_LIMIT = 500
+# IAM signBlob を並列に呼び出す最大スレッド数
+_SIGN_MAX_WORKERS = 16
+
 try:
     import google.auth
     import google.auth.transport.requests
@@ -55,6 +64,12 @@ class GcpBackend(BackendBase):
             f"bucket={self.bucket_name}"
         )
 
+    def warm_up(self) -> None:
+        """署名用アクセストークンを起動時に取得しておく (メタデータサーバー往復の前倒し)"""
+        credentials = self._gcs_credentials
+        if credentials is not None and not getattr(credentials, "valid", True):
+            credentials.refresh(self._gcs_auth_request)
+
     def _doc_to_post(self, doc) -> Post:
         """FirestoreドキュメントをPostモデルに変換"""
         data = doc.to_dict()
@@ -84,21 +99,49 @@ class GcpBackend(BackendBase):
             updatedAt=ts_to_str(data.get("updatedAt")),
         )
 
+    @staticmethod
+    def _page_token(doc) -> str:
+        """ドキュメントの (createdAt, ID) から次ページトークンを生成"""
+        created_at = (doc.to_dict() or {}).get("createdAt")
+        if hasattr(created_at, "isoformat"):
+            # Firestore Timestamp (DatetimeWithNanoseconds) は型情報付きで保持
+            return encode_page_token(c=created_at.isoformat(), ts=True, id=doc.id)
+        return encode_page_token(c=created_at, id=doc.id)
+
     def list_posts(
         self,
         limit: int,
         next_token: str | None,
         tag: str | None,
     ) -> tuple[list[Post], str | None]:
-        """Firestore から投稿一覧を取得"""
+        """Firestore から投稿一覧を取得 (1 ページ 1 往復)
+
+        next_token は最終ドキュメントの createdAt とドキュメントIDを持つ
+        不透明トークンで、start_after にフィールド値として直接渡す
+        (カーソル用ドキュメントの追加読み取りが不要)。
+        旧形式 (ドキュメントIDそのもの) のトークンも受け付ける。
+        """
         try:
             col = self.db.collection(self.posts_collection)
-            query = col.order_by(
-                "createdAt", direction=firestore.Query.DESCENDING
-            ).limit(limit + 1)
+            query = (
+                col.order_by("createdAt", direction=firestore.Query.DESCENDING)
+                .order_by(
+                    firestore.FieldPath.document_id(),
+                    direction=firestore.Query.DESCENDING,
+                )
+                .limit(limit + 1)
+            )
 
-            if next_token:
-                # next_token はドキュメントIDとして使用
+            cursor = decode_page_token(next_token)
+            if cursor is not None:
+                created_at = cursor.get("c")
+                if cursor.get("ts"):
+                    created_at = datetime.fromisoformat(created_at)
+                query = query.start_after(
+                    {"createdAt": created_at, "__name__": col.document(cursor["id"])}
+                )
+            elif next_token:
+                # 旧形式: next_token はドキュメントID
                 cursor_doc = col.document(next_token).get()
                 if cursor_doc.exists:
                     query = query.start_after(cursor_doc)
@@ -113,7 +156,7 @@ class GcpBackend(BackendBase):
             output_next_token = None
             if len(docs) > limit:
                 docs = docs[:limit]
-                output_next_token = docs[-1].id
+                output_next_token = self._page_token(docs[-1])
 
             posts = [self._doc_to_post(doc) for doc in docs]
             return posts, output_next_token
@@ -125,61 +168,140 @@ class GcpBackend(BackendBase):
     def create_post(self, body: CreatePostBody, user: UserInfo) -> dict:
         """Firestoreに投稿を作成"""
         try:
-            post_id = str(uuid.uuid4())
-            now = datetime.now(timezone.utc)
-            now_str = now.isoformat()
-
-            # プロフィールからnicknameを取得
-            nickname = None
-            try:
-                profile_doc = (
-                    self.db.collection(self.profiles_collection)
-                    .document(user.user_id)
-                    .get()
-                )
-                if profile_doc.exists:
-                    nickname = profile_doc.to_dict().get("nickname")
-            except Exception as e:
-                logger.warning("Failed to fetch nickname for %r: %r", user.user_id, e)
-
-            # 画像キーをURLに変換
-            image_urls = []
-            if body.image_keys:
-                image_urls = [
-                    f"https://storage.googleapis.com/{self.bucket_name}/{key}"
-                    for key in body.image_keys
-                ]
-
-            doc_data = {
-                "postId": post_id,
-                "userId": user.user_id,
-                "nickname": nickname,
-                "content": body.content,
-                "isMarkdown": body.is_markdown,
-                "imageUrls": image_urls,
-                "tags": body.tags or [],
-                "createdAt": now_str,
-                "updatedAt": None,
-            }
-
+            doc_data = self._new_post_doc(body, user, self._get_author_nickname(user.user_id))
+            post_id = doc_data["postId"]
             self.db.collection(self.posts_collection).document(post_id).set(doc_data)
             logger.info(f"Created post {post_id} by user {user.user_id}")
-
-            return Post(
-                postId=post_id,
-                userId=user.user_id,
-                nickname=nickname,
-                content=body.content,
-                isMarkdown=body.is_markdown,
-                imageUrls=image_urls,
-                tags=body.tags or [],
-                createdAt=now_str,
-            ).model_dump()
+            return self._created_post_dict(doc_data)
 
         except Exception as e:
             logger.error("Error creating post in Firestore: %r", e)
             raise
 
+    def create_posts(self, bodies: list[CreatePostBody], user: UserInfo) -> list[dict]:
+        """投稿を一括作成 (WriteBatch, 500 件ごとにコミット)"""
+        nickname = self._get_author_nickname(user.user_id)
+        docs = [self._new_post_doc(body, user, nickname) for body in bodies]
+        collection = self.db.collection(self.posts_collection)
+        errors = self._commit_in_batches(
+            [
+                (index, lambda batch, d=doc_data: batch.set(collection.document(d["postId"]), d))
+                for index, doc_data in enumerate(docs)
+            ]
+        )
+        return [
+            batch_error_result(index, errors[index], doc_data["postId"]) if index in errors else {
+                "index": index,
+                "postId": doc_data["postId"],
+                "status": 201,
+                "post": self._created_post_dict(doc_data),
+            }
+            for index, doc_data in enumerate(docs)
+        ]
+
+    def delete_posts(self, post_ids: list[str], user: UserInfo) -> list[dict]:
+        """投稿を一括削除 (get_all で 1 往復で読み取り、WriteBatch で削除)"""
+        from fastapi import HTTPException
+
+        collection = self.db.collection(self.posts_collection)
+        unique_ids = list(dict.fromkeys(post_ids))
+        snapshots = {
+            doc.id: doc
+            for doc in self.db.get_all([collection.document(pid) for pid in unique_ids])
+        }
+
+        errors: dict[int, Exception] = {}
+        writes: list[tuple[int, Callable[[Any], None]]] = []
+        first_index: dict[str, int] = {}
+        for index, post_id in enumerate(post_ids):
+            doc = snapshots.get(post_id)
+            if doc is None or not doc.exists:
+                errors[index] = HTTPException(status_code=404, detail="Post not found")
+            elif doc.to_dict().get("userId") != user.user_id:
+                errors[index] = HTTPException(status_code=403, detail="Not authorized")
+            elif post_id not in first_index:
+                first_index[post_id] = index
+                # 読み取り後に更新された投稿は update_time の事前条件で失敗させる
+                writes.append((
+                    index,
+                    lambda batch, d=doc: batch.delete(
+                        d.reference, option=self.db.write_option(last_update_time=d.update_time)
+                    ),
+                ))
+        errors.update(self._commit_in_batches(writes))
+
+        results = []
+        for index, post_id in enumerate(post_ids):
+            # 重複指定された投稿は最初の要素と同じ結果を返す
+            error = errors.get(index) or errors.get(first_index.get(post_id, index))
+            if error is not None:
+                results.append(batch_error_result(index, error, post_id))
+            else:
+                results.append({"index": index, "postId": post_id, "status": 200})
+        return results
+
+    def _commit_in_batches(
+        self, writes: list[tuple[int, Callable[[Any], None]]]
+    ) -> dict[int, Exception]:
+        """[(要素番号, batch に書き込みを追加する関数)] を WriteBatch で順にコミット
+
+        Returns:
+            失敗した要素番号 -> 例外 (WriteBatch はアトミックなので 1 バッチ単位で失敗する)
+        """
+        errors: dict[int, Exception] = {}
+        for start in range(0, len(writes), _FIRESTORE_BATCH_LIMIT):
+            chunk = writes[start:start + _FIRESTORE_BATCH_LIMIT]
+            batch = self.db.batch()
+            for _, add_write in chunk:
+                add_write(batch)
+            try:
+                batch.commit()
+            except Exception as e:
+                logger.warning("Firestore WriteBatch commit failed: %r", e)
+                errors.update({index: e for index, _ in chunk})
+        return errors
+
+    def _get_author_nickname(self, user_id: str) -> str | None:
+        """プロフィールから nickname を取得 (失敗時は None)"""
+        try:
+            profile_doc = self.db.collection(self.profiles_collection).document(user_id).get()
+            if profile_doc.exists:
+                return profile_doc.to_dict().get("nickname")
+        except Exception as e:
+            logger.warning("Failed to fetch nickname for %r: %r", user_id, e)
+        return None
+
+    def _new_post_doc(self, body: CreatePostBody, user: UserInfo, nickname: str | None) -> dict:
+        # 画像キーをURLに変換
+        image_urls = [
+            f"https://storage.googleapis.com/{self.bucket_name}/{key}"
+            for key in body.image_keys or []
+        ]
+        return {
+            "postId": str(uuid.uuid4()),
+            "userId": user.user_id,
+            "nickname": nickname,
+            "content": body.content,
+            "isMarkdown": body.is_markdown,
+            "imageUrls": image_urls,
+            "tags": body.tags or [],
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "updatedAt": None,
+        }
+
+    @staticmethod
+    def _created_post_dict(doc_data: dict) -> dict:
+        return Post(
+            postId=doc_data["postId"],
+            userId=doc_data["userId"],
+            nickname=doc_data["nickname"],
+            content=doc_data["content"],
+            isMarkdown=doc_data["isMarkdown"],
+            imageUrls=doc_data["imageUrls"],
+            tags=doc_data["tags"],
+            createdAt=doc_data["createdAt"],
+        ).model_dump()
+
     def get_post(self, post_id: str):
         """Firestoreから投稿を1件取得"""
         try:
@@ -237,32 +359,34 @@ class GcpBackend(BackendBase):
             if not doc.exists:
                 return ProfileResponse(userId=user_id)
 
-            data = doc.to_dict()
-
-            def ts_to_str(ts) -> str | None:
-                if ts is None:
-                    return None
-                if hasattr(ts, "isoformat"):
-                    return ts.isoformat()
-                if hasattr(ts, "timestamp"):
-                    return datetime.fromtimestamp(
-                        ts.timestamp(), tz=timezone.utc
-                    ).isoformat()
-                return str(ts)
-
-            return ProfileResponse(
-                userId=user_id,
-                nickname=data.get("nickname"),
-                bio=data.get("bio"),
-                avatarUrl=data.get("avatarUrl"),
-                createdAt=ts_to_str(data.get("createdAt")),
-                updatedAt=ts_to_str(data.get("updatedAt")),
-            )
+            return self._data_to_profile(user_id, doc.to_dict())
 
         except Exception as e:
             logger.error("Error getting profile %r from Firestore: %r", user_id, e)
             raise
 
+    @staticmethod
+    def _data_to_profile(user_id: str, data: dict) -> ProfileResponse:
+        def ts_to_str(ts) -> str | None:
+            if ts is None:
+                return None
+            if hasattr(ts, "isoformat"):
+                return ts.isoformat()
+            if hasattr(ts, "timestamp"):
+                return datetime.fromtimestamp(
+                    ts.timestamp(), tz=timezone.utc
+                ).isoformat()
+            return str(ts)
+
+        return ProfileResponse(
+            userId=user_id,
+            nickname=data.get("nickname"),
+            bio=data.get("bio"),
+            avatarUrl=data.get("avatarUrl"),
+            createdAt=ts_to_str(data.get("createdAt")),
+            updatedAt=ts_to_str(data.get("updatedAt")),
+        )
+
     def update_profile(
         self,
         user: UserInfo,
@@ -285,20 +409,47 @@ class GcpBackend(BackendBase):
                     f"https://storage.googleapis.com/{self.bucket_name}/{body.avatar_key}"
                 )
 
+            # 読み込んだドキュメントに更新内容をマージして返す (1 read + 1 write)
             doc = doc_ref.get()
             if not doc.exists:
                 update_data["createdAt"] = now_str
                 update_data["userId"] = user.user_id
                 doc_ref.set(update_data)
+                data = update_data
             else:
                 doc_ref.update(update_data)
+                data = {**doc.to_dict(), **update_data}
 
-            return self.get_profile(user.user_id)
+            return self._data_to_profile(user.user_id, data)
 
         except Exception as e:
             logger.error("Error updating profile %r in Firestore: %r", user.user_id, e)
             raise
 
+    def refresh_author_snapshot(self, user_id: str, nickname: str | None) -> int:
+        """ユーザーの全投稿の nickname を WriteBatch で更新 (userId で Query)"""
+        query = (
+            self.db.collection(self.posts_collection)
+            .where(filter=firestore.FieldFilter("userId", "==", user_id))
+            .select([])
+        )
+        updated = 0
+        batch = self.db.batch()
+        pending = 0
+        for doc in query.stream():
+            batch.update(doc.reference, {"nickname": nickname})
+            pending += 1
+            if pending == _FIRESTORE_BATCH_LIMIT:
+                batch.commit()
+                updated += pending
+                batch = self.db.batch()
+                pending = 0
+        if pending:
+            batch.commit()
+            updated += pending
+        logger.info("Refreshed author snapshot on %d posts for %r", updated, user_id)
+        return updated
+
     def generate_upload_urls(
         self,
         count: int,
@@ -340,8 +491,7 @@ class GcpBackend(BackendBase):
                 raise RuntimeError("GCP_SERVICE_ACCOUNT env var is not set")
 
             bucket = self.storage_client.bucket(self.bucket_name)
-            urls = []
-
+            targets = []
             for i in range(count):
                 ct = (
                     content_types[i]
@@ -349,9 +499,11 @@ class GcpBackend(BackendBase):
                     else None
                 ) or "image/jpeg"
                 ext = ext_map.get(ct, "jpg")
-                key = f"images/{user.user_id}/{uuid.uuid4()}.{ext}"
-                blob = bucket.blob(key)
-                upload_url = blob.generate_signed_url(
+                targets.append((f"images/{user.user_id}/{uuid.uuid4()}.{ext}", ct))
+
+            def sign(target: tuple[str, str]) -> dict[str, str]:
+                key, ct = target
+                upload_url = bucket.blob(key).generate_signed_url(
                     version="v4",
                     expiration=timedelta(seconds=settings.presigned_url_expiry),
                     method="PUT",
@@ -359,9 +511,16 @@ class GcpBackend(BackendBase):
                     service_account_email=sa_email,
                     access_token=access_token,
                 )
-                urls.append({"url": upload_url, "key": key})
-
-            return urls
+                return {"url": upload_url, "key": key}
+
+            # signBlob は 1 呼び出し 1 署名のため、URL ごとの IAM 呼び出しを並列化して
+            # N 枚のアップロードでも 1 往復分のレイテンシに収める
+            if len(targets) <= 1:
+                return [sign(t) for t in targets]
+            with ThreadPoolExecutor(
+                max_workers=min(len(targets), _SIGN_MAX_WORKERS)
+            ) as executor:
+                return list(executor.map(sign, targets))
 
         except Exception as e:
             logger.error("Error generating upload URLs for GCS: %r", e)
@@ -7,9 +7,15 @@ Table: simple-sns-local  (configured via DYNAMODB_TABLE_NAME)
 GSI:   PostIdIndex        (hash key: postId, projection: ALL)
 
 Item types:
-  Post    PK=POSTS          SK=<ISO timestamp>#<uuid>
-  Profile PK=USER#<userId>  SK=PROFILE
-          postId=PROFILE#<userId>  (used by PostIdIndex for profile lookups)
+  Post     PK=POSTS          SK=<ISO timestamp>#<uuid>
+           (PK=POSTS#<n> when POSTS_SHARD_COUNT > 1, see dynamodb_utils.py)
+           nickname=<author snapshot, rewritten by refresh_author_snapshot>
+  Profile  PK=USER#<userId>  SK=PROFILE
+           postId=PROFILE#<userId>  (used by PostIdIndex for profile lookups)
+  UserPost PK=USER#<userId>  SK=POST#<post SK>  postPK=<post PK>
+           (adjacency item: per-user post index for nickname fan-out)
+  TagIndex PK=TAG#<tag>      SK=<post SK>        postPK=<post PK>
+           (tag timeline index, see app/backends/dynamodb_utils.py)
 """
 
 import logging
@@ -26,6 +32,24 @@ from fastapi import HTTPException, status
 
 from app.auth import UserInfo
 from app.backends.base import BackendBase
+from app.backends.dynamodb_utils import (
+    POSTS_PK,
+    batch_delete_posts,
+    batch_get_items,
+    batch_write_failure,
+    batch_write_items,
+    condition_failure,
+    conditional_post_write,
+    decode_post_handle,
+    encode_post_handle,
+    post_update_fields,
+    posts_partition_for,
+    query_posts_page,
+    query_tag_page,
+    sync_tag_index,
+    tag_index_items,
+    tag_index_keys,
+)
 from app.config import settings
 from app.models import (
     CreatePostBody,
@@ -37,7 +61,7 @@ from app.models import (
 
 logger = logging.getLogger(__name__)
 
-_POSTS_PK = "POSTS"
+_USER_POST_SK_PREFIX = "POST#"
 
 
 class LocalBackend(BackendBase):
@@ -51,24 +75,29 @@ class LocalBackend(BackendBase):
     # Initialisation
     # ------------------------------------------------------------------
 
+    @staticmethod
+    def dynamodb_resource_kwargs() -> dict:
+        """DynamoDB Local 用の resource() 引数 (aioboto3 のネイティブ async 版とも共有)"""
+        return {
+            "endpoint_url": settings.dynamodb_endpoint or "http://localhost:8001",
+            "aws_access_key_id": os.environ.get("AWS_ACCESS_KEY_ID", "local"),
+            "aws_secret_access_key": os.environ.get(
+                "AWS_SECRET_ACCESS_KEY", "local"),
+            "region_name": settings.aws_region or "ap-northeast-1",
+        }
+
     def _init_dynamodb(self):
         """DynamoDB Local への接続を初期化し、テーブルを自動作成する"""
-        endpoint = settings.dynamodb_endpoint or "http://localhost:8001"
+        resource_kwargs = self.dynamodb_resource_kwargs()
         table_name = settings.dynamodb_table_name or "simple-sns-local"
 
-        self.dynamodb = boto3.resource(
-            "dynamodb",
-            endpoint_url=endpoint,
-            aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID", "local"),
-            aws_secret_access_key=os.environ.get(
-                "AWS_SECRET_ACCESS_KEY", "local"),
-            region_name=settings.aws_region or "ap-northeast-1",
-        )
+        self.dynamodb = boto3.resource("dynamodb", **resource_kwargs)
         self.table_name = table_name
         self._ensure_table()
         self.table = self.dynamodb.Table(table_name)
         logger.info(
-            f"DynamoDB Local connected: endpoint={endpoint}, table={table_name}")
+            f"DynamoDB Local connected: endpoint={resource_kwargs['endpoint_url']}, "
+            f"table={table_name}")
 
     def _ensure_table(self):
         """テーブルが存在しなければ作成する（PostIdIndex GSI 付き）"""
@@ -170,34 +199,109 @@ class LocalBackend(BackendBase):
             createdAt=item.get("createdAt", ""),
             updatedAt=item.get("updatedAt"),
             nickname=item.get("nickname"),
+            postHandle=encode_post_handle(item),
         )
 
     def _get_nickname(self, user_id: str) -> Optional[str]:
+        return self._get_nicknames([user_id]).get(user_id)
+
+    def _get_nicknames(self, user_ids: list[str]) -> dict[str, str | None]:
+        """USER#<id>/PROFILE を BatchGetItem でまとめて取得し userId → nickname を返す
+
+        1 ページ分の著者は 1 往復で解決する (UnprocessedKeys は指数バックオフで再試行)。
+        """
+        nicknames: dict[str, str | None] = {
+            uid: None for uid in user_ids if uid}
         try:
-            res = self.table.query(
+            items = batch_get_items(
+                self.dynamodb,
+                self.table_name,
+                [{"PK": f"USER#{uid}", "SK": "PROFILE"} for uid in nicknames],
+                projection="userId, nickname",
+            )
+        except Exception as exc:
+            logger.warning(f"Failed to batch-get nicknames: {exc}")
+            return nicknames
+        for item in items:
+            nicknames[item["userId"]] = item.get("nickname")
+        return nicknames
+
+    def _find_post_item(self, post_id: str) -> dict | None:
+        """GSI で postId から DynamoDB アイテムを取得 (ハンドルなら GetItem、無ければ None)"""
+        decoded = decode_post_handle(post_id)
+        if decoded is not None:
+            key, post_id = decoded
+            item = self.table.get_item(Key=key).get("Item")
+            items = [item] if item and item.get("postId") == post_id else []
+        else:
+            response = self.table.query(
                 IndexName="PostIdIndex",
                 KeyConditionExpression="postId = :pid",
-                ExpressionAttributeValues={":pid": f"PROFILE#{user_id}"},
+                ExpressionAttributeValues={":pid": post_id},
             )
-            items = res.get("Items", [])
-            return items[0].get("nickname") if items else None
-        except Exception:
-            return None
+            items = response.get("Items", [])
+        return items[0] if items else None
 
     def _get_post_item_by_id(self, post_id: str) -> dict:
-        """GSI で postId から DynamoDB アイテムを取得"""
-        response = self.table.query(
-            IndexName="PostIdIndex",
-            KeyConditionExpression="postId = :pid",
-            ExpressionAttributeValues={":pid": post_id},
-        )
-        items = response.get("Items", [])
-        if not items:
+        """_find_post_item と同じ (無ければ 404)"""
+        item = self._find_post_item(post_id)
+        if item is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Post not found",
             )
-        return items[0]
+        return item
+
+    def _resolve_post_key(self, post_id: str, user: UserInfo, action: str) -> tuple[dict, str]:
+        """更新・削除対象のベーステーブルキーと postId を解決
+
+        ハンドルならキーをそのまま使い、所有者チェックは条件式に任せる (読み取りなし)。
+        通常の postId は PostIdIndex で引き、ここで所有者をチェックする。
+        """
+        decoded = decode_post_handle(post_id)
+        if decoded is not None:
+            return decoded
+        item = self._get_post_item_by_id(post_id)
+        if item["userId"] != user.user_id and not user.is_admin:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"You can only {action} your own posts",
+            )
+        return {"PK": item["PK"], "SK": item["SK"]}, item["postId"]
+
+    @staticmethod
+    def _raise_condition_failure(error: Exception, action: str) -> None:
+        reason = condition_failure(error)
+        if reason == "not_found":
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Post not found",
+            ) from error
+        if reason == "forbidden":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"You can only {action} your own posts",
+            ) from error
+
+    @staticmethod
+    def _user_post_item(user_id: str, post_item: dict) -> dict:
+        """投稿の adjacency アイテム (USER#<id> / POST#<SK>) を生成
+
+        postId / userId / createdAt を持たせないことで GSI には投影されない。
+        """
+        return {
+            "PK": f"USER#{user_id}",
+            "SK": f"{_USER_POST_SK_PREFIX}{post_item['SK']}",
+            "postPK": post_item["PK"],
+        }
+
+    @staticmethod
+    def _user_post_key(post_item: dict) -> dict:
+        """投稿の adjacency アイテムのキー"""
+        return {
+            "PK": f"USER#{post_item['userId']}",
+            "SK": f"{_USER_POST_SK_PREFIX}{post_item['SK']}",
+        }
 
     # ------------------------------------------------------------------
     # BackendBase implementation
@@ -209,50 +313,75 @@ class LocalBackend(BackendBase):
         next_token: Optional[str],
         tag: Optional[str],
     ) -> tuple[list[Post], Optional[str]]:
-        """投稿一覧を取得（PK=POSTS, 降順）"""
-        kwargs: dict = {
-            "KeyConditionExpression": "PK = :pk",
-            "ExpressionAttributeValues": {":pk": _POSTS_PK},
-            "ScanIndexForward": False,
-            "Limit": limit,
-        }
-        if next_token:
-            kwargs["ExclusiveStartKey"] = {"PK": _POSTS_PK, "SK": next_token}
+        """投稿一覧を取得（POSTS シャードを降順マージ。タグ指定時は TAG#<tag> インデックス）"""
         if tag:
-            kwargs["FilterExpression"] = "contains(tags, :tag)"
-            kwargs["ExpressionAttributeValues"][":tag"] = tag
-
-        response = self.table.query(**kwargs)
-        items = response.get("Items", [])
-
-        # プロフィール（ニックネーム）をまとめて取得
-        user_ids = list({item.get("userId")
-                        for item in items if item.get("userId")})
-        nicknames: dict[str, Optional[str]] = {}
-        for uid in user_ids:
-            nicknames[uid] = self._get_nickname(uid)
+            items, output_next_token = query_tag_page(
+                self.table, self.dynamodb, tag, limit, next_token)
+            return self._items_to_posts(items), output_next_token
+
+        items, output_next_token = query_posts_page(
+            self.table, settings.posts_shard_count, limit, next_token)
+        return self._items_to_posts(items), output_next_token
+
+    def _items_to_posts(self, items: list[dict]) -> list[Post]:
+        """投稿アイテムを Post に変換"""
+        # nickname は投稿に非正規化済み。属性を持たない旧データのみ
+        # プロフィールを BatchGetItem 1 往復でまとめて取得する
+        legacy_user_ids = [
+            item.get("userId") for item in items if "nickname" not in item
+        ]
+        nicknames = self._get_nicknames(
+            legacy_user_ids) if legacy_user_ids else {}
 
         posts = []
         for item in items:
-            item["nickname"] = nicknames.get(item.get("userId"))
+            if "nickname" not in item:
+                item["nickname"] = nicknames.get(item.get("userId"))
             posts.append(self._item_to_post(item))
-
-        output_next_token = None
-        if "LastEvaluatedKey" in response:
-            output_next_token = response["LastEvaluatedKey"]["SK"]
-
-        return posts, output_next_token
+        return posts
 
     def create_post(self, body: CreatePostBody, user: UserInfo) -> dict:
         """投稿を作成"""
+        item = self._new_post_item(body, user, self._get_nickname(user.user_id))
+        with self.table.batch_writer() as batch:
+            for write_item in self._post_write_items(item):
+                batch.put_item(Item=write_item)
+        return self._created_post_dict(item, body)
+
+    def create_posts(self, bodies: list[CreatePostBody], user: UserInfo) -> list[dict]:
+        """投稿を一括作成 (BatchWriteItem, 未処理アイテムはバックオフ付きで再試行)"""
+        nickname = self._get_nickname(user.user_id)
+        items = [self._new_post_item(body, user, nickname) for body in bodies]
+        requests: list[dict] = []
+        owners: list[int] = []
+        for index, item in enumerate(items):
+            for write_item in self._post_write_items(item):
+                requests.append({"PutRequest": {"Item": write_item}})
+                owners.append(index)
+        failed = batch_write_items(self.dynamodb, self.table_name, requests, owners)
+
+        results = []
+        for index, (item, body) in enumerate(zip(items, bodies, strict=True)):
+            if index in failed:
+                results.append(batch_write_failure(index, item["postId"]))
+            else:
+                results.append({
+                    "index": index,
+                    "postId": item["postId"],
+                    "status": 201,
+                    "post": self._created_post_dict(item, body),
+                })
+        return results
+
+    def _new_post_item(self, body: CreatePostBody, user: UserInfo, nickname: str | None) -> dict:
         post_id = str(uuid.uuid4())
         now = datetime.now(timezone.utc).isoformat()
-
-        item = {
-            "PK": _POSTS_PK,
+        return {
+            "PK": posts_partition_for(post_id, settings.posts_shard_count),
             "SK": f"{now}#{post_id}",
             "postId": post_id,
             "userId": user.user_id,
+            "nickname": nickname,
             "content": body.content,
             "isMarkdown": body.is_markdown or False,
             "tags": body.tags or [],
@@ -260,40 +389,68 @@ class LocalBackend(BackendBase):
             "createdAt": now,
             "updatedAt": now,
         }
-        self.table.put_item(Item=item)
 
+    def _post_write_items(self, item: dict) -> list[dict]:
+        """投稿 1 件分の書き込みアイテム (本体 + adjacency + タグインデックス)"""
+        return [item, self._user_post_item(item["userId"], item), *tag_index_items(item)]
+
+    def _created_post_dict(self, item: dict, body: CreatePostBody) -> dict:
         return {
-            "postId": post_id,
-            "userId": user.user_id,
-            "nickname": self._get_nickname(user.user_id),
+            "postId": item["postId"],
+            "postHandle": encode_post_handle(item),
+            "userId": item["userId"],
+            "nickname": item["nickname"],
             "content": body.content,
             "isMarkdown": body.is_markdown or False,
             "imageKeys": body.image_keys,
             "imageUrls": self._build_image_urls(body.image_keys or []),
             "tags": body.tags,
-            "createdAt": now,
+            "createdAt": item["createdAt"],
         }
     
     def delete_post(self, post_id: str, user: UserInfo) -> dict:
-        """投稿を削除"""
-        item = self._get_post_item_by_id(post_id)
-        if item["userId"] != user.user_id and not user.is_admin:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only delete your own posts",
-            )
-        
-        self.table.delete_item(
-            Key={"PK": _POSTS_PK, "SK": item["SK"]}
-        )
-        
+        """投稿を削除 (post_id には postId またはハンドルを指定できる)"""
+        key, resolved_id = self._resolve_post_key(post_id, user, "delete")
+        try:
+            old = self.table.delete_item(
+                Key=key,
+                ReturnValues="ALL_OLD",
+                **conditional_post_write(
+                    resolved_id, None if user.is_admin else user.user_id
+                ),
+            )["Attributes"]
+        except ClientError as e:
+            self._raise_condition_failure(e, "delete")
+            raise
+
+        with self.table.batch_writer() as batch:
+            batch.delete_item(Key=self._user_post_key(old))
+            for tag_key in tag_index_keys(old):
+                batch.delete_item(Key=tag_key)
+
         return {"message": "Post deleted successfully"}
 
-    def get_post(self, post_id: str) -> dict:
-        """投稿を取得"""
-        item = self._get_post_item_by_id(post_id)
+    def delete_posts(self, post_ids: list[str], user: UserInfo) -> list[dict]:
+        """投稿を一括削除 (BatchGetItem / 並列 GSI Query で解決し BatchWriteItem で削除)"""
+        return batch_delete_posts(
+            self.table,
+            self.dynamodb,
+            self.table_name,
+            post_ids,
+            owner_id=None if user.is_admin else user.user_id,
+            extra_keys=lambda item: [self._user_post_key(item)],
+        )
+
+    def get_post(self, post_id: str) -> dict | None:
+        """投稿を取得 (存在しない場合は None)"""
+        item = self._find_post_item(post_id)
+        return self._post_item_to_dict(item) if item is not None else None
+
+    def _post_item_to_dict(self, item: dict) -> dict:
+        """投稿アイテムをレスポンス dict に変換 (nickname スナップショットが無い旧データのみ追加取得)"""
         return {
             "postId": item["postId"],
+            "postHandle": encode_post_handle(item),
             "userId": item.get("userId"),
             "content": item.get("content"),
             "isMarkdown": bool(item.get("isMarkdown", False)),
@@ -301,40 +458,33 @@ class LocalBackend(BackendBase):
             "imageUrls": self._build_image_urls(list(item.get("imageKeys", []))),
             "createdAt": item.get("createdAt"),
             "updatedAt": item.get("updatedAt"),
-            "nickname": self._get_nickname(item.get("userId", "")),
+            "nickname": (
+                item["nickname"] if "nickname" in item
+                else self._get_nickname(item.get("userId", ""))
+            ),
         }
 
     def update_post(self, post_id: str, body: UpdatePostBody, user: UserInfo) -> dict:
-        """投稿を更新"""
-        item = self._get_post_item_by_id(post_id)
-        if item["userId"] != user.user_id and not user.is_admin:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only update your own posts",
-            )
-        now = datetime.now(timezone.utc).isoformat()
-        update_expr = "SET updatedAt = :now"
-        expr_values: dict = {":now": now}
-
-        if body.content is not None:
-            update_expr += ", content = :content"
-            expr_values[":content"] = body.content
-        if getattr(body, "is_markdown", None) is not None:
-            update_expr += ", isMarkdown = :isMarkdown"
-            expr_values[":isMarkdown"] = body.is_markdown
+        """投稿を更新 (post_id には postId またはハンドルを指定できる)"""
+        key, resolved_id = self._resolve_post_key(post_id, user, "update")
+        fields = post_update_fields(body, datetime.now(timezone.utc).isoformat())
+
+        # 旧タグの差分更新のため ALL_OLD を受け取り、更新後の値はローカルで合成する
+        # (GSI の再クエリなし: 通常の postId で 1 read + 1 write、ハンドルなら 1 write)
+        try:
+            old = self.table.update_item(
+                Key=key,
+                ReturnValues="ALL_OLD",
+                **conditional_post_write(
+                    resolved_id, None if user.is_admin else user.user_id, fields
+                ),
+            )["Attributes"]
+        except ClientError as e:
+            self._raise_condition_failure(e, "update")
+            raise
         if body.tags is not None:
-            update_expr += ", tags = :tags"
-            expr_values[":tags"] = body.tags
-        if body.image_keys is not None:
-            update_expr += ", imageKeys = :imageKeys"
-            expr_values[":imageKeys"] = body.image_keys
-
-        self.table.update_item(
-            Key={"PK": _POSTS_PK, "SK": item["SK"]},
-            UpdateExpression=update_expr,
-            ExpressionAttributeValues=expr_values,
-        )
-        return self.get_post(post_id)
+            sync_tag_index(self.table, old, body.tags)
+        return self._post_item_to_dict({**old, **fields})
 
     def get_profile(self, user_id: str) -> ProfileResponse:
         """プロフィールを取得"""
@@ -359,7 +509,9 @@ class LocalBackend(BackendBase):
                 updatedAt=None,
             )
 
-        item = items[0]
+        return self._item_to_profile(user_id, items[0])
+
+    def _item_to_profile(self, user_id: str, item: dict) -> ProfileResponse:
         avatar_url = None
         if item.get("avatarKey"):
             urls = self._build_image_urls([item["avatarKey"]])
@@ -375,31 +527,68 @@ class LocalBackend(BackendBase):
         )
 
     def update_profile(self, user: UserInfo, body: ProfileUpdateRequest) -> ProfileResponse:
-        """プロフィールを更新（UPSERT）"""
+        """プロフィールを更新（UPSERT, update_item 1 回で更新後の値も受け取る）"""
         now = datetime.now(timezone.utc).isoformat()
-        pk = f"USER#{user.user_id}"
-        sk = "PROFILE"
-
-        try:
-            existing = self.table.get_item(
-                Key={"PK": pk, "SK": sk}).get("Item")
-        except Exception:
-            existing = None
-
-        created_at = existing.get("createdAt", now) if existing else now
+        update_expr = (
+            "SET postId = :postId, userId = :userId, updatedAt = :now, "
+            "createdAt = if_not_exists(createdAt, :now)"
+        )
+        expr_values: dict = {
+            ":postId": f"PROFILE#{user.user_id}",
+            ":userId": user.user_id,
+            ":now": now,
+        }
+        # 空文字・未指定のフィールドは既存値を保持する
+        for attr, value in (
+            ("nickname", body.nickname),
+            ("bio", body.bio),
+            ("avatarKey", body.avatar_key),
+        ):
+            if value:
+                update_expr += f", {attr} = :{attr}"
+                expr_values[f":{attr}"] = value
+
+        response = self.table.update_item(
+            Key={"PK": f"USER#{user.user_id}", "SK": "PROFILE"},
+            UpdateExpression=update_expr,
+            ExpressionAttributeValues=expr_values,
+            ReturnValues="ALL_NEW",
+        )
+        return self._item_to_profile(user.user_id, response["Attributes"])
 
-        self.table.put_item(Item={
-            "PK": pk,
-            "SK": sk,
-            "postId": f"PROFILE#{user.user_id}",
-            "userId": user.user_id,
-            "nickname": body.nickname or (existing.get("nickname") if existing else None),
-            "bio": body.bio or (existing.get("bio") if existing else None),
-            "avatarKey": body.avatar_key or (existing.get("avatarKey") if existing else None),
-            "createdAt": created_at,
-            "updatedAt": now,
-        })
-        return self.get_profile(user.user_id)
+    def refresh_author_snapshot(self, user_id: str, nickname: str | None) -> int:
+        """USER#<id> / POST# の adjacency アイテムを Query し、各投稿の nickname を更新"""
+        kwargs: dict = {
+            "KeyConditionExpression": "PK = :pk AND begins_with(SK, :prefix)",
+            "ExpressionAttributeValues": {
+                ":pk": f"USER#{user_id}",
+                ":prefix": _USER_POST_SK_PREFIX,
+            },
+        }
+        updated = 0
+        while True:
+            response = self.table.query(**kwargs)
+            for ref in response.get("Items", []):
+                try:
+                    self.table.update_item(
+                        Key={
+                            "PK": ref.get("postPK", POSTS_PK),
+                            "SK": ref["SK"][len(_USER_POST_SK_PREFIX):],
+                        },
+                        UpdateExpression="SET nickname = :nickname",
+                        ConditionExpression="attribute_exists(PK)",
+                        ExpressionAttributeValues={":nickname": nickname},
+                    )
+                    updated += 1
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        raise
+            if "LastEvaluatedKey" not in response:
+                break
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        logger.info(
+            f"Refreshed author snapshot on {updated} posts for {user_id}")
+        return updated
 
     def generate_upload_urls(self, count: int, user: UserInfo, content_types: Optional[list[str]] = None) -> list[dict[str, str]]:
         """画像アップロード用の署名付き URL を生成"""
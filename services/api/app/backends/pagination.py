@@ -0,0 +1,35 @@
+"""Opaque, self-describing pagination tokens shared by the backends
+
+A token is the URL-safe base64 of a small JSON object carrying the sort key
+of the last item on the page (keyset pagination). Decoding never raises:
+anything that is not a token produced by encode_page_token yields None, so
+callers can fall back to their legacy token formats.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any
+
+_TOKEN_VERSION = 1
+
+
+def encode_page_token(**fields: Any) -> str:
+    """フィールドを不透明なページネーショントークンにエンコード"""
+    payload = json.dumps({"v": _TOKEN_VERSION, **fields}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_page_token(token: str | None) -> dict[str, Any] | None:
+    """encode_page_token のトークンをデコード (形式が異なる場合は None)"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("v") != _TOKEN_VERSION:
+        return None
+    data.pop("v")
+    return data
@@ -0,0 +1,92 @@
+"""Process-local cache for signed read URLs (TTL + LRU)
+
+Provider-neutral: AwsBackend caches S3 presigned GET URLs and AzureBackend
+caches Blob read SAS URLs with the same semantics.
+
+Signing a read URL (SigV4 presign, SAS, ...) for every image key on every
+timeline request is pure CPU work whose result stays valid for a long time.
+SignedUrlCache keeps the signed URL per object key until ``refresh_margin``
+seconds before it expires, so a client never receives a URL that is about to
+die, and identical URLs are returned between requests (browser / CDN cacheable).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+_PURGE_INTERVAL_SECONDS = 1.0
+
+
+class SignedUrlCache:
+    """署名付き読み取り URL のプロセス内キャッシュ (TTL + LRU, スレッドセーフ)"""
+
+    def __init__(
+        self,
+        url_expiry_seconds: int,
+        refresh_margin_seconds: int,
+        max_entries: int,
+    ):
+        """
+        Args:
+            url_expiry_seconds: 署名する URL の有効期間
+            refresh_margin_seconds: URL 失効の何秒前にキャッシュから外すか
+            max_entries: 保持する最大エントリ数 (超過時はまず期限切れを、
+                次に最も古く使われたものを破棄)
+        """
+        self.url_expiry_seconds = url_expiry_seconds
+        self._lifetime = max(url_expiry_seconds - refresh_margin_seconds, 0)
+        self._max_entries = max(max_entries, 0)
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_sign(self, key: str, sign: Callable[[str], str]) -> str:
+        """キャッシュ済み URL を返す。未キャッシュ・期限切れなら sign(key) で署名して保存"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        url = sign(key)
+        if self._lifetime and self._max_entries:
+            with self._lock:
+                self._entries[key] = (url, now + self._lifetime)
+                self._entries.move_to_end(key)
+                if len(self._entries) > self._max_entries and now >= self._next_purge:
+                    # 満杯時はまず期限切れを掃除 (全走査は最大 1 秒に 1 回)
+                    self._purge_expired_locked(now)
+                    self._next_purge = now + _PURGE_INTERVAL_SECONDS
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return url
+
+    def purge_expired(self) -> int:
+        """期限切れエントリを破棄し、破棄した件数を返す"""
+        with self._lock:
+            return self._purge_expired_locked(time.monotonic())
+
+    def _purge_expired_locked(self, now: float) -> int:
+        expired = [k for k, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for k in expired:
+            del self._entries[k]
+        return len(expired)
+
+    def clear(self) -> None:
+        """全エントリを破棄"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """ヒット/ミス数と現在のエントリ数"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
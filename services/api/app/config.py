@@ -19,6 +19,9 @@ class Settings(BaseSettings):
     auth_jwks_url: Optional[str] = None
     auth_audience: Optional[str] = None
     admin_group: str = "Admins"
+    # 検証済みトークンのキャッシュ (0 で無効。TTL はトークンの exp を超えない)
+    auth_token_cache_max_entries: int = 10000
+    auth_token_cache_ttl_seconds: int = 300
 
     # ローカル開発設定 (DynamoDB Local + MinIO)
     dynamodb_endpoint: Optional[str] = Field(default="http://localhost:8001")
@@ -77,6 +80,8 @@ class Settings(BaseSettings):
         validation_alias=AliasChoices(
             "cosmos_db_database", "azure_cosmos_database")
     )
+    # 旧形式 (数値 OFFSET) の nextToken を受け付ける移行期間フラグ
+    azure_legacy_offset_tokens: bool = True
     cosmos_db_container: str = Field(
         default="items",
         validation_alias=AliasChoices(
@@ -93,16 +98,53 @@ class Settings(BaseSettings):
 
     # 共通設定
     presigned_url_expiry: int = 300
+    # 読み取り用署名付きURLのキャッシュ (失効の refresh_margin 秒前にキャッシュから外す)
+    signed_url_cache_max_entries: int = 10000
+    signed_url_refresh_margin_seconds: int = 900
+    # async ルートから同時に実行するバックエンド呼び出し (SDK I/O) の上限
+    backend_max_concurrency: int = Field(default=200, ge=1)
+    # AWS / ローカルの async ルートは aioboto3 で DynamoDB を直接 await する
+    # (false、または aioboto3 未インストール時は同期バックエンドをスレッドで実行)
+    native_async_backend: bool = True
+    # DynamoDB の POSTS パーティションの書き込みシャード数 (1 = 従来の単一 PK=POSTS)
+    posts_shard_count: int = Field(default=1, ge=1, le=64)
+    # 起動時 (lifespan / Lambda INIT) に JWKS・バックエンド・SDK クライアントを並行初期化する
+    startup_warmup: bool = True
+    # 起動時ウォームアップの待ち時間上限 (Lambda INIT フェーズは 10 秒まで)
+    startup_warmup_timeout_seconds: float = Field(default=5.0, gt=0)
+    # Powertools / Mangum の import を初回の Lambda 呼び出しまで遅延する (app.startup_profile で計測)
+    lazy_imports: bool = False
     cors_origins: str = "*"
     log_level: str = "INFO"
     # 画像アップロード制限 (環境変数 MAX_IMAGES_PER_POST で上書き可)
     max_images_per_post: int = 10
+    # GET /posts/export がバックエンドから 1 回に読み込む件数 (メモリ使用量はこの 1 ページ分)
+    posts_export_page_size: int = Field(default=500, ge=1, le=1000)
+    # POST/DELETE /posts:batch の 1 リクエストあたりの最大件数
+    posts_batch_max_items: int = Field(default=1000, ge=1)
+    # GET /posts/search を有効にする (プロセスごとに全投稿を読んでインデックスを作るため、
+    # 常駐するコンテナ / サーバーでのみ有効にする。無効時の検索は 404)
+    search_index_enabled: bool = False
+    # GET /posts/search のプロセス内インデックスを作り直す間隔 (秒、0 は初回構築のみ)
+    # 他インスタンス経由の書き込みはこの間隔で反映される (作り直す間は古いインデックスで応答)
+    search_index_refresh_seconds: float = Field(default=300.0, ge=0)
 
-    # レート制限 (T9)
+    # レート制限 (T9, app/ratelimit.py)
     # 1クライアントIPあたりの制限値（60秒窓）
     rate_limit_enabled: bool = True
     rate_limit_requests_per_window: int = 100
     rate_limit_window_seconds: int = 60
+    # 状態の保存先: memory | dynamodb | redis (複数インスタンスでは dynamodb / redis)
+    rate_limit_store: str = "memory"
+    rate_limit_redis_url: str | None = None
+    # 未指定時は POSTS_TABLE_NAME / DYNAMODB_TABLE_NAME のテーブルを使う
+    rate_limit_table_name: str | None = None
+    # ルート別予算 "METHOD /path-prefix=limit/window_seconds" のカンマ区切り
+    rate_limit_route_budgets: str = ""
+    # 認証済みユーザーごとの制限値 (0 = 無効, 窓は rate_limit_window_seconds)
+    rate_limit_user_requests_per_window: int = 0
+    # memory ストアが保持する最大キー数
+    rate_limit_max_keys: int = 100000
     
     model_config = {
         "env_file": ".env",
@@ -5,18 +5,56 @@ Supports:
 - AWS Cognito
 - Firebase Authentication (GCP)
 - Azure AD / Azure AD B2C
+
+Verifiers are process-wide singletons (get_verifier). Each one serves its
+JWKS from memory with stale-while-revalidate semantics:
+
+- cold cache: one HTTPS fetch, shared by all concurrent callers (single-flight)
+- older than refresh_after (45 min): served as is, refreshed in a background
+  thread (stale past 1 h is still served while the refresh runs or fails)
+- unknown kid: one forced refresh, at most every 60 s (key rotation)
 """
 
+import hashlib
+import json
 import logging
+import threading
+import time
+from collections.abc import Callable
 from datetime import datetime, timedelta
-from functools import lru_cache
 from typing import Any, Optional
 
 import requests
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
 
 logger = logging.getLogger(__name__)
 
+# 未知の kid による強制再取得の最小間隔
+_UNKNOWN_KID_REFRESH_SECONDS = 60
+
+# JWKS URI -> 最後に取得した JWKS のフィンガープリント (全インスタンス共通)
+_jwks_fingerprints: dict[str, str] = {}
+_jwks_rotation_listeners: list[Callable[[str], None]] = []
+
+
+def add_jwks_rotation_listener(listener: Callable[[str], None]) -> None:
+    """Register a callback invoked with the JWKS URI whenever its key set changes"""
+    if listener not in _jwks_rotation_listeners:
+        _jwks_rotation_listeners.append(listener)
+
+
+def _record_jwks_fingerprint(jwks_uri: str, jwks: dict) -> None:
+    fingerprint = hashlib.sha256(
+        json.dumps(jwks, sort_keys=True).encode()
+    ).hexdigest()
+    previous = _jwks_fingerprints.get(jwks_uri)
+    _jwks_fingerprints[jwks_uri] = fingerprint
+    if previous is not None and previous != fingerprint:
+        logger.info(f"JWKS rotated: {jwks_uri}")
+        for listener in list(_jwks_rotation_listeners):
+            listener(jwks_uri)
+
 
 class JWTVerifier:
     """JWT verification for multiple cloud providers"""
@@ -34,8 +72,22 @@ class JWTVerifier:
         self._jwks_cache: Optional[dict] = None
         self._jwks_cache_time: Optional[datetime] = None
         self._jwks_cache_duration = timedelta(hours=1)
+        self._jwks_refresh_after = timedelta(minutes=45)
+        # kid -> 構築済み公開鍵 (JWKS 取得ごとに 1 回だけ構築)
+        self._signing_keys: dict[str, Key] = {}
+
+        # single-flight: 取得は _fetch_lock 下で 1 本だけ。世代番号で待機者の重複取得を防ぐ
+        self._fetch_lock = threading.Lock()
+        self._fetch_generation = 0
+        self._background_refresh = False
+        self._state_lock = threading.Lock()
+
+        # metrics
+        self._fetches = 0
+        self._fetch_errors = 0
+        self._last_fetch_ms: float | None = None
+        self._stale_served = 0
 
-    @lru_cache(maxsize=10)  # noqa: B019
     def get_jwks_uri(self) -> str:
         """Get JWKS URI based on provider"""
         if self.provider == "cognito":
@@ -62,35 +114,129 @@ class JWTVerifier:
         raise ValueError(f"Unsupported provider: {self.provider}")
 
     def get_jwks(self) -> dict:
-        """Get JWKS with caching"""
-        now = datetime.now()
-
-        # Check cache
-        if (
-            self._jwks_cache is not None
-            and self._jwks_cache_time is not None
-            and now - self._jwks_cache_time < self._jwks_cache_duration
-        ):
-            return self._jwks_cache
-
-        # Fetch from provider
-        try:
+        """Get JWKS with caching (stale-while-revalidate)"""
+        jwks = self._jwks_cache
+        if jwks is None:
+            # Cold cache: concurrent callers share a single fetch
+            return self.refresh_jwks()
+
+        age = self.cache_age()
+        if age >= self._jwks_refresh_after.total_seconds():
+            if age >= self._jwks_cache_duration.total_seconds():
+                self._stale_served += 1
+            self._refresh_in_background()
+        return jwks
+
+    def refresh_jwks(self) -> dict:
+        """Fetch the JWKS now; callers waiting on an in-flight fetch reuse its result"""
+        generation = self._fetch_generation
+        with self._fetch_lock:
+            if self._fetch_generation != generation:
+                # Another caller fetched while we waited: share its outcome
+                if self._jwks_cache is not None:
+                    return self._jwks_cache
+                raise RuntimeError("JWKS fetch failed in a concurrent request")
+
             jwks_uri = self.get_jwks_uri()
-            response = requests.get(jwks_uri, timeout=10)
-            response.raise_for_status()
+            started = time.perf_counter()
+            try:
+                response = requests.get(jwks_uri, timeout=10)
+                response.raise_for_status()
+                jwks = response.json()
+                self._store_jwks(jwks, datetime.now())
+            except Exception as e:
+                self._fetch_errors += 1
+                logger.error(f"Failed to fetch JWKS: {e}")
+                # If cache exists, use it even if expired
+                if self._jwks_cache:
+                    logger.warning("Using expired JWKS cache")
+                    return self._jwks_cache
+                raise
+            finally:
+                self._fetches += 1
+                self._last_fetch_ms = (time.perf_counter() - started) * 1000
+                self._fetch_generation += 1
 
-            self._jwks_cache = response.json()
-            self._jwks_cache_time = now
+            logger.info(
+                f"JWKS fetched from {jwks_uri} in {self._last_fetch_ms:.0f} ms "
+                f"({len(self._signing_keys)} keys)"
+            )
+            return jwks
 
-            return self._jwks_cache
-        except Exception as e:
-            logger.error(f"Failed to fetch JWKS: {e}")
-            # If cache exists, use it even if expired
-            if self._jwks_cache:
-                logger.warning("Using expired JWKS cache")
-                return self._jwks_cache
+    def _refresh_in_background(self) -> None:
+        """Start one background refresh unless one is already running"""
+        with self._state_lock:
+            if self._background_refresh:
+                return
+            self._background_refresh = True
+
+        def run():
+            try:
+                self.refresh_jwks()
+            except Exception:
+                pass  # logged in refresh_jwks; the cached JWKS keeps serving
+            finally:
+                with self._state_lock:
+                    self._background_refresh = False
+
+        try:
+            threading.Thread(target=run, name="jwks-refresh", daemon=True).start()
+        except RuntimeError:
+            # let the next request retry if the thread could not start
+            with self._state_lock:
+                self._background_refresh = False
             raise
 
+    def cache_age(self) -> float:
+        """Seconds since the cached JWKS was fetched (inf if never fetched)"""
+        if self._jwks_cache_time is None:
+            return float("inf")
+        return (datetime.now() - self._jwks_cache_time).total_seconds()
+
+    def stats(self) -> dict[str, Any]:
+        """JWKS fetch latency / cache age metrics"""
+        age = self.cache_age()
+        return {
+            "provider": self.provider,
+            "fetches": self._fetches,
+            "fetch_errors": self._fetch_errors,
+            "last_fetch_ms": self._last_fetch_ms,
+            "cache_age_seconds": None if age == float("inf") else round(age, 1),
+            "stale_served": self._stale_served,
+            "keys": len(self._signing_keys),
+        }
+
+    def _store_jwks(self, jwks: dict, fetched_at: datetime) -> None:
+        """Cache a fetched JWKS together with its kid -> key index"""
+        self._signing_keys = self._build_key_index(jwks)
+        self._jwks_cache = jwks
+        self._jwks_cache_time = fetched_at
+        _record_jwks_fingerprint(self.get_jwks_uri(), jwks)
+
+    @staticmethod
+    def _build_key_index(jwks: dict) -> dict[str, Key]:
+        """Construct every usable public key in the JWKS once, indexed by kid"""
+        keys: dict[str, Key] = {}
+        for key_data in jwks.get("keys", []):
+            kid = key_data.get("kid")
+            if not kid:
+                continue
+            try:
+                keys[kid] = jwk.construct(key_data, key_data.get("alg", "RS256"))
+            except Exception as e:
+                logger.warning(f"Skipping unusable JWK {kid}: {e}")
+        return keys
+
+    def get_signing_key(self, kid: str) -> Key | None:
+        """Get the constructed public key for a kid (None if unknown)"""
+        self.get_jwks()
+        key = self._signing_keys.get(kid)
+        if key is None and self.cache_age() >= _UNKNOWN_KID_REFRESH_SECONDS:
+            # The provider may have rotated keys since the last fetch
+            self.refresh_jwks()
+            key = self._signing_keys.get(kid)
+        return key
+
     def get_issuer(self) -> str:
         """Get expected issuer for token validation"""
         if self.provider == "cognito":
@@ -134,10 +280,7 @@ class JWTVerifier:
             Token claims if valid, None otherwise
         """
         try:
-            # Get JWKS
-            jwks = self.get_jwks()
-
-            # Decode header to get kid
+            # Decode header to get kid (the only parse outside jwt.decode)
             unverified_header = jwt.get_unverified_header(token)
             kid = unverified_header.get("kid")
 
@@ -145,38 +288,25 @@ class JWTVerifier:
                 logger.error("Token missing 'kid' in header")
                 return None
 
-            # Find matching key
-            key = None
-            for jwk in jwks.get("keys", []):
-                if jwk.get("kid") == kid:
-                    key = jwk
-                    break
+            # O(1) lookup of the key constructed when the JWKS was fetched
+            key = self.get_signing_key(kid)
 
             if not key:
                 logger.error(f"No matching key found for kid: {kid}")
                 return None
 
-            # Verify and decode token
-            issuer = self.get_issuer()
-            audience = self.get_audience()
-
-            # Check if token has 'aud' claim before verifying it.
-            # Cognito access tokens may omit 'aud'; in that case relax audience verification.
-            try:
-                unverified_claims = jwt.get_unverified_claims(token)
-            except Exception:
-                unverified_claims = {}
-            has_aud = "aud" in unverified_claims
-
+            # Verify and decode token.
+            # Cognito access tokens may omit 'aud'; jose only checks the
+            # audience when the claim is present, so no pre-parse is needed.
             claims = jwt.decode(
                 token,
                 key,
                 algorithms=["RS256"],
-                audience=audience if has_aud else None,
-                issuer=issuer,
+                audience=self.get_audience(),
+                issuer=self.get_issuer(),
                 options={
                     "verify_signature": True,
-                    "verify_aud": has_aud,
+                    "verify_aud": True,
                     "verify_iat": True,
                     "verify_exp": True,
                     "verify_iss": True,
@@ -228,3 +358,26 @@ class JWTVerifier:
             user_info["groups"] = claims.get("groups", [])
 
         return user_info
+
+
+# ── Process-wide verifier registry ──────────────────────────────────────────
+_verifiers: dict[tuple, JWTVerifier] = {}
+_verifiers_lock = threading.Lock()
+
+
+def get_verifier(provider: str, config: dict[str, Any]) -> JWTVerifier:
+    """Return the shared JWTVerifier for (provider, config), creating it once"""
+    key = (provider, tuple(sorted(config.items())))
+    verifier = _verifiers.get(key)
+    if verifier is None:
+        with _verifiers_lock:
+            verifier = _verifiers.get(key)
+            if verifier is None:
+                verifier = JWTVerifier(provider, config)
+                _verifiers[key] = verifier
+    return verifier
+
+
+def verifier_stats() -> list[dict[str, Any]]:
+    """Metrics of every verifier created in this process"""
+    return [verifier.stats() for verifier in list(_verifiers.values())]
@@ -1,9 +1,8 @@
 import logging
-import time
-from collections import defaultdict, deque
+import os
 from contextlib import asynccontextmanager
-from threading import Lock
 
+import anyio
 from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,37 +10,52 @@ from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 
 from app.auth import UserInfo, get_current_user
-from app.backends import get_backend
+from app.backends import get_async_backend, get_backend
 from app.config import settings
 from app.models import CreatePostBody, HealthResponse, ListPostsResponse, UpdatePostBody
+from app.ratelimit import enforce_user_rate_limit, get_rate_limiter
 from app.routes import limits, posts, profile, uploads
+from app.warmup import run_warmup
 
 # AWS Lambda Powertools (observability)
-try:
-    from aws_lambda_powertools import Logger, Metrics, Tracer
-    from aws_lambda_powertools.metrics import MetricUnit
+# LAZY_IMPORTS=true defers Powertools and Mangum to the first Lambda invocation,
+# so container / Azure / GCP images do not pay for importing them.
+logger = logging.getLogger(__name__)
+tracer = None
+metrics = None
+MetricUnit = None
+powertools_available = False
+
+
+def _load_powertools() -> bool:
+    """Swap in the Powertools logger/tracer/metrics when the package is installed."""
+    global logger, tracer, metrics, MetricUnit, powertools_available
+    if powertools_available:
+        return True
+    try:
+        from aws_lambda_powertools import Logger, Metrics, Tracer
+        from aws_lambda_powertools.metrics import MetricUnit as _MetricUnit
+    except ImportError:
+        return False
 
     # Powertools Logger (構造化ログ)
     logger = Logger(service="simple-sns-api")
     tracer = Tracer(service="simple-sns-api")
     metrics = Metrics(namespace="SimpleSNS", service="api")
-
+    MetricUnit = _MetricUnit
     powertools_available = True
-except ImportError:
-    # Fallback to standard logging when AWS Lambda Powertools is not installed.
+    return True
+
+
+if settings.lazy_imports or not _load_powertools():
+    # Fallback to standard logging when AWS Lambda Powertools is not loaded.
     logging.basicConfig(
         level=getattr(logging, settings.log_level.upper()),
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     )
-    logger = logging.getLogger(__name__)
-    powertools_available = False
 
 
 # ── Rate Limiting Middleware ───────────────────────────────────────────────
-_rate_limit_lock = Lock()
-_rate_limit_state: dict[str, deque[float]] = defaultdict(deque)
-
-
 def _get_client_ip(request: Request) -> str:
     """Resolve client IP with X-Forwarded-For support."""
     forwarded_for = request.headers.get("x-forwarded-for", "")
@@ -55,44 +69,30 @@ def _get_client_ip(request: Request) -> str:
 
 
 async def add_rate_limit_headers(request: Request, call_next):
-    """Simple in-memory IP rate limiting for API routes."""
-    if not settings.rate_limit_enabled or not request.url.path.startswith("/api/"):
+    """Per-IP rate limiting (GCRA, see app/ratelimit.py) for API routes."""
+    if not settings.rate_limit_enabled:
+        return await call_next(request)
+
+    limiter = get_rate_limiter()
+    matched = limiter.match(request.method, request.url.path)
+    if matched is None:
         return await call_next(request)
 
-    now = time.time()
-    client_ip = _get_client_ip(request)
-    window_seconds = max(settings.rate_limit_window_seconds, 1)
-    limit = max(settings.rate_limit_requests_per_window, 1)
-
-    with _rate_limit_lock:
-        timestamps = _rate_limit_state[client_ip]
-        while timestamps and now - timestamps[0] >= window_seconds:
-            timestamps.popleft()
-
-        if len(timestamps) >= limit:
-            retry_after = max(1, int(window_seconds - (now - timestamps[0])))
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "error": "Rate limit exceeded",
-                    "limit": limit,
-                    "window_seconds": window_seconds,
-                },
-                headers={
-                    "Retry-After": str(retry_after),
-                    "X-RateLimit-Limit": str(limit),
-                    "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(retry_after),
-                },
-            )
-
-        timestamps.append(now)
-        remaining = max(0, limit - len(timestamps))
+    scope, budget = matched
+    decision = await limiter.hit(f"ip:{_get_client_ip(request)}:{scope}", budget)
+    if not decision.allowed:
+        return JSONResponse(
+            status_code=429,
+            content={
+                "error": "Rate limit exceeded",
+                "limit": budget.limit,
+                "window_seconds": int(budget.window_seconds),
+            },
+            headers=decision.headers(),
+        )
 
     response = await call_next(request)
-    response.headers["X-RateLimit-Limit"] = str(limit)
-    response.headers["X-RateLimit-Remaining"] = str(remaining)
-    response.headers["X-RateLimit-Window"] = str(window_seconds)
+    response.headers.update(decision.headers())
     return response
 
 
@@ -130,6 +130,36 @@ async def add_cache_control_headers(request: Request, call_next):
     return response
 
 
+# ── Cold-start warm-up ─────────────────────────────────────────────────────
+# Serverless runtimes never run the lifespan hook (Mangum uses lifespan="off"),
+# so there the warm-up runs while this module is imported in the INIT phase.
+_SERVERLESS_ENV_VARS = ("AWS_LAMBDA_FUNCTION_NAME", "FUNCTION_TARGET", "FUNCTIONS_WORKER_RUNTIME")
+
+# Per-component init time of the last warm-up (None until it has run)
+warmup_report: dict | None = None
+
+
+def warm_up() -> dict:
+    """Run the cold-start warm-up once per process and log the breakdown."""
+    global warmup_report
+    if warmup_report is None:
+        if settings.rate_limit_enabled:
+            # Build the limiter now: bad route budgets fail here, and a store that
+            # can't be built is logged (and replaced by the memory store) at boot.
+            get_rate_limiter()
+        warmup_report = run_warmup(settings.startup_warmup_timeout_seconds)
+        logger.info("Startup warm-up finished", extra={"warmup": warmup_report})
+        if powertools_available:
+            for component, result in warmup_report.items():
+                if result["ms"] is not None:
+                    metrics.add_metric(
+                        name=f"WarmupLatency_{component}",
+                        unit=MetricUnit.Milliseconds,
+                        value=result["ms"],
+                    )
+    return warmup_report
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan: startup and shutdown logic."""
@@ -142,8 +172,16 @@ async def lifespan(app: FastAPI):
             "powertools_enabled": powertools_available,
         },
     )
+    if settings.startup_warmup:
+        await anyio.to_thread.run_sync(warm_up)
+        if settings.search_index_enabled:
+            # 検索インデックスは起動をブロックせずに構築する (完成までの検索はこれを待つ)
+            posts.start_search_index_build()
     yield
     logger.info("Shutting down Simple SNS API")
+    await posts.stop_search_index_build()
+    if get_async_backend.cache_info().currsize:
+        await get_async_backend().aclose()
 
 
 # FastAPIアプリケーション
@@ -177,9 +215,11 @@ app.middleware("http")(add_cache_control_headers)
 
 # ルーター登録
 app.include_router(limits.router)
-app.include_router(posts.router)
-app.include_router(uploads.router)
-app.include_router(profile.router)
+# 認証済みユーザーごとの予算 (RATE_LIMIT_USER_REQUESTS_PER_WINDOW)
+_user_rate_limit = [Depends(enforce_user_rate_limit)]
+app.include_router(posts.router, dependencies=_user_rate_limit)
+app.include_router(uploads.router, dependencies=_user_rate_limit)
+app.include_router(profile.router, dependencies=_user_rate_limit)
 
 
 # ── Validation error handler ────────────────────────────────────────────────
@@ -266,9 +306,12 @@ def legacy_get_message(
     """Legacy alias: get single post (GET /api/messages/{id})."""
     backend = get_backend()
     try:
-        return backend.get_post(post_id)
+        post = backend.get_post(post_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e)) from e
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return post
 
 
 @app.put("/api/messages/{post_id}")
@@ -316,17 +359,43 @@ def health() -> HealthResponse:
         "Health check requested", extra={"provider": settings.cloud_provider.value}
     )
 
+    # Imported here: jose/cryptography/requests are only needed once auth is used
+    from app.jwt_verifier import verifier_stats
+
+    jwks_stats = verifier_stats()
+    if powertools_available:
+        for stats in jwks_stats:
+            if stats["cache_age_seconds"] is not None:
+                metrics.add_metric(
+                    name="JwksCacheAgeSeconds",
+                    unit=MetricUnit.Seconds,
+                    value=stats["cache_age_seconds"],
+                )
+            if stats["last_fetch_ms"] is not None:
+                metrics.add_metric(
+                    name="JwksFetchLatency",
+                    unit=MetricUnit.Milliseconds,
+                    value=stats["last_fetch_ms"],
+                )
+
     return HealthResponse(
         status="ok",
         provider=settings.cloud_provider.value,
+        jwks=jwks_stats or None,
+        warmup=warmup_report,
     )
 
 
+if settings.startup_warmup and any(os.environ.get(v) for v in _SERVERLESS_ENV_VARS):
+    warm_up()
+
+
 # AWS Lambda handler (Mangum)
-try:
+def _build_lambda_handler():
+    """Wrap the app with Mangum (and Powertools when loaded). Raises ImportError."""
     from mangum import Mangum
 
-    _mangum_handler = Mangum(app, lifespan="off")
+    mangum_handler = Mangum(app, lifespan="off")
 
     if powertools_available:
         # Wrap the Mangum handler with Powertools decorators for structured logging,
@@ -334,14 +403,30 @@ try:
         @logger.inject_lambda_context(clear_state=True)
         @tracer.capture_lambda_handler
         @metrics.log_metrics(capture_cold_start_metric=True)
-        def handler(event, context):
-            return _mangum_handler(event, context)
+        def powertools_handler(event, context):
+            return mangum_handler(event, context)
 
         logger.info("Mangum handler initialized with Powertools support")
-    else:
-        handler = _mangum_handler
-        logger.info("Mangum handler initialized for AWS Lambda")
+        return powertools_handler
 
-except ImportError:
-    logger.warning("Mangum not available - AWS Lambda deployment not supported")
-    handler = None
+    logger.info("Mangum handler initialized for AWS Lambda")
+    return mangum_handler
+
+
+if settings.lazy_imports:
+    _lambda_handler = None
+
+    def handler(event, context):
+        """Lambda entry point; imports Powertools and Mangum on the first invocation."""
+        global _lambda_handler
+        if _lambda_handler is None:
+            _load_powertools()
+            _lambda_handler = _build_lambda_handler()
+        return _lambda_handler(event, context)
+
+else:
+    try:
+        handler = _build_lambda_handler()
+    except ImportError:
+        logger.warning("Mangum not available - AWS Lambda deployment not supported")
+        handler = None
@@ -1,5 +1,7 @@
-from typing import Optional, Any
+from collections.abc import Collection
 from enum import Enum
+from typing import Any, Optional
+
 from pydantic import BaseModel, Field, model_serializer
 
 
@@ -24,6 +26,8 @@ class Post(BaseModel):
     tags: Optional[list[str]] = None
     created_at: str = Field(..., alias="createdAt")
     updated_at: Optional[str] = Field(None, alias="updatedAt")
+    # ベーステーブルのキーを埋め込んだ ID (DynamoDB のみ)。更新・削除で postId の代わりに使える
+    handle: str | None = Field(None, alias="postHandle")
 
     model_config = {"populate_by_name": True}
 
@@ -32,7 +36,24 @@ class Post(BaseModel):
         """後方互換性: snake_case と camelCase 両方のフィールド名を返す"""
         return {
             # camelCase (ashnova.v3 形式)
+            **self.to_compact(),
+            # snake_case (frontend_react 形式)
+            "id": self.id,
+            "author": self.user_id,  # userId を author としても返す
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "image_url": self.image_urls[0] if self.image_urls else None,
+        }
+
+    def to_compact(self, fields: Collection[str] | None = None) -> dict[str, Any]:
+        """コンパクト表現: camelCase のみで後方互換の別名を含めない
+
+        Args:
+            fields: 出力するフィールド (sparse fieldset)。None なら全フィールド
+        """
+        row = {
             "postId": self.id,
+            "postHandle": self.handle,
             "userId": self.user_id,
             "nickname": self.nickname,
             "content": self.content,
@@ -41,13 +62,17 @@ class Post(BaseModel):
             "tags": self.tags,
             "createdAt": self.created_at,
             "updatedAt": self.updated_at,
-            # snake_case (frontend_react 形式)
-            "id": self.id,
-            "author": self.user_id,  # userId を author としても返す
-            "created_at": self.created_at,
-            "updated_at": self.updated_at,
-            "image_url": self.image_urls[0] if self.image_urls else None,
         }
+        if fields is None:
+            return row
+        return {name: row[name] for name in fields}
+
+
+# コンパクト表現で選択できるフィールド (?fields=)
+POST_COMPACT_FIELDS = frozenset(
+    ("postId", "postHandle", "userId", "nickname", "content", "isMarkdown",
+     "imageUrls", "tags", "createdAt", "updatedAt")
+)
 
 
 class CreatePostBody(BaseModel):
@@ -72,6 +97,20 @@ class UpdatePostBody(BaseModel):
     model_config = {"populate_by_name": True}
 
 
+class BatchCreatePostsBody(BaseModel):
+    """投稿一括作成リクエスト (件数上限はルートで settings.posts_batch_max_items により強制)"""
+
+    items: list[CreatePostBody] = Field(..., min_length=1)
+
+
+class BatchDeletePostsBody(BaseModel):
+    """投稿一括削除リクエスト (postId または postHandle のリスト)"""
+
+    post_ids: list[str] = Field(..., min_length=1, alias="postIds")
+
+    model_config = {"populate_by_name": True}
+
+
 class ListPostsResponse(BaseModel):
     """投稿一覧レスポンス"""
 
@@ -95,6 +134,25 @@ class ListPostsResponse(BaseModel):
             "page_size": self.limit,  # frontend_react 互換
         }
 
+    def to_compact(self, fields: Collection[str] | None = None) -> dict[str, Any]:
+        """コンパクト表現: 投稿リストを items に 1 回だけ含める"""
+        return {
+            "items": [post.to_compact(fields) for post in self.items],
+            "limit": self.limit,
+            "nextToken": self.next_token,
+        }
+
+
+class SearchPostsResponse(BaseModel):
+    """投稿検索レスポンス (関連度順)"""
+
+    items: list[Post]
+    limit: int
+    next_token: str | None = Field(None, alias="nextToken")
+    total: int = Field(..., description="ヒット総数")
+
+    model_config = {"populate_by_name": True}
+
 
 class ProfileResponse(BaseModel):
     """プロフィールレスポンス"""
@@ -144,3 +202,7 @@ class HealthResponse(BaseModel):
     status: str
     provider: str
     version: str = "3.0.0"
+    # JWKS キャッシュのメトリクス (/health のみ)
+    jwks: list[dict] | None = None
+    # 起動時ウォームアップのコンポーネント別所要時間 (/health のみ)
+    warmup: dict[str, dict] | None = None
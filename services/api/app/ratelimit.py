@@ -0,0 +1,423 @@
+"""Rate limiting with pluggable stores (T9)
+
+Algorithm: GCRA (generic cell rate algorithm). A budget of ``limit`` requests
+per ``window_seconds`` is enforced by storing a single number per key, the
+theoretical arrival time (TAT) of the next request, so memory is O(1) per
+key and a key whose TAT is in the past carries no state at all (it can be
+evicted or expired without changing behaviour). Bursts of up to ``limit``
+requests are allowed, after which requests are admitted every
+``window_seconds / limit`` seconds. Rejected requests do not consume budget.
+
+Stores (RATE_LIMIT_STORE):
+  memory    per-process dict, idle keys swept periodically (default)
+  dynamodb  one item per key in the posts table (PK=RATELIMIT#<key>),
+            updated with conditional writes, expired via TTL (expiresAt)
+  redis     one key per client, updated atomically by a Lua script
+
+Budgets:
+  - per client IP for /api/ routes (RATE_LIMIT_REQUESTS_PER_WINDOW)
+  - per route, by method + path prefix (RATE_LIMIT_ROUTE_BUDGETS,
+    e.g. "POST /posts=20/60,POST /uploads=10/60")
+  - per authenticated user (RATE_LIMIT_USER_REQUESTS_PER_WINDOW)
+
+A failing store never takes the API down: errors are logged and the request
+is admitted. A store that cannot be built at all (e.g. RATE_LIMIT_STORE=redis
+without the ``redis`` package, which requirements.txt ships but the per-cloud
+requirement files do not) is logged as an error and replaced by the memory
+store. The limiter is built during the startup warm-up, so this shows up at
+boot rather than on the first request.
+"""
+
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+import anyio.to_thread
+from fastapi import Depends, HTTPException, Response, status
+
+from app.auth import UserInfo, get_current_user
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_DYNAMODB_KEY_PREFIX = "RATELIMIT#"
+_DYNAMODB_MAX_ATTEMPTS = 3
+_REDIS_KEY_PREFIX = "ratelimit:"
+
+
+@dataclass(frozen=True)
+class Budget:
+    """window_seconds 秒あたり limit リクエストの予算"""
+
+    limit: int
+    window_seconds: float
+
+    @property
+    def interval(self) -> float:
+        """リクエスト 1 件あたりの補充間隔 (秒)"""
+        return self.window_seconds / self.limit
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    """1 リクエストの判定結果"""
+
+    allowed: bool
+    budget: Budget
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+    def headers(self) -> dict[str, str]:
+        """レスポンスに付与する X-RateLimit-* ヘッダー"""
+        headers = {
+            "X-RateLimit-Limit": str(self.budget.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Window": str(int(self.budget.window_seconds)),
+        }
+        if self.allowed:
+            return headers
+        retry_after = str(max(1, math.ceil(self.retry_after)))
+        headers["Retry-After"] = retry_after
+        headers["X-RateLimit-Reset"] = retry_after
+        return headers
+
+
+def gcra(tat: float | None, now: float, budget: Budget) -> tuple[RateLimitDecision, float]:
+    """GCRA の 1 ステップ
+
+    Args:
+        tat: 保存済みの theoretical arrival time (未保存なら None)
+        now: 現在時刻 (エポック秒)
+        budget: 予算
+
+    Returns:
+        (判定結果, 保存すべき TAT)。拒否時の TAT は入力のまま
+    """
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + budget.interval
+    allow_at = new_tat - budget.window_seconds
+    if now < allow_at:
+        return RateLimitDecision(False, budget, 0, allow_at - now, tat - now), tat
+    remaining = math.floor(
+        (budget.window_seconds - (new_tat - now)) / budget.interval + 1e-9
+    )
+    return RateLimitDecision(True, budget, remaining, 0.0, new_tat - now), new_tat
+
+
+class RateLimitStore(ABC):
+    """GCRA の TAT をキーごとに保存するストア"""
+
+    #: acquire がネットワーク I/O を伴う (イベントループ外で実行する) か
+    blocking = True
+
+    @abstractmethod
+    def acquire(self, key: str, budget: Budget, now: float) -> RateLimitDecision:
+        """key のリクエストを 1 件判定し、許可なら TAT をアトミックに進める"""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """プロセス内ストア (スレッドセーフ)。TAT が過去になったキーは掃除で破棄"""
+
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000, sweep_interval_seconds: float = 60.0):
+        """
+        Args:
+            max_keys: 保持する最大キー数 (超過時は最も古く更新されたキーを破棄)
+            sweep_interval_seconds: アイドルキーを掃除する間隔
+        """
+        self._tats: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max(max_keys, 1)
+        self._sweep_interval = sweep_interval_seconds
+        self._next_sweep = 0.0
+
+    def acquire(self, key: str, budget: Budget, now: float) -> RateLimitDecision:
+        with self._lock:
+            decision, new_tat = gcra(self._tats.get(key), now, budget)
+            if decision.allowed:
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+            if now >= self._next_sweep:
+                self._sweep_locked(now)
+                self._next_sweep = now + self._sweep_interval
+            while len(self._tats) > self._max_keys:
+                self._tats.popitem(last=False)
+        return decision
+
+    def _sweep_locked(self, now: float) -> None:
+        # TAT が過去のキーは「未保存」と同じ判定になるため破棄してよい
+        idle = [k for k, tat in self._tats.items() if tat <= now]
+        for k in idle:
+            del self._tats[k]
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+def _attribute_number(item: dict, name: str) -> str | None:
+    """DynamoDB アイテム (resource 形式 / 低レベル形式) から数値属性を文字列で取得"""
+    value = item.get(name)
+    if isinstance(value, dict):
+        value = value.get("N")
+    return None if value is None else str(value)
+
+
+class DynamoDBRateLimitStore(RateLimitStore):
+    """DynamoDB ストア: 条件付き UpdateItem による楽観的 CAS (読み取りなし)
+
+    1. アイドル/新規キー: ``attribute_not_exists(tat) OR tat < :now`` で TAT を
+       now + interval に設定 (1 往復)
+    2. 条件失敗時は ReturnValuesOnConditionCheckFailure の旧 TAT で判定し、
+       拒否ならそのまま返す。許可なら ``tat = :old`` 条件で TAT を進める
+    """
+
+    def __init__(self, table: Any):
+        """
+        Args:
+            table: boto3 の DynamoDB Table (PK/SK の単一テーブル)
+        """
+        self.table = table
+
+    def acquire(self, key: str, budget: Budget, now: float) -> RateLimitDecision:
+        from botocore.exceptions import ClientError
+
+        item_key = {"PK": f"{_DYNAMODB_KEY_PREFIX}{key}", "SK": "GCRA"}
+        for _ in range(_DYNAMODB_MAX_ATTEMPTS):
+            decision, new_tat = gcra(None, now, budget)
+            try:
+                self.table.update_item(
+                    Key=item_key,
+                    UpdateExpression="SET tat = :new, expiresAt = :exp",
+                    ConditionExpression="attribute_not_exists(tat) OR tat < :now",
+                    ExpressionAttributeValues={
+                        ":new": _decimal(new_tat),
+                        ":now": _decimal(now),
+                        ":exp": math.ceil(new_tat),
+                    },
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD",
+                )
+                return decision
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                old_tat = _attribute_number(e.response.get("Item") or {}, "tat")
+            if old_tat is None:
+                continue
+
+            decision, new_tat = gcra(float(old_tat), now, budget)
+            if not decision.allowed:
+                return decision
+            try:
+                self.table.update_item(
+                    Key=item_key,
+                    UpdateExpression="SET tat = :new, expiresAt = :exp",
+                    ConditionExpression="tat = :old",
+                    ExpressionAttributeValues={
+                        ":new": _decimal(new_tat),
+                        ":old": Decimal(old_tat),
+                        ":exp": math.ceil(new_tat),
+                    },
+                )
+                return decision
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        raise RuntimeError(f"Rate limit update for {key!r} lost {_DYNAMODB_MAX_ATTEMPTS} races")
+
+
+def _decimal(value: float) -> Decimal:
+    return Decimal(f"{value:.6f}")
+
+
+# KEYS[1]=key, ARGV = now, interval, window。戻り値は判定に使った TAT (文字列)
+_REDIS_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then tat = now end
+local new_tat = tat + interval
+if now < new_tat - window then
+  return {0, string.format('%.6f', tat)}
+end
+redis.call('SET', KEYS[1], string.format('%.6f', new_tat),
+           'PX', math.ceil((new_tat - now) * 1000))
+return {1, string.format('%.6f', tat)}
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Redis (RESP 互換) ストア: Lua スクリプトで GET + SET PX をアトミックに実行"""
+
+    def __init__(self, client: Any):
+        """
+        Args:
+            client: redis.Redis 互換クライアント (register_script をサポートするもの)
+        """
+        self.client = client
+        self._script = client.register_script(_REDIS_GCRA_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimitStore":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "RATE_LIMIT_STORE=redis requires the 'redis' package"
+            ) from e
+        return cls(redis.Redis.from_url(url))
+
+    def acquire(self, key: str, budget: Budget, now: float) -> RateLimitDecision:
+        _, tat = self._script(
+            keys=[f"{_REDIS_KEY_PREFIX}{key}"],
+            args=[f"{now:.6f}", f"{budget.interval:.6f}", f"{budget.window_seconds:.6f}"],
+        )
+        decision, _ = gcra(float(tat), now, budget)
+        return decision
+
+
+@dataclass(frozen=True)
+class RouteBudget:
+    """メソッド + パス接頭辞ごとの予算"""
+
+    method: str
+    path_prefix: str
+    budget: Budget
+
+    @property
+    def scope(self) -> str:
+        return f"{self.method} {self.path_prefix}"
+
+    def matches(self, method: str, path: str) -> bool:
+        return self.method in ("*", method) and path.startswith(self.path_prefix)
+
+
+def parse_route_budgets(spec: str) -> list[RouteBudget]:
+    """"POST /posts=20/60,* /uploads=10/60" 形式を RouteBudget のリストに変換"""
+    rules = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            route, amount = entry.rsplit("=", 1)
+            method, path_prefix = route.split()
+            limit, window = amount.split("/")
+            budget = Budget(int(limit), float(window))
+        except ValueError as e:
+            raise ValueError(f"Invalid rate limit route budget: {entry!r}") from e
+        if budget.limit < 1 or budget.window_seconds <= 0:
+            raise ValueError(f"Invalid rate limit route budget: {entry!r}")
+        rules.append(RouteBudget(method.upper(), path_prefix, budget))
+    # 最長一致を優先
+    return sorted(rules, key=lambda r: len(r.path_prefix), reverse=True)
+
+
+class RateLimiter:
+    """予算の選択とストア呼び出し (fail-open)"""
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        default_budget: Budget,
+        route_budgets: list[RouteBudget] | None = None,
+        user_budget: Budget | None = None,
+        default_path_prefix: str = "/api/",
+    ):
+        self.store = store
+        self.default_budget = default_budget
+        self.route_budgets = route_budgets or []
+        self.user_budget = user_budget
+        self.default_path_prefix = default_path_prefix
+
+    def match(self, method: str, path: str) -> tuple[str, Budget] | None:
+        """リクエストに適用する (スコープ名, 予算)。制限対象外なら None"""
+        for rule in self.route_budgets:
+            if rule.matches(method, path):
+                return rule.scope, rule.budget
+        if path.startswith(self.default_path_prefix):
+            return "default", self.default_budget
+        return None
+
+    async def hit(self, key: str, budget: Budget) -> RateLimitDecision:
+        """key のリクエストを 1 件判定 (ストア障害時は許可)"""
+        now = time.time()
+        try:
+            if self.store.blocking:
+                return await anyio.to_thread.run_sync(self.store.acquire, key, budget, now)
+            return self.store.acquire(key, budget, now)
+        except Exception as e:
+            logger.warning("Rate limit store failed, allowing request: %r", e)
+            return RateLimitDecision(True, budget, budget.limit, 0.0, 0.0)
+
+
+def _build_store() -> RateLimitStore:
+    kind = settings.rate_limit_store.lower()
+    if kind == "memory":
+        return MemoryRateLimitStore(max_keys=settings.rate_limit_max_keys)
+    if kind == "redis":
+        if not settings.rate_limit_redis_url:
+            raise ValueError("RATE_LIMIT_REDIS_URL is required for RATE_LIMIT_STORE=redis")
+        return RedisRateLimitStore.from_url(settings.rate_limit_redis_url)
+    if kind == "dynamodb":
+        import boto3
+
+        table_name = (
+            settings.rate_limit_table_name
+            or settings.posts_table_name
+            or settings.dynamodb_table_name
+        )
+        kwargs = {}
+        if settings.cloud_provider.value == "local":
+            kwargs["endpoint_url"] = settings.dynamodb_endpoint
+        dynamodb = boto3.resource("dynamodb", region_name=settings.aws_region, **kwargs)
+        return DynamoDBRateLimitStore(dynamodb.Table(table_name))
+    raise ValueError(f"Unsupported rate limit store: {settings.rate_limit_store}")
+
+
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> RateLimiter:
+    """設定に基づく RateLimiter (シングルトン)"""
+    user_limit = settings.rate_limit_user_requests_per_window
+    window = max(settings.rate_limit_window_seconds, 1)
+    try:
+        store = _build_store()
+    except Exception as e:
+        # 設定したストアを作れなくても API は止めない (制限はインスタンスごとになる)
+        logger.error(
+            "Rate limit store %r unavailable, falling back to memory: %r",
+            settings.rate_limit_store, e,
+        )
+        store = MemoryRateLimitStore(max_keys=settings.rate_limit_max_keys)
+    return RateLimiter(
+        store=store,
+        default_budget=Budget(max(settings.rate_limit_requests_per_window, 1), window),
+        route_budgets=parse_route_budgets(settings.rate_limit_route_budgets),
+        user_budget=Budget(user_limit, window) if user_limit > 0 else None,
+    )
+
+
+async def enforce_user_rate_limit(
+    response: Response,
+    user: UserInfo | None = Depends(get_current_user),
+) -> None:
+    """認証済みユーザーごとの予算を適用する依存関数 (未認証は IP 予算のみ)"""
+    if not settings.rate_limit_enabled or user is None:
+        return
+    limiter = get_rate_limiter()
+    if limiter.user_budget is None:
+        return
+    decision = await limiter.hit(f"user:{user.user_id}", limiter.user_budget)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers=decision.headers(),
+        )
+    response.headers["X-RateLimit-User-Remaining"] = str(decision.remaining)
@@ -1,66 +1,378 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from collections.abc import AsyncIterator, Sequence
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+
 from app.auth import UserInfo, require_user
-from app.backends import get_backend
+from app.backends import get_async_backend
 from app.config import settings
-from app.models import CreatePostBody, ListPostsResponse, Post, UpdatePostBody
+from app.models import (
+    POST_COMPACT_FIELDS,
+    BatchCreatePostsBody,
+    BatchDeletePostsBody,
+    CreatePostBody,
+    ListPostsResponse,
+    Post,
+    SearchPostsResponse,
+    UpdatePostBody,
+)
+from app.search_index import SearchIndex, get_search_index, is_stale, set_search_index
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
 
+COMPACT_PROFILE = "compact"
+COMPACT_MEDIA_TYPE = f'application/json; profile="{COMPACT_PROFILE}"'
+
+_FIELDS_QUERY = Query(
+    None,
+    description="返すフィールド (カンマ区切り、例: postId,content,createdAt)。"
+    "指定するとコンパクト表現になる",
+)
+
+
+def _compact_fields(request: Request, fields: str | None) -> tuple[bool, list[str] | None]:
+    """コンパクト表現を使うか (Accept の profile="compact" または ?fields=) と選択フィールド"""
+    if fields is not None:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = sorted(set(selected) - POST_COMPACT_FIELDS)
+        if not selected or unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"fields に指定できるのは {', '.join(sorted(POST_COMPACT_FIELDS))} です"
+                f"（不明: {', '.join(unknown) or '(空)'}）",
+            )
+        return True, list(dict.fromkeys(selected))
+    accept = request.headers.get("accept", "")
+    for media_range in accept.split(","):
+        for param in media_range.split(";")[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "profile" and value.strip().strip('"') == COMPACT_PROFILE:
+                return True, None
+    return False, None
+
+
+def _compact_response(content: dict) -> JSONResponse:
+    return JSONResponse(
+        content, media_type=COMPACT_MEDIA_TYPE, headers={"Vary": "Accept"}
+    )
+
+
 @router.get("", response_model=ListPostsResponse)
-def list_posts(
+async def list_posts(
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=50, description="取得件数"),
+    nextToken: str | None = Query(None, description="ページネーショントークン"),
+    tag: str | None = Query(None, description="タグフィルター"),
+    fields: str | None = _FIELDS_QUERY,
+) -> ListPostsResponse | JSONResponse:
+    """投稿一覧を取得
+
+    既定は後方互換の表現 (items/results/messages に同じ投稿、snake_case の別名付き)。
+    Accept: application/json; profile="compact" または ?fields= を指定すると
+    投稿を items に 1 回だけ camelCase で含めるコンパクト表現を返す。
+    """
+    compact, selected = _compact_fields(request, fields)
+    backend = get_async_backend()
+    posts, output_next_token = await backend.list_posts(limit, nextToken, tag)
+    result = ListPostsResponse(items=posts, limit=limit, nextToken=output_next_token)
+    if compact:
+        return _compact_response(result.to_compact(selected))
+    response.headers["Vary"] = "Accept"
+    return result
+
+
+async def _export_lines(
+    page_size: int, cursor: str | None, tag: str | None
+) -> AsyncIterator[str]:
+    """タイムラインを page_size 件ずつ読み、ページごとに NDJSON 行をまとめて返す"""
+    backend = get_async_backend()
+    while True:
+        posts, cursor = await backend.list_posts(page_size, cursor, tag)
+        lines = [
+            json.dumps(post.to_compact(), ensure_ascii=False, separators=(",", ":"))
+            for post in posts
+        ]
+        # ページ末尾のチェックポイント: 切断時はこの値を cursor に渡して再開する
+        lines.append(json.dumps({"_checkpoint": cursor}))
+        yield "\n".join(lines) + "\n"
+        if cursor is None:
+            return
+
+
+@router.get("/export")
+async def export_posts(
+    cursor: str | None = Query(None, description="再開位置 (前回の _checkpoint の値)"),
+    tag: str | None = Query(None, description="タグフィルター"),
+    user: UserInfo = Depends(require_user),
+) -> StreamingResponse:
+    """全投稿を NDJSON でストリーミング出力 (バックアップ・分析用)
+
+    1 行 1 投稿 (camelCase のみ)。各ページの後に {"_checkpoint": "<cursor>"} 行を出力し、
+    最後の行は {"_checkpoint": null} になる (これが無ければ途中で切断されている)。
+    """
+    return StreamingResponse(
+        _export_lines(settings.posts_export_page_size, cursor, tag),
+        media_type="application/x-ndjson",
+    )
+
+
+# 実行中の (再) 構築。1 プロセス 1 本だけ
+_search_index_build: asyncio.Task | None = None
+# 構築中のインデックス (構築中の書き込みも反映させる)
+_building_index: SearchIndex | None = None
+
+
+async def _build_search_index() -> SearchIndex:
+    """バックエンドの全投稿から新しいインデックスを作り、完成したら差し替える"""
+    global _building_index
+    _building_index = fresh = SearchIndex()
+    started = time.perf_counter()
+    try:
+        backend = get_async_backend()
+        cursor = None
+        while True:
+            posts, cursor = await backend.list_posts(settings.posts_export_page_size, cursor, None)
+            fresh.add_many(posts)
+            if cursor is None:
+                break
+    finally:
+        _building_index = None
+    fresh.built_at = time.monotonic()
+    set_search_index(fresh)
+    logger.info(f"Search index built: {len(fresh)} posts in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return fresh
+
+
+def _build_finished(task: asyncio.Task) -> None:
+    if task.cancelled() or task.exception() is None:
+        return
+    logger.error("Search index build failed", exc_info=task.exception())
+    index = get_search_index()
+    if index is not None:
+        # 失敗した再構築をリクエストごとに繰り返さず、次の更新間隔で再試行する
+        index.built_at = time.monotonic()
+
+
+def start_search_index_build() -> asyncio.Task:
+    """インデックスの構築をバックグラウンドで始める (実行中ならその Task を返す)
+
+    起動時 (lifespan) と、期限切れのインデックスで応答したときに呼ぶ。
+    """
+    global _search_index_build
+    loop = asyncio.get_running_loop()
+    task = _search_index_build
+    if task is None or task.done() or task.get_loop() is not loop:
+        task = _search_index_build = loop.create_task(_build_search_index())
+        task.add_done_callback(_build_finished)
+    return task
+
+
+async def stop_search_index_build() -> None:
+    """実行中の構築を取り消す (アプリ終了時)"""
+    task = _search_index_build
+    if task is not None and not task.done():
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+async def _load_search_index() -> SearchIndex:
+    """プロセス内の検索インデックス
+
+    構築済みなら期限切れでもそのまま返し (再構築はバックグラウンド)、未構築のときだけ
+    構築の完了を待つ。
+    """
+    index = get_search_index()
+    if index is None:
+        # 切断されたリクエストで共有の構築を取り消さない
+        return await asyncio.shield(start_search_index_build())
+    if is_stale(index, settings.search_index_refresh_seconds):
+        start_search_index_build()
+    return index
+
+
+async def _load_posts(post_ids: list[str]) -> list[Post]:
+    """検索ヒットを並行して取得する (画像 URL はここで署名される)
+
+    他のインスタンスで削除済みの投稿は結果から除き、インデックスからも外す。
+    """
+    backend = get_async_backend()
+    posts: list[Post | None] = [None] * len(post_ids)
+
+    async def load(position: int, post_id: str) -> None:
+        try:
+            posts[position] = await backend.get_post(post_id)
+        except HTTPException as e:
+            # 1 件の取りこぼしで検索全体を 500 にしない (404 は削除済みとして扱う)
+            if e.status_code != 404:
+                raise
+
+    async with anyio.create_task_group() as tg:
+        for position, post_id in enumerate(post_ids):
+            tg.start_soon(load, position, post_id)
+    for post_id, post in zip(post_ids, posts, strict=True):
+        if post is None:
+            _update_search_index(removed=[post_id])
+    return [post for post in posts if post is not None]
+
+
+def _update_search_index(upserted: Sequence[dict] = (), removed: Sequence[str] = ()) -> None:
+    """作成・更新・削除をプロセス内の検索インデックスに反映する (未構築なら何もしない)"""
+    for index in (get_search_index(), _building_index):
+        if index is None:
+            continue
+        for post_id in removed:
+            index.remove(post_id)
+        for data in upserted:
+            try:
+                index.add(Post.model_validate(data))
+            except ValidationError:
+                index.remove(str(data.get("postId", "")))
+
+
+@router.get("/search", response_model=SearchPostsResponse)
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200, description="検索文字列 (#tag はタグ一致)"),
     limit: int = Query(20, ge=1, le=50, description="取得件数"),
     nextToken: str | None = Query(None, description="ページネーショントークン"),
     tag: str | None = Query(None, description="タグフィルター"),
-) -> ListPostsResponse:
-    """投稿一覧を取得"""
-    backend = get_backend()
-    posts, output_next_token = backend.list_posts(limit, nextToken, tag)
-    return ListPostsResponse(items=posts, limit=limit, nextToken=output_next_token)
-
-
-@router.get("/{post_id}")
-def get_post(post_id: str) -> Post:
-    """投稿を1件取得"""
-    backend = get_backend()
-    post = backend.get_post(post_id)
+) -> SearchPostsResponse:
+    """投稿を全文検索 (本文とタグ、関連度順)"""
+    if not settings.search_index_enabled:
+        raise HTTPException(status_code=404, detail="Search is not enabled")
+    offset = 0
+    if nextToken is not None:
+        if not nextToken.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid nextToken")
+        offset = int(nextToken)
+    index = await _load_search_index()
+    post_ids, total = index.search(q, limit, offset, tag)
+    # 次のページの位置はヒット順で数える (取得できなかった投稿があってもずれない)
+    next_offset = offset + len(post_ids)
+    return SearchPostsResponse(
+        items=await _load_posts(post_ids),
+        limit=limit,
+        nextToken=str(next_offset) if next_offset < total else None,
+        total=total,
+    )
+
+
+@router.get("/{post_id}", response_model=Post)
+async def get_post(
+    post_id: str,
+    request: Request,
+    response: Response,
+    fields: str | None = _FIELDS_QUERY,
+) -> Post | JSONResponse:
+    """投稿を1件取得 (コンパクト表現の選択は一覧と同じ)"""
+    compact, selected = _compact_fields(request, fields)
+    backend = get_async_backend()
+    post = await backend.get_post(post_id)
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
+    if compact:
+        if not isinstance(post, Post):
+            post = Post.model_validate(post)
+        return _compact_response(post.to_compact(selected))
+    response.headers["Vary"] = "Accept"
     return post
 
 
-@router.post("", status_code=201)
-def create_post(
-    body: CreatePostBody,
-    user: UserInfo = Depends(require_user),
-) -> dict:
-    """投稿を作成"""
+def _check_image_count(body: CreatePostBody, prefix: str = "") -> None:
     limit = settings.max_images_per_post
     if body.image_keys and len(body.image_keys) > limit:
         raise HTTPException(
             status_code=400,
-            detail=f"画像は1投稿あたり{limit}枚までです（送信: {len(body.image_keys)}枚）",
+            detail=f"{prefix}画像は1投稿あたり{limit}枚までです（送信: {len(body.image_keys)}枚）",
         )
-    backend = get_backend()
-    return backend.create_post(body, user)
+
+
+def _check_batch_size(count: int) -> None:
+    limit = settings.posts_batch_max_items
+    if count > limit:
+        raise HTTPException(
+            status_code=400,
+            detail=f"一括操作は1リクエストあたり{limit}件までです（送信: {count}件）",
+        )
+
+
+def _batch_response(results: list[dict]) -> dict:
+    failed = sum(1 for result in results if result["status"] >= 400)
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+
+@router.post("", status_code=201)
+async def create_post(
+    body: CreatePostBody,
+    user: UserInfo = Depends(require_user),
+) -> dict:
+    """投稿を作成"""
+    _check_image_count(body)
+    backend = get_async_backend()
+    created = await backend.create_post(body, user)
+    _update_search_index(upserted=[created])
+    return created
+
+
+@router.post(":batch")
+async def create_posts(
+    body: BatchCreatePostsBody,
+    user: UserInfo = Depends(require_user),
+) -> dict:
+    """投稿を一括作成 (要素ごとの status を results で返す)"""
+    _check_batch_size(len(body.items))
+    for index, item in enumerate(body.items):
+        _check_image_count(item, prefix=f"items[{index}]: ")
+    backend = get_async_backend()
+    results = await backend.create_posts(body.items, user)
+    _update_search_index(upserted=[r["post"] for r in results if r["status"] == 201])
+    return _batch_response(results)
+
+
+@router.delete(":batch")
+async def delete_posts(
+    body: BatchDeletePostsBody,
+    user: UserInfo = Depends(require_user),
+) -> dict:
+    """投稿を一括削除 (要素ごとの status を results で返す)"""
+    _check_batch_size(len(body.post_ids))
+    backend = get_async_backend()
+    results = await backend.delete_posts(body.post_ids, user)
+    _update_search_index(removed=[r["postId"] for r in results if r["status"] == 200])
+    return _batch_response(results)
 
 
 @router.delete("/{post_id}")
-def delete_post(
+async def delete_post(
     post_id: str,
     user: UserInfo = Depends(require_user),
 ) -> dict:
     """投稿を削除"""
-    backend = get_backend()
-    return backend.delete_post(post_id, user)
+    backend = get_async_backend()
+    result = await backend.delete_post(post_id, user)
+    _update_search_index(removed=[post_id])
+    return result
 
 
 @router.put("/{post_id}")
-def update_post(
+async def update_post(
     post_id: str,
     body: UpdatePostBody,
     user: UserInfo = Depends(require_user),
 ) -> dict:
     """投稿を更新"""
-    backend = get_backend()
-    return backend.update_post(post_id, body, user)
+    backend = get_async_backend()
+    updated = await backend.update_post(post_id, body, user)
+    _update_search_index(removed=[post_id], upserted=[updated])
+    return updated
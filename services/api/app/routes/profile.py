@@ -1,31 +1,37 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends
 
 from app.auth import UserInfo, require_user
-from app.backends import get_backend
+from app.backends import get_async_backend
 from app.models import ProfileResponse, ProfileUpdateRequest
 
 router = APIRouter(prefix="/profile", tags=["profile"])
 
 
 @router.get("/{user_id}", response_model=ProfileResponse)
-def get_profile(user_id: str) -> ProfileResponse:
+async def get_profile(user_id: str) -> ProfileResponse:
     """プロフィールを取得"""
-    backend = get_backend()
-    return backend.get_profile(user_id)
+    backend = get_async_backend()
+    return await backend.get_profile(user_id)
 
 
 @router.get("", response_model=ProfileResponse)
-def get_my_profile(user: UserInfo = Depends(require_user)) -> ProfileResponse:
+async def get_my_profile(user: UserInfo = Depends(require_user)) -> ProfileResponse:
     """自分のプロフィールを取得"""
-    backend = get_backend()
-    return backend.get_profile(user.user_id)
+    backend = get_async_backend()
+    return await backend.get_profile(user.user_id)
 
 
 @router.put("", response_model=ProfileResponse)
-def update_profile(
+async def update_profile(
     body: ProfileUpdateRequest,
+    background_tasks: BackgroundTasks,
     user: UserInfo = Depends(require_user),
 ) -> ProfileResponse:
-    """プロフィールを更新"""
-    backend = get_backend()
-    return backend.update_profile(user, body)
+    """プロフィールを更新 (nickname 変更時は投稿への反映をバックグラウンドで実行)"""
+    backend = get_async_backend()
+    profile = await backend.update_profile(user, body)
+    if body.nickname is not None:
+        background_tasks.add_task(
+            backend.refresh_author_snapshot, user.user_id, profile.nickname
+        )
+    return profile
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.auth import UserInfo, require_user
-from app.backends import get_backend
+from app.backends import get_async_backend
 from app.config import settings
 from app.models import UploadUrlsRequest, UploadUrlsResponse
 
@@ -8,7 +8,7 @@ router = APIRouter(prefix="/uploads", tags=["uploads"])
 
 
 @router.post("/presigned-urls", response_model=UploadUrlsResponse)
-def generate_upload_urls(
+async def generate_upload_urls(
     body: UploadUrlsRequest,
     user: UserInfo = Depends(require_user),
 ) -> UploadUrlsResponse:
@@ -19,6 +19,6 @@ def generate_upload_urls(
             status_code=400,
             detail=f"画像は1投稿あたり{limit}枚までです（リクエスト: {body.count}枚）",
         )
-    backend = get_backend()
-    urls = backend.generate_upload_urls(body.count, user, body.content_types)
+    backend = get_async_backend()
+    urls = await backend.generate_upload_urls(body.count, user, body.content_types)
     return UploadUrlsResponse(urls=urls)
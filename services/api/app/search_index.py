@@ -0,0 +1,282 @@
+"""In-process inverted index behind GET /posts/search
+
+Posts are tokenized after NFKC normalisation and lower-casing:
+
+- Latin / digit runs become one term per word.
+- CJK runs (kana, kanji, hangul) become overlapping bigrams, since Japanese has
+  no spaces to split on ("東京タワー" -> 東京 京タ タワ ワー). A one-character
+  query matches every bigram that contains the character.
+- Tags are indexed twice: as ``#tag`` for exact tag queries, and through the
+  tokenizer with a boost so that a tag match outranks a passing mention.
+
+A query matches posts that contain every query term (AND). Results are ranked
+by BM25, ties broken by recency, and paginated by offset.
+
+The index keeps postings plus each post's id, createdAt and handle, never the
+posts themselves: the search route loads the page of hits from the backend, so
+presigned image URLs are signed when served rather than when indexed.
+
+The index lives in the API process and is opt-in (``SEARCH_INDEX_ENABLED``),
+since every process reads the whole posts table to build it: enable it on
+long-running containers, not on serverless functions where each cold start
+would scan the table. When enabled it is built from the backend at startup
+(or by the first search), rebuilt in the background after
+``SEARCH_INDEX_REFRESH_SECONDS`` while the previous index keeps serving, and
+kept current by the post routes on create / update / delete. Writes made
+through other instances show up at the next rebuild.
+"""
+
+import heapq
+import math
+import re
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+
+from app.models import Post
+
+# BM25 パラメータ
+K1 = 1.2
+B = 0.75
+# タグ由来の語の出現回数への加算 (本文より強く効かせる)
+TAG_BOOST = 3
+
+_CJK = "぀-ヿ㐀-䶿一-鿿豈-﫿가-힯"
+_TOKEN = re.compile(rf"(?P<cjk>[{_CJK}]+)|(?P<word>[^\W_{_CJK}]+)")
+_CJK_TERM = re.compile(rf"[{_CJK}]+")
+
+
+def normalize(text: str) -> str:
+    """全角英数・半角カナなどを NFKC で正規化し、小文字にする"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def tokenize(text: str) -> list[str]:
+    """検索語に分割する (英数字は単語、CJK は 2-gram。1 文字だけの CJK はそのまま)"""
+    terms = []
+    for match in _TOKEN.finditer(normalize(text)):
+        run = match.group("cjk")
+        if run is None:
+            terms.append(match.group("word"))
+        elif len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def tag_term(tag: str) -> str:
+    return "#" + normalize(tag.lstrip("#"))
+
+
+def query_terms(query: str) -> list[str]:
+    """検索文字列の語 (空白区切りの "#tag" はタグ完全一致の語になる)"""
+    terms = []
+    for word in query.split():
+        if word.startswith("#") and len(word) > 1:
+            terms.append(tag_term(word))
+        else:
+            terms.extend(tokenize(word))
+    return list(dict.fromkeys(terms))
+
+
+class SearchIndex:
+    """投稿本文とタグの転置インデックス
+
+    ポスティングは語ごとの文書番号 (array('I')) と出現回数 (array('H'))。
+    文書ごとに持つのは postId・createdAt (同点の並び順)・ハンドルのみ。
+    削除・更新は文書を墓標にして読み飛ばし、墓標が生存文書数を超えたら詰め直す。
+    イベントループ (async ルート) からのみ操作する前提でロックは持たない。
+    """
+
+    def __init__(self) -> None:
+        # 文書番号 -> postId (削除済みは None) / createdAt
+        self._ids: list[str | None] = []
+        self._created: list[str] = []
+        self._lengths = array("I")
+        self._doc_of: dict[str, int] = {}
+        # ハンドル -> postId と、その逆引き
+        self._handles: dict[str, str] = {}
+        self._handle_of: dict[str, str] = {}
+        self._postings: dict[str, tuple[array, array]] = {}
+        # 1 文字クエリ用: 文字 -> その文字を含む語
+        self._terms_by_char: dict[str, set[str]] = {}
+        self._live = 0
+        self._total_length = 0
+        self.built_at = 0.0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __contains__(self, post_id: str) -> bool:
+        return post_id in self._doc_of
+
+    @staticmethod
+    def _doc_terms(post: Post) -> Counter:
+        terms = Counter(tokenize(post.content))
+        for tag in post.tags or []:
+            terms[tag_term(tag)] += TAG_BOOST
+            for term in tokenize(tag):
+                terms[term] += TAG_BOOST
+        return terms
+
+    def add(self, post: Post) -> None:
+        """投稿を追加する (同じ postId があれば置き換える)"""
+        self.remove(post.id)
+        doc = len(self._ids)
+        terms = self._doc_terms(post)
+        length = sum(terms.values())
+        self._ids.append(post.id)
+        self._created.append(post.created_at or "")
+        self._lengths.append(length)
+        self._doc_of[post.id] = doc
+        if post.handle:
+            self._handles[post.handle] = post.id
+            self._handle_of[post.id] = post.handle
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("H"))
+                if _CJK_TERM.fullmatch(term):
+                    for char in set(term):
+                        self._terms_by_char.setdefault(char, set()).add(term)
+            postings[0].append(doc)
+            postings[1].append(min(tf, 0xFFFF))
+        self._live += 1
+        self._total_length += length
+
+    def add_many(self, posts: Iterable[Post]) -> None:
+        for post in posts:
+            self.add(post)
+
+    def remove(self, post_id: str) -> bool:
+        """postId またはハンドルで投稿を除く (無ければ False)"""
+        post_id = self._handles.get(post_id, post_id)
+        doc = self._doc_of.pop(post_id, None)
+        if doc is None:
+            return False
+        handle = self._handle_of.pop(post_id, None)
+        if handle is not None:
+            self._handles.pop(handle, None)
+        self._ids[doc] = None
+        self._live -= 1
+        self._total_length -= self._lengths[doc]
+        if len(self._ids) - self._live > max(self._live, 1024):
+            self._compact()
+        return True
+
+    def _compact(self) -> None:
+        """墓標を除いて文書番号を振り直す (本文は持たないのでポスティングを書き換える)"""
+        renumbered: dict[int, int] = {}
+        ids: list[str | None] = []
+        created: list[str] = []
+        lengths = array("I")
+        for doc, post_id in enumerate(self._ids):
+            if post_id is not None:
+                renumbered[doc] = len(ids)
+                ids.append(post_id)
+                created.append(self._created[doc])
+                lengths.append(self._lengths[doc])
+        for term, (docs, tfs) in list(self._postings.items()):
+            kept = [(renumbered[doc], tf) for doc, tf in zip(docs, tfs, strict=True) if doc in renumbered]
+            if kept:
+                self._postings[term] = (array("I", (d for d, _ in kept)), array("H", (t for _, t in kept)))
+                continue
+            del self._postings[term]
+            for char in set(term) if _CJK_TERM.fullmatch(term) else ():
+                terms = self._terms_by_char[char]
+                terms.discard(term)
+                if not terms:
+                    del self._terms_by_char[char]
+        self._ids, self._created, self._lengths = ids, created, lengths
+        self._doc_of = {post_id: renumbered[doc] for post_id, doc in self._doc_of.items()}
+
+    def _matching(self, term: str) -> dict[int, int]:
+        """語を含む生存文書 -> 出現回数"""
+        if len(term) == 1 and term in self._terms_by_char:
+            # 1 文字の CJK クエリ: その文字を含むすべての語の和
+            found: Counter = Counter()
+            for other in self._terms_by_char[term]:
+                found.update(dict(zip(*self._postings[other], strict=True)))
+        else:
+            postings = self._postings.get(term)
+            if postings is None:
+                return {}
+            found = dict(zip(*postings, strict=True))
+        if self._live != len(self._ids):
+            found = {doc: tf for doc, tf in found.items() if self._ids[doc] is not None}
+        return found
+
+    def search(
+        self, query: str, limit: int, offset: int = 0, tag: str | None = None
+    ) -> tuple[list[str], int]:
+        """
+        クエリのすべての語を含む投稿の postId を BM25 の降順 (同点は新しい順) で返す
+
+        Args:
+            query: 検索文字列 ("#tag" はタグ完全一致)
+            limit: 返す件数
+            offset: 先頭から読み飛ばす件数
+            tag: 指定時はこのタグを持つ投稿に限る
+
+        Returns:
+            (postId のリスト, ヒット総数)
+        """
+        terms = query_terms(query)
+        if not terms or self._live == 0:
+            return [], 0
+
+        matches = []
+        for term in terms:
+            found = self._matching(term)
+            if not found:
+                return [], 0
+            matches.append((term, found))
+        # 件数の少ない語から絞り込む
+        matches.sort(key=lambda item: len(item[1]))
+        candidates = set(matches[0][1])
+        for _, found in matches[1:]:
+            candidates &= found.keys()
+        if tag:
+            # tag= は絞り込みのみ (スコアには寄与しない)
+            candidates &= self._matching(tag_term(tag)).keys()
+        if not candidates:
+            return [], 0
+
+        # BM25: 文書長による正規化項は語によらないので先に求める
+        avg_length = self._total_length / self._live
+        lengths = self._lengths
+        norms = {doc: K1 * (1 - B + B * lengths[doc] / avg_length) for doc in candidates}
+        scores = dict.fromkeys(candidates, 0.0)
+        for _, found in matches:
+            df = len(found)
+            weight = math.log(1 + (self._live - df + 0.5) / (df + 0.5)) * (K1 + 1)
+            for doc, norm in norms.items():
+                tf = found[doc]
+                scores[doc] += weight * tf / (tf + norm)
+
+        created = self._created
+        top = heapq.nlargest(offset + limit, candidates, key=lambda doc: (scores[doc], created[doc]))
+        return [self._ids[doc] for doc in top[offset:]], len(candidates)
+
+
+_index: SearchIndex | None = None
+
+
+def get_search_index() -> SearchIndex | None:
+    """構築済みのプロセス内インデックス (未構築なら None)"""
+    return _index
+
+
+def set_search_index(index: SearchIndex | None) -> None:
+    global _index
+    _index = index
+
+
+def is_stale(index: SearchIndex | None, refresh_seconds: float) -> bool:
+    """未構築、または refresh_seconds を過ぎた (0 なら再構築しない) か"""
+    if index is None:
+        return True
+    return bool(refresh_seconds) and time.monotonic() - index.built_at > refresh_seconds
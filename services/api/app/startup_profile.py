@@ -0,0 +1,182 @@
+"""Import-time profile of the API package, aggregated by subsystem
+
+``scripts/analyze-coldstart.sh`` measures cold starts from the outside (log
+durations). This module explains where the import part of INIT goes: it runs
+``python -X importtime -c "import app.main"`` in fresh interpreters and sums
+each module's *self* time into the subsystem that owns it (FastAPI, Pydantic,
+AWS SDK, Powertools, auth/JWT, provider SDKs, stdlib, app, ...).
+
+    python -m app.startup_profile [--runs 3] [--top 15] [--compare] [--lazy]
+
+``--lazy`` profiles with LAZY_IMPORTS=true (Powertools / Mangum deferred to
+the first Lambda invocation); ``--compare`` prints both modes side by side.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import NamedTuple
+
+# トップレベルパッケージ → サブシステム (未登録は stdlib / other)
+SUBSYSTEMS: dict[str, str] = {
+    **dict.fromkeys(("fastapi", "starlette", "anyio", "sniffio", "idna"), "fastapi"),
+    **dict.fromkeys(
+        (
+            "pydantic",
+            "pydantic_core",
+            "pydantic_settings",
+            "annotated_types",
+            "typing_extensions",
+            "typing_inspection",
+            "dotenv",
+        ),
+        "pydantic",
+    ),
+    **dict.fromkeys(
+        ("boto3", "botocore", "s3transfer", "jmespath", "dateutil", "six"), "aws-sdk"
+    ),
+    **dict.fromkeys(("aws_lambda_powertools", "aws_xray_sdk", "wrapt"), "powertools"),
+    "mangum": "mangum",
+    **dict.fromkeys(
+        (
+            "jose",
+            "cryptography",
+            "ecdsa",
+            "rsa",
+            "pyasn1",
+            "requests",
+            "urllib3",
+            "charset_normalizer",
+            "certifi",
+        ),
+        "auth",
+    ),
+    "redis": "redis",
+    "azure": "azure-sdk",
+    **dict.fromkeys(("google", "grpc", "proto", "googleapiclient"), "gcp-sdk"),
+    "app": "app",
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    """``-X importtime`` の出力 (stderr) をパースする"""
+    records = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(
+                ImportRecord(module, int(self_us), int(cumulative_us), len(indent) // 2)
+            )
+    return records
+
+
+def subsystem_of(module: str) -> str:
+    """モジュール名が属するサブシステム名"""
+    top = module.split(".", 1)[0]
+    if top in SUBSYSTEMS:
+        return SUBSYSTEMS[top]
+    if top in sys.stdlib_module_names or top.startswith("_"):
+        return "stdlib"
+    return "other"
+
+
+def aggregate(records: list[ImportRecord]) -> dict[str, int]:
+    """サブシステムごとの self time 合計 (マイクロ秒)"""
+    totals: dict[str, int] = defaultdict(int)
+    for record in records:
+        totals[subsystem_of(record.module)] += record.self_us
+    return dict(totals)
+
+
+def profile_once(module: str, lazy: bool) -> list[ImportRecord]:
+    """新しいインタプリタで module を import し、import 時間を計測する"""
+    env = {**os.environ, "LAZY_IMPORTS": "true" if lazy else "false"}
+    # 計測中のウォームアップ (ネットワーク I/O) を避ける
+    env["STARTUP_WARMUP"] = "false"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).resolve().parent.parent,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def profile(module: str, lazy: bool, runs: int) -> tuple[dict[str, float], list[ImportRecord]]:
+    """runs 回計測し、サブシステム別の中央値 (ms) と最後の計測の明細を返す"""
+    per_run = []
+    records: list[ImportRecord] = []
+    for _ in range(runs):
+        records = profile_once(module, lazy)
+        per_run.append(aggregate(records))
+    names = {name for totals in per_run for name in totals}
+    medians = {
+        name: statistics.median(totals.get(name, 0) for totals in per_run) / 1000
+        for name in names
+    }
+    return medians, records
+
+
+def _print_subsystems(columns: dict[str, dict[str, float]]) -> None:
+    labels = list(columns)
+    names = sorted(
+        {name for totals in columns.values() for name in totals},
+        key=lambda name: -max(totals.get(name, 0) for totals in columns.values()),
+    )
+    print(f"{'subsystem':<12}" + "".join(f"{label + ' ms':>12}" for label in labels))
+    for name in names:
+        print(f"{name:<12}" + "".join(f"{columns[label].get(name, 0):>12.1f}" for label in labels))
+    print(f"{'total':<12}" + "".join(f"{sum(columns[label].values()):>12.1f}" for label in labels))
+
+
+def _print_top_modules(records: list[ImportRecord], top: int) -> None:
+    print(f"\n{'module':<48} {'self ms':>9} {'cumul ms':>9}  subsystem")
+    for record in sorted(records, key=lambda r: -r.self_us)[:top]:
+        print(
+            f"{record.module:<48} {record.self_us / 1000:>9.1f} "
+            f"{record.cumulative_us / 1000:>9.1f}  {subsystem_of(record.module)}"
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--lazy", action="store_true", help="profile with LAZY_IMPORTS=true")
+    parser.add_argument("--compare", action="store_true", help="eager and lazy side by side")
+    args = parser.parse_args(argv)
+
+    modes = [False, True] if args.compare else [args.lazy]
+    columns: dict[str, dict[str, float]] = {}
+    records: list[ImportRecord] = []
+    for lazy in modes:
+        columns["lazy" if lazy else "eager"], records = profile(args.module, lazy, args.runs)
+
+    print(f"import {args.module}: median self time of {args.runs} fresh interpreter(s)")
+    _print_subsystems(columns)
+    if args.top:
+        _print_top_modules(records, args.top)
+
+
+if __name__ == "__main__":
+    main()
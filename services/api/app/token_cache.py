@@ -0,0 +1,83 @@
+"""Process-local cache of successfully verified bearer tokens (TTL + LRU)
+
+A browsing session sends many requests with the same token, and each full
+RS256 verification costs tens of microseconds of CPU. get_current_user keeps
+the resulting UserInfo keyed by sha256(token):
+
+- only successful verifications are stored;
+- an entry lives at most ``ttl_seconds`` and never past the token's ``exp``;
+- every entry is dropped when the JWKS of any verifier rotates (a removed
+  key must stop authenticating tokens immediately).
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class VerifiedTokenCache:
+    """検証済みトークンのプロセス内キャッシュ (TTL + LRU, スレッドセーフ)"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Args:
+            max_entries: 保持する最大エントリ数 (0 でキャッシュ無効)
+            ttl_seconds: エントリの最大保持時間 (トークンの exp が先ならそちら)
+        """
+        self._max_entries = max(max_entries, 0)
+        self._ttl = ttl_seconds
+        self._entries: OrderedDict[bytes, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Any | None:
+        """有効期限内のエントリを返す (無ければ None)"""
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def put(self, token: str, value: Any, exp: float | None) -> None:
+        """検証に成功したトークンを保存 (exp を過ぎたトークンは保存しない)"""
+        if not self._max_entries or self._ttl <= 0:
+            return
+        now = time.time()
+        expires_at = now + self._ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self, *_args) -> None:
+        """全エントリを破棄 (JWKS ローテーションのリスナーとしても使う)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """ヒット/ミス数と現在のエントリ数"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
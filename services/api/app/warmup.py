@@ -0,0 +1,97 @@
+"""Cold-start warm-up: move one-time initialisation out of the first request
+
+Run once per process, from the FastAPI ``lifespan`` hook or, on serverless
+runtimes where lifespan is not executed (Mangum ``lifespan="off"``, Cloud
+Functions), while ``app.main`` is imported during the INIT phase.
+
+Components (timed separately, reported in milliseconds):
+
+- ``jwks``:        JWKS fetch + key construction for the configured verifier
+- ``backend``:     the ``get_backend()`` singleton (SDK clients, table lookup)
+- ``sdk_clients``: ``BackendBase.warm_up()`` (connection pool, service models)
+
+``jwks`` runs concurrently with ``backend`` -> ``sdk_clients``. Failures are
+logged and reported, never raised: the request path retries lazily as before.
+"""
+
+import logging
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def _timed(report: dict[str, dict[str, Any]], name: str, func: Callable[[], Any]) -> Any:
+    """func を実行し、所要時間と結果を report[name] に記録する"""
+    started = time.perf_counter()
+    try:
+        result = func()
+    except Exception as e:
+        report[name] = {
+            "status": "error",
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "error": repr(e),
+        }
+        logger.warning("Warm-up of %s failed: %r", name, e)
+        raise
+    report[name] = {
+        "status": "ok" if result is not False else "skipped",
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    return result
+
+
+def _warm_jwks() -> bool:
+    from app.auth import get_jwt_verifier
+
+    verifier = get_jwt_verifier()
+    if verifier is None:
+        return False
+    verifier.get_jwks()
+    return True
+
+
+def _warm_backend(report: dict[str, dict[str, Any]]) -> None:
+    from app.backends import get_backend
+
+    try:
+        backend = _timed(report, "backend", get_backend)
+    except Exception:
+        report["sdk_clients"] = {"status": "skipped", "ms": None}
+        return
+    _timed(report, "sdk_clients", backend.warm_up)
+
+
+def run_warmup(timeout_seconds: float) -> dict[str, dict[str, Any]]:
+    """
+    JWKS・バックエンド・SDK クライアントを並行して初期化する
+
+    Args:
+        timeout_seconds: 全体の待ち時間上限。超過したコンポーネントは
+            バックグラウンドで続行し、status="timeout" として報告する
+
+    Returns:
+        {"jwks": {"status": "ok", "ms": 123.4}, ..., "total": {...}}
+    """
+    report: dict[str, dict[str, Any]] = {}
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="warmup")
+    try:
+        futures = [
+            executor.submit(_timed, report, "jwks", _warm_jwks),
+            executor.submit(_warm_backend, report),
+        ]
+        wait(futures, timeout=timeout_seconds)
+    finally:
+        # タイムアウトしたスレッドは待たない (最初のリクエストが続きを引き継ぐ)
+        executor.shutdown(wait=False)
+
+    for name in ("jwks", "backend", "sdk_clients"):
+        report.setdefault(name, {"status": "timeout", "ms": None})
+    report["total"] = {
+        "status": "ok",
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    return dict(report)
@@ -0,0 +1,5 @@
+"""
+Multi-Cloud API Benchmarks
+
+Run from services/api:  python -m benchmarks.<module> [--help]
+"""
@@ -0,0 +1,167 @@
+"""GET /posts under concurrency: sync def routes vs threaded vs native async backends
+
+Every mode serves the same 20-post page from a fake DynamoDB whose Query takes
+--latency milliseconds (a stand-in for one DynamoDB round-trip).
+
+- sync:     the pre-async handler (``def`` route calling BackendBase directly),
+            which holds one of Starlette's 40 default threadpool slots for the
+            whole I/O wait.
+- threaded: the ``async def`` route from app.routes.posts awaiting
+            ThreadedAsyncBackend (BACKEND_MAX_CONCURRENCY, default 200), the
+            fallback for providers without a native implementation.
+- native:   the same route awaiting AioAwsBackend (app/backends/dynamodb_async.py),
+            whose Query is a coroutine (asyncio.sleep instead of time.sleep), so
+            no worker thread is held while waiting.
+
+Requests are sent in-process through httpx.ASGITransport, so the numbers
+measure the worker's concurrency limit and not the network. "threads" is the
+peak number of live threads in the process during the run.
+
+    python -m benchmarks.bench_async_routes [--latency 50] [--concurrency 40,200,500]
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI, Query
+
+from app.backends.async_base import ThreadedAsyncBackend
+from app.backends.dynamodb_async import AioAwsBackend
+from app.config import settings
+from app.models import ListPostsResponse, Post
+from app.routes import posts
+
+
+def _items() -> list[dict]:
+    return [
+        {"PK": "POSTS", "SK": f"2026-01-01T00:00:00+00:00#p{i}", "postId": f"p{i}",
+         "userId": "u1", "nickname": None, "content": "hello",
+         "createdAt": "2026-01-01T00:00:00+00:00"}
+        for i in range(20)
+    ]
+
+
+class SleepBackend:
+    """Query が固定時間ブロックするだけのフェイクバックエンド (同期)"""
+
+    table_name = "bench"
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.items = _items()
+
+    def _item_to_post(self, item: dict) -> Post:
+        return Post(
+            postId=item["postId"], userId=item["userId"], content=item["content"],
+            createdAt=item["createdAt"], nickname=item["nickname"],
+        )
+
+    def list_posts(self, limit, next_token, tag):
+        time.sleep(self.latency)
+        return [self._item_to_post(item) for item in self.items[:limit]], None
+
+
+class SleepTable:
+    """aioboto3 Table の query を asyncio.sleep で待つフェイク"""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.items = _items()
+
+    async def query(self, Limit, **_kwargs):
+        await asyncio.sleep(self.latency)
+        return {"Items": self.items[:Limit]}
+
+
+def _native_backend(backend: SleepBackend, latency_ms: float) -> AioAwsBackend:
+    native = AioAwsBackend(backend, settings.backend_max_concurrency)
+    table = SleepTable(latency_ms)
+
+    async def resources():
+        return None, table
+
+    native._resources = resources
+    return native
+
+
+def _sync_app(backend: SleepBackend) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/posts", response_model=ListPostsResponse)
+    def list_posts(
+        limit: int = Query(20, ge=1, le=50),
+        nextToken: str | None = Query(None),
+        tag: str | None = Query(None),
+    ) -> ListPostsResponse:
+        items, token = backend.list_posts(limit, nextToken, tag)
+        return ListPostsResponse(items=items, limit=limit, nextToken=token)
+
+    return app
+
+
+def _async_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(posts.router)
+    return app
+
+
+async def _drive(app: FastAPI, concurrency: int, requests: int) -> tuple[float, list[float], int]:
+    latencies: list[float] = []
+    peak_threads = threading.active_count()
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one() -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get("/posts")
+                latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+            nonlocal peak_threads
+            peak_threads = max(peak_threads, threading.active_count())
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return time.perf_counter() - started, latencies, peak_threads
+
+
+def run(latency_ms: float, concurrency_levels: list[int], rounds: int) -> None:
+    backend = SleepBackend(latency_ms)
+    modes = {
+        "sync": (_sync_app(backend), None),
+        "threaded": (_async_app(), ThreadedAsyncBackend(backend, settings.backend_max_concurrency)),
+        "native": (_async_app(), _native_backend(backend, latency_ms)),
+    }
+
+    print(
+        f"backend latency={latency_ms:.0f} ms, "
+        f"BACKEND_MAX_CONCURRENCY={settings.backend_max_concurrency}"
+    )
+    print(f"{'mode':<8} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'threads':>8}")
+    for concurrency in concurrency_levels:
+        for mode, (app, async_backend) in modes.items():
+            with patch("app.routes.posts.get_async_backend", return_value=async_backend):
+                elapsed, latencies, threads = asyncio.run(
+                    _drive(app, concurrency, concurrency * rounds)
+                )
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(
+                f"{mode:<8} {concurrency:>5} {len(latencies) / elapsed:>8.0f} "
+                f"{statistics.median(latencies):>8.1f} {p99:>8.1f} {threads:>8}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=50)
+    parser.add_argument("--concurrency", default="40,200,500")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    run(args.latency, [int(c) for c in args.concurrency.split(",")], args.rounds)
@@ -0,0 +1,114 @@
+"""AzureBackend.list_posts: page 1 vs page 100 (OFFSET vs keyset tokens)
+
+By default runs against an in-process fake container that executes the same
+two query shapes over a sorted list and counts the documents each query has
+to load (Cosmos DB bills RU roughly in proportion to that number).
+With --emulator, runs against the Cosmos DB emulator / account configured by
+COSMOS_DB_ENDPOINT and COSMOS_DB_KEY and reports the real request charge.
+
+    python -m benchmarks.bench_azure_pagination [--posts 5000] [--limit 20]
+"""
+
+import argparse
+import bisect
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
+
+from app.backends.azure_backend import AzureBackend
+
+
+class FakePostsContainer:
+    """ORDER BY c.createdAt DESC, c.id DESC の OFFSET / keyset (TOP) クエリを再現する最小フェイク"""
+
+    def __init__(self, items: list[dict]):
+        # 降順 (createdAt, id) で保持
+        self.items = sorted(items, key=lambda i: (i["createdAt"], i["id"]), reverse=True)
+        self._ascending_keys = [(i["createdAt"], i["id"]) for i in reversed(self.items)]
+        self.documents_loaded = 0
+
+    def query_items(self, query: str, parameters: list[dict], **_kwargs):
+        params = {p["name"]: p["value"] for p in parameters}
+        offset, limit = params.get("@offset", 0), params["@limit"]
+        start = 0
+        if "@createdAt" in params:
+            # 降順リスト上で (createdAt, id) より後ろの位置をインデックスで特定
+            cursor = (params["@createdAt"], params["@id"])
+            start = len(self.items) - bisect.bisect_left(self._ascending_keys, cursor)
+        end = min(start + offset + limit, len(self.items))
+        self.documents_loaded = end - start
+        return self.items[start + offset:end]
+
+
+def _make_items(count: int) -> list[dict]:
+    base = datetime(2026, 1, 1, tzinfo=UTC)
+    return [
+        {
+            "id": (pid := str(uuid.uuid4())),
+            "postId": pid,
+            "userId": f"user-{n % 50}",
+            "content": f"post {n}",
+            "tags": [],
+            "createdAt": (base + timedelta(seconds=n)).isoformat(),
+        }
+        for n in range(count)
+    ]
+
+
+def _fake_backend(count: int) -> tuple[AzureBackend, FakePostsContainer]:
+    backend = object.__new__(AzureBackend)
+    backend.posts_container = FakePostsContainer(_make_items(count))
+    backend.storage_account = None
+    backend.images_container = "images"
+    return backend, backend.posts_container
+
+
+def _request_charge(backend: AzureBackend) -> float:
+    headers = backend.posts_container.client_connection.last_response_headers
+    return float(headers.get("x-ms-request-charge", 0))
+
+
+def _measure(backend, container, limit: int, token: str | None) -> tuple[float, float]:
+    started = time.perf_counter()
+    backend.list_posts(limit, token, None)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    cost = container.documents_loaded if container else _request_charge(backend)
+    return elapsed_ms, cost
+
+
+def run(posts: int, limit: int, emulator: bool) -> None:
+    if emulator:
+        backend, container = AzureBackend(), None
+        cost_label = "RU"
+    else:
+        backend, container = _fake_backend(posts)
+        cost_label = "docs loaded"
+
+    target_page = 100
+    print(f"posts={posts} limit={limit} ({'emulator' if emulator else 'local fake'})")
+    print(f"{'mode':<8} {'page':>5} {'latency ms':>11} {cost_label:>12}")
+
+    # keyset: トークンを辿って 100 ページ目まで進む
+    token = None
+    for page in range(1, target_page + 1):
+        if page in (1, target_page):
+            ms, cost = _measure(backend, container, limit, token)
+            print(f"{'keyset':<8} {page:>5} {ms:>11.2f} {cost:>12.1f}")
+        _, token = backend.list_posts(limit, token, None)
+        if token is None:
+            break
+
+    # legacy OFFSET: 数値トークンで直接 100 ページ目を要求
+    for page in (1, target_page):
+        legacy_token = str((page - 1) * limit) if page > 1 else None
+        ms, cost = _measure(backend, container, limit, legacy_token)
+        print(f"{'offset':<8} {page:>5} {ms:>11.2f} {cost:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--emulator", action="store_true")
+    args = parser.parse_args()
+    run(args.posts, args.limit, args.emulator)
@@ -0,0 +1,93 @@
+"""Bulk post creation / deletion: one write per post vs the batch backend methods
+
+Load test against DynamoDB Local (DYNAMODB_ENDPOINT, default
+http://localhost:8001) through LocalBackend, on a scratch table per size.
+
+- single: create_post / delete_post once per post, as the seeding scripts
+          and admin moderation did (one HTTP request per post).
+- batch:  create_posts / delete_posts in chunks of POSTS_BATCH_MAX_ITEMS,
+          i.e. what POST / DELETE /posts:batch run per request
+          (BatchWriteItem, 25 items per call).
+
+    docker compose up -d dynamodb-local
+    python -m benchmarks.bench_batch_posts [--sizes 1000,10000] [--tags 2]
+"""
+
+import argparse
+import time
+import uuid
+from unittest.mock import patch
+
+from app.auth import UserInfo
+from app.backends.local_backend import LocalBackend
+from app.config import settings
+from app.models import CreatePostBody
+
+USER = UserInfo(user_id="bench-user", email="bench@example.com", groups=None)
+
+
+def _bodies(count: int, tags: int) -> list[CreatePostBody]:
+    return [
+        CreatePostBody(content=f"bench post {n}", tags=[f"t{n % 7 + i}" for i in range(tags)])
+        for n in range(count)
+    ]
+
+
+def _chunks(values: list, size: int) -> list[list]:
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+
+def _single(backend: LocalBackend, bodies: list[CreatePostBody]) -> tuple[float, float]:
+    started = time.perf_counter()
+    post_ids = [backend.create_post(body, USER)["postId"] for body in bodies]
+    created = time.perf_counter() - started
+    started = time.perf_counter()
+    for post_id in post_ids:
+        backend.delete_post(post_id, USER)
+    return created, time.perf_counter() - started
+
+
+def _batch(backend: LocalBackend, bodies: list[CreatePostBody]) -> tuple[float, float]:
+    size = settings.posts_batch_max_items
+    started = time.perf_counter()
+    handles = []
+    for chunk in _chunks(bodies, size):
+        results = backend.create_posts(chunk, USER)
+        assert all(r["status"] == 201 for r in results), results
+        handles.extend(r["post"]["postHandle"] for r in results)
+    created = time.perf_counter() - started
+    started = time.perf_counter()
+    for chunk in _chunks(handles, size):
+        results = backend.delete_posts(chunk, USER)
+        assert all(r["status"] == 200 for r in results), results
+    return created, time.perf_counter() - started
+
+
+def run(sizes: list[int], tags: int) -> None:
+    print(
+        f"endpoint={settings.dynamodb_endpoint} tags/post={tags} "
+        f"batch size={settings.posts_batch_max_items}"
+    )
+    print(f"{'posts':>6} {'mode':<7} {'create s':>9} {'posts/s':>8} {'delete s':>9} {'posts/s':>8}")
+    for size in sizes:
+        bodies = _bodies(size, tags)
+        for mode, fn in (("single", _single), ("batch", _batch)):
+            table_name = f"bench-batch-{uuid.uuid4().hex[:8]}"
+            with patch.object(settings, "dynamodb_table_name", table_name):
+                backend = LocalBackend()
+            try:
+                created, deleted = fn(backend, bodies)
+                print(
+                    f"{size:>6} {mode:<7} {created:>9.2f} {size / created:>8.0f} "
+                    f"{deleted:>9.2f} {size / deleted:>8.0f}"
+                )
+            finally:
+                backend.table.delete()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000")
+    parser.add_argument("--tags", type=int, default=2)
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.tags)
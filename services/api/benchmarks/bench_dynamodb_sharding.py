@@ -0,0 +1,168 @@
+"""DynamoDB POSTS write sharding: write TPS and timeline reads per shard count
+
+Load test against DynamoDB Local (DYNAMODB_ENDPOINT, default
+http://localhost:8001). For every shard count it creates a scratch table,
+writes --posts post items from --workers threads and then pages through the
+merged timeline with query_posts_page.
+
+DynamoDB Local has no per-partition throughput limit, so a single hot key
+does not throttle there. --partition-wcu emulates the per-partition write
+limit of the real service (1000 WCU per partition key) with a client-side
+token bucket per PK; the "ceiling" column is that limit divided by the
+hottest partition's share of writes, i.e. the TPS the table can sustain
+before the hottest key throttles.
+
+    docker compose up -d dynamodb-local
+    python -m benchmarks.bench_dynamodb_sharding [--posts 4000] [--workers 32] \\
+        [--shards 1,2,4,8] [--partition-wcu 200]
+"""
+
+import argparse
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+
+import boto3
+
+from app.backends.dynamodb_utils import posts_partition_for, query_posts_page
+from app.config import settings
+
+
+class PartitionThrottle:
+    """パーティションキーごとの書き込み上限 (WCU/秒) を再現するトークンバケット"""
+
+    def __init__(self, wcu_per_partition: int):
+        self.interval = 1.0 / wcu_per_partition if wcu_per_partition > 0 else 0.0
+        self._next_slot: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, pk: str) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot.get(pk, now), now)
+            self._next_slot[pk] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _resource():
+    return boto3.resource(
+        "dynamodb",
+        endpoint_url=settings.dynamodb_endpoint,
+        aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID", "local"),
+        aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY", "local"),
+        region_name=settings.aws_region or "ap-northeast-1",
+    )
+
+
+def _create_table(dynamodb, name: str):
+    table = dynamodb.create_table(
+        TableName=name,
+        AttributeDefinitions=[
+            {"AttributeName": "PK", "AttributeType": "S"},
+            {"AttributeName": "SK", "AttributeType": "S"},
+        ],
+        KeySchema=[
+            {"AttributeName": "PK", "KeyType": "HASH"},
+            {"AttributeName": "SK", "KeyType": "RANGE"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    return table
+
+
+def _write_posts(
+    table_name: str, posts: int, workers: int, shard_count: int, throttle: PartitionThrottle
+) -> tuple[float, Counter]:
+    local = threading.local()
+    per_partition: Counter = Counter()
+    counter_lock = threading.Lock()
+
+    def put(n: int) -> None:
+        # boto3 リソースはスレッド間で共有しない
+        if not hasattr(local, "table"):
+            local.table = _resource().Table(table_name)
+        post_id = str(uuid.uuid4())
+        now = datetime.now(UTC).isoformat()
+        pk = posts_partition_for(post_id, shard_count)
+        throttle.acquire(pk)
+        local.table.put_item(Item={
+            "PK": pk,
+            "SK": f"{now}#{post_id}",
+            "postId": post_id,
+            "userId": f"user-{n % 50}",
+            "content": f"load test post {n}",
+            "tags": [],
+            "createdAt": now,
+        })
+        with counter_lock:
+            per_partition[pk] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(put, range(posts)))
+    return time.perf_counter() - started, per_partition
+
+
+def _read_timeline(table, shard_count: int, limit: int, pages: int) -> tuple[float, int]:
+    token, read = None, 0
+    started = time.perf_counter()
+    for _ in range(pages):
+        items, token = query_posts_page(table, shard_count, limit, token)
+        read += len(items)
+        if token is None:
+            break
+    return (time.perf_counter() - started) * 1000 / pages, read
+
+
+def run(posts: int, workers: int, shard_counts: list[int], partition_wcu: int, limit: int) -> None:
+    dynamodb = _resource()
+    throttle_label = f"{partition_wcu} WCU/PK" if partition_wcu else "off"
+    print(
+        f"endpoint={settings.dynamodb_endpoint} posts={posts} workers={workers} "
+        f"partition throttle={throttle_label}"
+    )
+    print(
+        f"{'shards':>6} {'write s':>8} {'TPS':>8} {'hot share':>10} "
+        f"{'ceiling TPS':>12} {'page ms':>8}"
+    )
+    for shard_count in shard_counts:
+        table_name = f"bench-sharding-{shard_count}-{uuid.uuid4().hex[:8]}"
+        table = _create_table(dynamodb, table_name)
+        try:
+            elapsed, per_partition = _write_posts(
+                table_name, posts, workers, shard_count, PartitionThrottle(partition_wcu)
+            )
+            hot_share = max(per_partition.values()) / posts
+            ceiling = 1000 / hot_share
+            page_ms, _ = _read_timeline(table, shard_count, limit, pages=10)
+            print(
+                f"{shard_count:>6} {elapsed:>8.2f} {posts / elapsed:>8.0f} "
+                f"{hot_share:>10.2f} {ceiling:>12.0f} {page_ms:>8.2f}"
+            )
+        finally:
+            table.delete()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=4000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--shards", default="1,2,4,8")
+    parser.add_argument("--partition-wcu", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    run(
+        args.posts,
+        args.workers,
+        [int(s) for s in args.shards.split(",")],
+        args.partition_wcu,
+        args.limit,
+    )
@@ -0,0 +1,102 @@
+"""JWTVerifier.verify_token: verifications per second on one core
+
+- before: the previous hot path, reproduced here. It scans jwks["keys"]
+          linearly, parses the claims once more for the 'aud' check and hands
+          the raw JWK dict to jwt.decode, which constructs the RSA key again.
+- after:  JWTVerifier.verify_token with the kid -> constructed key index.
+
+The JWKS is pre-loaded (no network) and holds --keys keys with the signing
+key listed last, as after a key rotation.
+
+    python -m benchmarks.bench_jwt_verify [--seconds 3] [--keys 4]
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.jwt_verifier import JWTVerifier
+
+ISSUER = "https://cognito-idp.ap-northeast-1.amazonaws.com/pool-1"
+CLIENT_ID = "client-1"
+
+
+def _rsa_key(kid: str) -> tuple[str, dict]:
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    return pem, {**public, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+def legacy_verify(verifier: JWTVerifier, token: str) -> dict:
+    """改修前の verify_token (線形探索 + claims の二重パース + JWK dict 渡し)"""
+    jwks = verifier.get_jwks()
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = None
+    for candidate in jwks.get("keys", []):
+        if candidate.get("kid") == kid:
+            key = candidate
+            break
+    has_aud = "aud" in jwt.get_unverified_claims(token)
+    return jwt.decode(
+        token,
+        key,
+        algorithms=["RS256"],
+        audience=verifier.get_audience() if has_aud else None,
+        issuer=verifier.get_issuer(),
+        options={"verify_aud": has_aud, "verify_at_hash": False},
+    )
+
+
+def _rate(fn, seconds: float) -> float:
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            fn()
+        count += 50
+    return count / (time.perf_counter() - started)
+
+
+def run(seconds: float, key_count: int) -> None:
+    keys = [_rsa_key(f"kid-{i}") for i in range(key_count)]
+    pem, signing = keys[-1]
+    now = int(time.time())
+    token = jwt.encode(
+        {"sub": "user-1", "iss": ISSUER, "aud": CLIENT_ID, "iat": now, "exp": now + 3600},
+        pem,
+        algorithm="RS256",
+        headers={"kid": signing["kid"]},
+    )
+
+    verifier = JWTVerifier(
+        "cognito",
+        {"region": "ap-northeast-1", "user_pool_id": "pool-1", "client_id": CLIENT_ID},
+    )
+    verifier._store_jwks({"keys": [k for _, k in keys]}, datetime.now())
+    assert legacy_verify(verifier, token) == verifier.verify_token(token)
+
+    before = _rate(lambda: legacy_verify(verifier, token), seconds)
+    after = _rate(lambda: verifier.verify_token(token), seconds)
+    print(f"JWKS keys={key_count}, RS256 2048-bit, single thread")
+    print(f"{'path':<8} {'verify/s':>10} {'us/verify':>10}")
+    for label, rate in (("before", before), ("after", after)):
+        print(f"{label:<8} {rate:>10.0f} {1e6 / rate:>10.1f}")
+    print(f"speedup  {after / before:>10.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--keys", type=int, default=4)
+    args = parser.parse_args()
+    run(args.seconds, args.keys)
@@ -0,0 +1,85 @@
+"""GET /posts payload size and serialization cost: legacy vs compact representation
+
+Serializes one page of posts the way the route does, without a backend:
+
+- legacy:  the default response_model path (ListPostsResponse.model_dump(mode="json")
+           + json.dumps), every post three times (items/results/messages)
+           with the snake_case aliases.
+- compact: Accept: application/json; profile="compact" -> to_compact() + json.dumps,
+           every post once, camelCase only.
+- fields:  ?fields=postId,content,createdAt (sparse fieldset).
+
+    python -m benchmarks.bench_response_size [--limits 20,50] [--images 2] [--iterations 2000]
+"""
+
+import argparse
+import gzip
+import json
+import time
+from collections.abc import Callable
+from typing import Any
+
+from app.models import ListPostsResponse, Post
+
+SPARSE_FIELDS = ["postId", "content", "createdAt"]
+
+
+def _page(limit: int, images: int) -> ListPostsResponse:
+    posts = [
+        Post(
+            postId=f"{n:08d}-0000-4000-8000-000000000000",
+            postHandle=f"eyJwayI6IlBPU1RTIzMiLCJzayI6IjIwMjYtMDEtMDFUMDA6MDA6{n:04d}",
+            userId="user-0001",
+            nickname="bench",
+            content="ベンチマーク用の投稿本文です #bench " * 4,
+            tags=["bench", "news"],
+            imageUrls=[f"https://cdn.example.com/images/user-0001/{n}-{i}.jpg" for i in range(images)],
+            createdAt="2026-01-01T00:00:00.000000Z",
+        )
+        for n in range(limit)
+    ]
+    return ListPostsResponse(items=posts, limit=limit, nextToken="eyJwayI6IlBPU1RTIn0")
+
+
+def _encoders(page: ListPostsResponse) -> dict[str, Callable[[], bytes]]:
+    def dumps(content: Any) -> bytes:
+        # starlette JSONResponse.render と同じ設定
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+    return {
+        "legacy": lambda: dumps(page.model_dump(mode="json")),
+        "compact": lambda: dumps(page.to_compact()),
+        "fields": lambda: dumps(page.to_compact(SPARSE_FIELDS)),
+    }
+
+
+def _per_call_us(func: Callable[[], bytes], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def run(limits: list[int], images: int, iterations: int) -> None:
+    print(f"images/post={images} iterations={iterations}")
+    print(f"{'limit':>5} {'mode':<8} {'bytes':>8} {'gzip':>7} {'us/page':>9} {'vs legacy':>10}")
+    for limit in limits:
+        encoders = _encoders(_page(limit, images))
+        baseline = len(encoders["legacy"]())
+        for mode, func in encoders.items():
+            body = func()
+            print(
+                f"{limit:>5} {mode:<8} {len(body):>8} {len(gzip.compress(body)):>7} "
+                f"{_per_call_us(func, iterations):>9.1f} {len(body) / baseline:>9.0%}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limits", default="20,50")
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    run([int(s) for s in args.limits.split(",")], args.images, args.iterations)
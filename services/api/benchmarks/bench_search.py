@@ -0,0 +1,117 @@
+"""GET /posts/search: inverted index vs a full scan over 100k synthetic posts
+
+Synthetic posts are Japanese sentences drawn from a fixed vocabulary (plus
+some English words and tags), generated with a fixed seed.
+
+- scan:  normalized substring match over every post, then newest first, i.e.
+         the frontend's str.find filter applied to all posts instead of 20.
+- index: app.search_index.SearchIndex (CJK bigrams, BM25, AND).
+
+Also reports the index build time and size (tracemalloc; the index keeps post
+ids, not posts) and the cost of the incremental updates done by create /
+update / delete. The index column covers ranking only; the route then loads
+the page of hits from the backend.
+
+    python -m benchmarks.bench_search [--posts 100000] [--repeat 20]
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from app.models import Post
+from app.search_index import SearchIndex, normalize
+
+SUBJECTS = ["今日は", "昨日", "週末に", "朝から", "久しぶりに", "友達と", "家族で", "一人で"]
+PLACES = ["東京タワー", "京都駅", "大阪城", "北海道", "渋谷", "横浜の中華街", "富士山", "沖縄の海", "近所のカフェ", "図書館"]
+ACTIONS = ["に行きました", "を散歩した", "でランチ", "で写真を撮った", "の景色が最高", "で新しい本を読んだ", "でコーヒーを飲んだ"]
+REMARKS = ["楽しかった", "また行きたい", "疲れたけど満足", "雨だった", "天気が良かった", "人が多かった", "おすすめです"]
+ENGLISH = ["coffee", "travel", "photo", "weekend", "python", "aws", "sunset", "ramen"]
+TAGS = ["旅行", "カフェ", "写真", "ランチ", "読書", "travel", "tech", "food"]
+
+QUERIES = ["東京", "京都駅", "コーヒー", "富士山 写真", "ramen", "#旅行", "海", "楽しかった また行きたい"]
+
+
+def _posts(count: int) -> list[Post]:
+    rng = random.Random(42)
+    posts = []
+    for n in range(count):
+        content = "".join(
+            [rng.choice(SUBJECTS), rng.choice(PLACES), rng.choice(ACTIONS), "。", rng.choice(REMARKS)]
+        )
+        if rng.random() < 0.3:
+            content += " " + " ".join(rng.sample(ENGLISH, 2))
+        posts.append(
+            Post(
+                postId=f"{n:08d}",
+                userId=f"user-{n % 500}",
+                content=content,
+                tags=rng.sample(TAGS, rng.randint(0, 2)),
+                createdAt=f"2026-01-01T00:00:00.{n:06d}Z",
+            )
+        )
+    return posts
+
+
+def scan(posts: list[Post], query: str, limit: int) -> tuple[list[Post], int]:
+    needles = [normalize(word.lstrip("#")) for word in query.split()]
+    hits = [
+        post for post in posts
+        if all(needle in normalize(post.content + " " + " ".join(post.tags or [])) for needle in needles)
+    ]
+    hits.sort(key=lambda post: post.created_at, reverse=True)
+    return hits[:limit], len(hits)
+
+
+def _median_ms(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(count: int, repeat: int) -> None:
+    posts = _posts(count)
+
+    started = time.perf_counter()
+    index = SearchIndex()
+    index.add_many(posts)
+    build_s = time.perf_counter() - started
+    # サイズは別インスタンスで計測する (tracemalloc 下では構築が数倍遅くなる)
+    tracemalloc.start()
+    measured = SearchIndex()
+    measured.add_many(posts)
+    size_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+    tracemalloc.stop()
+    del measured
+    print(f"posts={count} build={build_s:.2f}s ({count / build_s:.0f} posts/s) index size={size_mb:.1f} MB")
+
+    print(f"\n{'query':<22} {'hits':>7} {'scan ms':>9} {'index ms':>9} {'speedup':>8}")
+    for query in QUERIES:
+        _, total = index.search(query, 20)
+        scan_ms = _median_ms(lambda query=query: scan(posts, query, 20), max(1, repeat // 10))
+        index_ms = _median_ms(lambda query=query: index.search(query, 20), repeat)
+        print(f"{query:<22} {total:>7} {scan_ms:>9.1f} {index_ms:>9.2f} {scan_ms / index_ms:>7.0f}x")
+
+    updates = [post.model_copy(update={"content": post.content + " 更新"}) for post in posts[:1000]]
+    started = time.perf_counter()
+    for post in updates:
+        index.add(post)
+    update_us = (time.perf_counter() - started) / len(updates) * 1_000_000
+    started = time.perf_counter()
+    for post in updates:
+        index.remove(post.id)
+    remove_us = (time.perf_counter() - started) / len(updates) * 1_000_000
+    print(f"\nincremental: update {update_us:.0f} us/post, delete {remove_us:.1f} us/post")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.posts, args.repeat)
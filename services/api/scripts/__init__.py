@@ -0,0 +1 @@
+"""One-off maintenance scripts for the API data stores (run as ``python -m scripts.<name>``)"""
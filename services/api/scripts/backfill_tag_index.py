@@ -0,0 +1,96 @@
+"""Backfill TAG#<tag> index items for posts written before the tag index existed
+
+Walks every POSTS partition (including write shards) page by page and writes
+one index item per tag
+(see app/backends/dynamodb_utils.py). Put is idempotent, so the script can be
+re-run or resumed with --start-sk after an interruption (the sort key is
+applied to every partition).
+
+    python -m scripts.backfill_tag_index --table simple-sns-local \\
+        --endpoint http://localhost:8001
+    python -m scripts.backfill_tag_index --table <POSTS_TABLE_NAME>   # AWS
+"""
+
+import argparse
+import os
+
+import boto3
+
+from app.backends.dynamodb_utils import posts_partition_keys, tag_index_items
+from app.config import settings
+
+_PAGE_SIZE = 500
+
+
+def backfill(
+    table,
+    shard_count: int = 1,
+    start_sk: str | None = None,
+    dry_run: bool = False,
+) -> int:
+    """POSTS パーティションを走査してタグインデックスアイテムを書き込み、書き込み件数を返す"""
+    written = 0
+    for pk in posts_partition_keys(shard_count):
+        written += _backfill_partition(table, pk, start_sk, dry_run)
+    return written
+
+
+def _backfill_partition(table, pk: str, start_sk: str | None, dry_run: bool) -> int:
+    query_kwargs = {
+        "KeyConditionExpression": "PK = :pk",
+        "ExpressionAttributeValues": {":pk": pk},
+        "ProjectionExpression": "PK, SK, tags",
+        "Limit": _PAGE_SIZE,
+    }
+    if start_sk:
+        query_kwargs["ExclusiveStartKey"] = {"PK": pk, "SK": start_sk}
+
+    written = 0
+    while True:
+        response = table.query(**query_kwargs)
+        tag_items = [
+            tag_item
+            for item in response.get("Items", [])
+            for tag_item in tag_index_items(item)
+        ]
+        if tag_items and not dry_run:
+            with table.batch_writer() as batch:
+                for tag_item in tag_items:
+                    batch.put_item(Item=tag_item)
+        written += len(tag_items)
+
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return written
+        print(f"... {pk}: {written} index items, last SK {last_key['SK']}")
+        query_kwargs["ExclusiveStartKey"] = last_key
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--table",
+        default=os.environ.get("POSTS_TABLE_NAME") or os.environ.get("DYNAMODB_TABLE_NAME"),
+        help="DynamoDB table name (default: POSTS_TABLE_NAME / DYNAMODB_TABLE_NAME)",
+    )
+    parser.add_argument("--endpoint", help="DynamoDB endpoint URL (DynamoDB Local)")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=settings.posts_shard_count,
+        help="POSTS write shard count (default: POSTS_SHARD_COUNT)",
+    )
+    parser.add_argument("--start-sk", help="resume after this POSTS sort key")
+    parser.add_argument("--dry-run", action="store_true", help="count items without writing")
+    args = parser.parse_args()
+    if not args.table:
+        parser.error("--table is required")
+
+    dynamodb = boto3.resource("dynamodb", endpoint_url=args.endpoint)
+    written = backfill(dynamodb.Table(args.table), args.shards, args.start_sk, args.dry_run)
+    action = "would write" if args.dry_run else "wrote"
+    print(f"{action} {written} tag index items to {args.table}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Async Backend Tests
+ThreadedAsyncBackend delegation and the async def routes
+"""
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import anyio
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.auth import require_user
+from app.backends.async_base import ThreadedAsyncBackend
+from app.config import settings
+from app.models import Post
+from app.routes import posts
+from app.search_index import SearchIndex, get_search_index, set_search_index
+
+
+class TestThreadedAsyncBackend:
+    """Sync backends run on the adapter's own limiter"""
+
+    def test_delegates_arguments_and_result(self, test_user, sample_post_body):
+        """Calls are forwarded unchanged and return the sync result"""
+        sync_backend = MagicMock()
+        sync_backend.create_post.return_value = {"postId": "p1"}
+        backend = ThreadedAsyncBackend(sync_backend, max_concurrency=4)
+
+        result = anyio.run(backend.create_post, sample_post_body, test_user)
+
+        assert result == {"postId": "p1"}
+        sync_backend.create_post.assert_called_once_with(sample_post_body, test_user)
+
+    def test_runs_off_the_event_loop_thread(self):
+        """Blocking SDK calls execute in a worker thread"""
+        loop_thread = threading.get_ident()
+        sync_backend = MagicMock()
+        sync_backend.get_post.side_effect = lambda _pid: threading.get_ident()
+        backend = ThreadedAsyncBackend(sync_backend, max_concurrency=4)
+
+        async def main():
+            nonlocal loop_thread
+            loop_thread = threading.get_ident()
+            return await backend.get_post("p1")
+
+        assert anyio.run(main) != loop_thread
+
+    def test_max_concurrency_bounds_in_flight_calls(self):
+        """No more than max_concurrency backend calls run at once"""
+        in_flight = peak = 0
+        lock = threading.Lock()
+
+        def slow_get_post(_post_id):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+
+        sync_backend = MagicMock()
+        sync_backend.get_post.side_effect = slow_get_post
+        backend = ThreadedAsyncBackend(sync_backend, max_concurrency=3)
+
+        async def main():
+            async with anyio.create_task_group() as tg:
+                for i in range(10):
+                    tg.start_soon(backend.get_post, f"p{i}")
+
+        anyio.run(main)
+        assert peak == 3
+
+
+class TestAsyncRoutes:
+    """Routes await the async backend"""
+
+    def test_list_posts_awaits_backend(self):
+        """GET /posts returns what the async backend produced"""
+        sync_backend = MagicMock()
+        sync_backend.list_posts.return_value = (
+            [Post(postId="p1", userId="u1", content="hi", createdAt="2026-01-01T00:00:00Z")],
+            "next",
+        )
+        app = FastAPI()
+        app.include_router(posts.router)
+
+        with patch(
+            "app.routes.posts.get_async_backend",
+            return_value=ThreadedAsyncBackend(sync_backend, max_concurrency=4),
+        ):
+            response = TestClient(app).get("/posts", params={"limit": 5, "tag": "news"})
+
+        assert response.status_code == 200
+        assert response.json()["nextToken"] == "next"
+        sync_backend.list_posts.assert_called_once_with(5, None, "news")
+
+    def test_batch_routes_report_per_item_results(self, test_user):
+        """POST / DELETE /posts:batch forward the lists and count failures"""
+        sync_backend = MagicMock()
+        sync_backend.create_posts.return_value = [
+            {"index": 0, "postId": "p1", "status": 201, "post": {}},
+        ]
+        sync_backend.delete_posts.return_value = [
+            {"index": 0, "postId": "p1", "status": 200},
+            {"index": 1, "postId": "p9", "status": 404, "error": "Post not found"},
+        ]
+        app = FastAPI()
+        app.include_router(posts.router)
+        app.dependency_overrides[require_user] = lambda: test_user
+
+        with patch(
+            "app.routes.posts.get_async_backend",
+            return_value=ThreadedAsyncBackend(sync_backend, max_concurrency=4),
+        ):
+            client = TestClient(app)
+            created = client.post("/posts:batch", json={"items": [{"content": "hi"}]})
+            deleted = client.request("DELETE", "/posts:batch", json={"postIds": ["p1", "p9"]})
+
+        assert created.json()["succeeded"] == 1
+        assert sync_backend.create_posts.call_args.args[0][0].content == "hi"
+        assert deleted.json()["failed"] == 1
+        sync_backend.delete_posts.assert_called_once_with(["p1", "p9"], test_user)
+
+    def test_export_streams_ndjson_pages_with_checkpoints(self, test_user):
+        """GET /posts/export walks every page and resumes from cursor"""
+        def page(post_id: str) -> list[Post]:
+            return [Post(postId=post_id, userId="u1", content="hi", createdAt="2026-01-01T00:00:00Z")]
+
+        sync_backend = MagicMock()
+        sync_backend.list_posts.side_effect = [(page("p2"), "c2"), (page("p3"), None)]
+        app = FastAPI()
+        app.include_router(posts.router)
+        app.dependency_overrides[require_user] = lambda: test_user
+
+        with patch(
+            "app.routes.posts.get_async_backend",
+            return_value=ThreadedAsyncBackend(sync_backend, max_concurrency=4),
+        ), patch.object(settings, "posts_export_page_size", 2):
+            response = TestClient(app).get("/posts/export", params={"cursor": "c1"})
+
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert rows == [
+            {**rows[0], "postId": "p2"},
+            {"_checkpoint": "c2"},
+            {**rows[2], "postId": "p3"},
+            {"_checkpoint": None},
+        ]
+        assert "author" not in rows[0]
+        assert [c.args for c in sync_backend.list_posts.call_args_list] == [
+            (2, "c1", None), (2, "c2", None),
+        ]
+
+    def test_compact_representation_is_negotiated(self):
+        """Accept profile="compact" / ?fields= drop the legacy duplicates; default unchanged"""
+        sync_backend = MagicMock()
+        sync_backend.list_posts.return_value = (
+            [Post(postId="p1", userId="u1", content="hi", createdAt="2026-01-01T00:00:00Z")],
+            None,
+        )
+        app = FastAPI()
+        app.include_router(posts.router)
+
+        with patch(
+            "app.routes.posts.get_async_backend",
+            return_value=ThreadedAsyncBackend(sync_backend, max_concurrency=4),
+        ):
+            client = TestClient(app)
+            legacy = client.get("/posts")
+            compact = client.get("/posts", headers={"Accept": 'application/json; profile="compact"'})
+            sparse = client.get("/posts", params={"fields": "postId,content"})
+            invalid = client.get("/posts", params={"fields": "postId,password"})
+
+        assert {"items", "results", "messages"} <= legacy.json().keys()
+        assert "created_at" in legacy.json()["items"][0]
+        assert compact.headers["content-type"] == 'application/json; profile="compact"'
+        assert compact.headers["vary"] == "Accept"
+        assert compact.json().keys() == {"items", "limit", "nextToken"}
+        assert "created_at" not in compact.json()["items"][0]
+        assert compact.json()["items"][0]["userId"] == "u1"
+        assert sparse.json()["items"] == [{"postId": "p1", "content": "hi"}]
+        assert invalid.status_code == 400
+
+    def test_search_builds_index_and_follows_writes(self, test_user):
+        """GET /posts/search indexes every page once, then tracks create / delete"""
+        def post(post_id: str, content: str) -> Post:
+            return Post(postId=post_id, userId="u1", content=content, createdAt="2026-01-01T00:00:00Z")
+
+        stored = {p.id: p for p in [post("p1", "東京タワー"), post("p2", "大阪城"), post("p3", "東京駅")]}
+        sync_backend = MagicMock()
+        sync_backend.list_posts.side_effect = [
+            ([stored["p1"], stored["p2"]], "c2"),
+            ([stored["p3"]], None),
+        ]
+        stored["p4"] = post("p4", "東京ドーム")
+        sync_backend.create_post.return_value = stored["p4"].model_dump()
+        # 検索結果は表示時に get_post で読み直す (画像 URL の署名もそこで行われる)
+        sync_backend.get_post.side_effect = stored.get
+        sync_backend.delete_post.return_value = {"message": "Post deleted successfully"}
+        app = FastAPI()
+        app.include_router(posts.router)
+        app.dependency_overrides[require_user] = lambda: test_user
+
+        set_search_index(None)
+        try:
+            with patch(
+                "app.routes.posts.get_async_backend",
+                return_value=ThreadedAsyncBackend(sync_backend, max_concurrency=4),
+            ), patch.object(settings, "search_index_enabled", True):
+                client = TestClient(app)
+                first = client.get("/posts/search", params={"q": "東京", "limit": 1})
+                second = client.get(
+                    "/posts/search", params={"q": "東京", "limit": 1, "nextToken": first.json()["nextToken"]}
+                )
+                client.post("/posts", json={"content": "東京ドーム"})
+                client.delete("/posts/p1")
+                after = client.get("/posts/search", params={"q": "東京"})
+        finally:
+            set_search_index(None)
+
+        assert first.json()["total"] == 2
+        assert first.json()["nextToken"] == "1"
+        assert second.json()["nextToken"] is None
+        assert {first.json()["items"][0]["postId"], second.json()["items"][0]["postId"]} == {"p1", "p3"}
+        assert {item["postId"] for item in after.json()["items"]} == {"p3", "p4"}
+        assert after.json()["items"][0]["content"] in {"東京駅", "東京ドーム"}
+        assert sync_backend.list_posts.call_count == 2
+        assert get_search_index() is None
+
+    def test_search_is_off_unless_enabled(self, test_user):
+        """Without SEARCH_INDEX_ENABLED nothing scans the table and search is 404"""
+        sync_backend = MagicMock()
+        sync_backend.create_post.return_value = {"postId": "p1"}
+        app = FastAPI()
+        app.include_router(posts.router)
+        app.dependency_overrides[require_user] = lambda: test_user
+
+        set_search_index(None)
+        with patch(
+            "app.routes.posts.get_async_backend",
+            return_value=ThreadedAsyncBackend(sync_backend, max_concurrency=4),
+        ), patch.object(settings, "search_index_enabled", False):
+            client = TestClient(app)
+            client.post("/posts", json={"content": "東京ドーム"})
+            response = client.get("/posts/search", params={"q": "東京"})
+
+        assert response.status_code == 404
+        sync_backend.list_posts.assert_not_called()
+        assert get_search_index() is None
+
+    def test_stale_search_index_serves_while_rebuilding(self):
+        """An expired index answers at once; the rebuild runs in the background"""
+        def post(post_id: str, content: str) -> Post:
+            return Post(postId=post_id, userId="u1", content=content, createdAt="2026-01-01T00:00:00Z")
+
+        stale = SearchIndex()
+        stale.add(post("p1", "東京タワー"))
+        stale.add(post("gone", "東京湾"))
+        release = threading.Event()
+
+        def list_posts(*_args):
+            release.wait(5)
+            return [post("p1", "東京タワー"), post("p2", "東京駅")], None
+
+        sync_backend = MagicMock()
+        sync_backend.list_posts.side_effect = list_posts
+        # "gone" は他のインスタンスで削除済み
+        sync_backend.get_post.side_effect = {"p1": post("p1", "東京タワー"), "p2": post("p2", "東京駅")}.get
+        app = FastAPI()
+        app.include_router(posts.router)
+
+        set_search_index(stale)
+        try:
+            with patch(
+                "app.routes.posts.get_async_backend",
+                return_value=ThreadedAsyncBackend(sync_backend, max_concurrency=4),
+            ), patch.object(settings, "search_index_enabled", True), \
+                    patch.object(settings, "search_index_refresh_seconds", 1), TestClient(app) as client:
+                stale.built_at = time.monotonic() - 10
+                served = client.get("/posts/search", params={"q": "東京"})
+                assert get_search_index() is stale
+                release.set()
+                for _ in range(100):
+                    if get_search_index() is not stale:
+                        break
+                    time.sleep(0.01)
+                rebuilt = client.get("/posts/search", params={"q": "東京"})
+        finally:
+            set_search_index(None)
+
+        assert [item["postId"] for item in served.json()["items"]] == ["p1"]
+        assert served.json()["total"] == 2
+        assert "gone" not in stale
+        assert {item["postId"] for item in rebuilt.json()["items"]} == {"p1", "p2"}
+        assert sync_backend.list_posts.call_count == 1
+
+    def test_search_drops_hits_deleted_elsewhere(self):
+        """A hit whose backend lookup 404s is dropped instead of failing the search"""
+        def post(post_id: str, content: str) -> Post:
+            return Post(postId=post_id, userId="u1", content=content, createdAt="2026-01-01T00:00:00Z")
+
+        index = SearchIndex()
+        index.add(post("p1", "東京タワー"))
+        index.add(post("gone", "東京湾"))
+
+        def get_post(post_id: str) -> Post:
+            if post_id == "gone":
+                raise HTTPException(status_code=404, detail="Post not found")
+            return post(post_id, "東京タワー")
+
+        sync_backend = MagicMock()
+        sync_backend.get_post.side_effect = get_post
+        app = FastAPI()
+        app.include_router(posts.router)
+
+        set_search_index(index)
+        try:
+            with patch(
+                "app.routes.posts.get_async_backend",
+                return_value=ThreadedAsyncBackend(sync_backend, max_concurrency=4),
+            ), patch.object(settings, "search_index_enabled", True):
+                response = TestClient(app).get("/posts/search", params={"q": "東京"})
+        finally:
+            set_search_index(None)
+
+        assert response.status_code == 200
+        assert [item["postId"] for item in response.json()["items"]] == ["p1"]
+        assert "gone" not in index
@@ -0,0 +1,244 @@
+"""
+Native async DynamoDB backend tests
+AioLocalBackend / AioAwsBackend against an in-memory async table, compared with
+the synchronous backends they wrap
+"""
+from unittest.mock import MagicMock, patch
+
+import anyio
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+
+from app.backends import get_async_backend
+from app.backends.async_base import ThreadedAsyncBackend
+from app.backends.dynamodb_async import AioAwsBackend, AioLocalBackend
+from app.backends.dynamodb_utils import encode_post_handle, query_posts_page
+from app.backends.local_backend import LocalBackend
+from app.config import settings
+from app.models import CloudProvider, UpdatePostBody
+
+
+class FakeBatchWriter:
+    def __init__(self, table: "FakeTable"):
+        self.table = table
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def put_item(self, Item):
+        self.table.puts.append(Item)
+
+    async def delete_item(self, Key):
+        self.table.deletes.append(Key)
+
+
+class FakeTable:
+    """aioboto3 Table の query / get_item / update_item / delete_item / batch_writer"""
+
+    def __init__(self, items: list[dict]):
+        self.items = items
+        self.queries: list[dict] = []
+        self.puts: list[dict] = []
+        self.deletes: list[dict] = []
+        self.error: Exception | None = None
+
+    async def query(self, **kwargs):
+        self.queries.append(kwargs)
+        await anyio.sleep(0)
+        if "IndexName" in kwargs:
+            post_id = kwargs["ExpressionAttributeValues"][":pid"]
+            return {"Items": [i for i in self.items if i.get("postId") == post_id]}
+        pk = kwargs["ExpressionAttributeValues"][":pk"]
+        start = kwargs.get("ExclusiveStartKey", {}).get("SK")
+        matching = sorted(
+            (i for i in self.items if i["PK"] == pk and (start is None or i["SK"] < start)),
+            key=lambda i: i["SK"],
+            reverse=True,
+        )
+        page = matching[:kwargs["Limit"]]
+        response = {"Items": page}
+        if len(matching) > len(page):
+            response["LastEvaluatedKey"] = {"PK": pk, "SK": page[-1]["SK"]}
+        return response
+
+    async def get_item(self, Key):
+        for item in self.items:
+            if item["PK"] == Key["PK"] and item["SK"] == Key["SK"]:
+                return {"Item": dict(item)}
+        return {}
+
+    async def _write(self, Key, **kwargs):
+        if self.error is not None:
+            raise self.error
+        return {"Attributes": (await self.get_item(Key))["Item"]}
+
+    update_item = _write
+    delete_item = _write
+
+    def batch_writer(self):
+        return FakeBatchWriter(self)
+
+
+class SyncTable:
+    """同期版 query_posts_page に同じデータを読ませるためのラッパー"""
+
+    def __init__(self, table: FakeTable):
+        self.table = table
+
+    def query(self, **kwargs):
+        return anyio.run(lambda: self.table.query(**kwargs))
+
+
+def _post_item(post_id: str, pk: str = "POSTS", second: int = 0, **extra) -> dict:
+    now = f"2026-01-01T00:00:{second:02d}+00:00"
+    return {
+        "PK": pk, "SK": f"{now}#{post_id}", "postId": post_id, "userId": "u1",
+        "nickname": "alice", "content": "hello", "tags": ["a"], "createdAt": now,
+        **extra,
+    }
+
+
+@pytest.fixture
+def local_backend():
+    with patch("app.backends.local_backend.boto3"):
+        backend = LocalBackend()
+    return backend
+
+
+def _native(cls, backend, table: FakeTable):
+    native = cls(backend, max_concurrency=4)
+
+    async def resources():
+        return MagicMock(), table
+
+    native._resources = resources
+    return native
+
+
+class TestAioLocalBackend:
+    """AioLocalBackend on a fake aioboto3 table"""
+
+    def test_list_posts_matches_the_sync_merge(self, local_backend):
+        """Shards are queried concurrently and merged exactly like query_posts_page"""
+        table = FakeTable([
+            _post_item(f"p{n}", pk=f"POSTS#{n % 3}", second=n) for n in range(12)
+        ])
+        native = _native(AioLocalBackend, local_backend, table)
+
+        with patch.object(settings, "posts_shard_count", 3):
+            posts, token = anyio.run(native.list_posts, 5, None, None)
+            expected, expected_token = query_posts_page(SyncTable(table), 3, 5, None)
+            rest, _ = anyio.run(native.list_posts, 20, token, None)
+
+        assert [p.id for p in posts] == [i["postId"] for i in expected]
+        assert token == expected_token
+        assert [p.id for p in posts + rest] == [f"p{n}" for n in range(11, -1, -1)]
+        # 1 ページ目は POSTS + POSTS#0..2 を 1 回ずつ
+        first_page = {q["ExpressionAttributeValues"][":pk"] for q in table.queries[:4]}
+        assert first_page == {"POSTS", "POSTS#0", "POSTS#1", "POSTS#2"}
+
+    def test_delete_by_handle_removes_index_items(self, local_backend, test_user):
+        """A handle skips the GSI lookup; adjacency and tag items follow"""
+        item = _post_item("p1", userId=test_user.user_id)
+        table = FakeTable([item])
+        native = _native(AioLocalBackend, local_backend, table)
+
+        result = anyio.run(native.delete_post, encode_post_handle(item), test_user)
+
+        assert result == {"message": "Post deleted successfully"}
+        assert table.queries == []
+        assert table.deletes == [
+            {"PK": f"USER#{test_user.user_id}", "SK": f"POST#{item['SK']}"},
+            {"PK": "TAG#a", "SK": item["SK"]},
+        ]
+
+    def test_get_missing_post_returns_none(self, local_backend):
+        """Not found is None, as in every AsyncBackendBase (the route maps it to 404)"""
+        native = _native(AioLocalBackend, local_backend, FakeTable([]))
+
+        assert anyio.run(native.get_post, "missing") is None
+
+    def test_update_condition_failure_maps_to_403(self, local_backend, test_user):
+        """ConditionalCheckFailed with the old item is a 403, as in LocalBackend"""
+        item = _post_item("p1", userId="someone-else")
+        table = FakeTable([item])
+        table.error = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException"}, "Item": {"postId": {"S": "p1"}}},
+            "UpdateItem",
+        )
+        native = _native(AioLocalBackend, local_backend, table)
+
+        with pytest.raises(HTTPException) as exc_info:
+            anyio.run(
+                native.update_post, encode_post_handle(item), UpdatePostBody(content="x"), test_user
+            )
+
+        assert exc_info.value.status_code == 403
+
+    def test_update_syncs_only_changed_tags(self, local_backend, test_user):
+        """Tag index items are written for the diff only"""
+        item = _post_item("p1", userId=test_user.user_id)
+        table = FakeTable([item])
+        native = _native(AioLocalBackend, local_backend, table)
+
+        result = anyio.run(
+            native.update_post, encode_post_handle(item), UpdatePostBody(tags=["b"]), test_user
+        )
+
+        assert result["tags"] == ["b"]
+        assert table.deletes == [{"PK": "TAG#a", "SK": item["SK"]}]
+        assert table.puts == [{"PK": "TAG#b", "SK": item["SK"], "postPK": "POSTS"}]
+
+
+class TestAioAwsBackend:
+    """AioAwsBackend keeps AwsBackend's errors and response shapes"""
+
+    def test_get_post_returns_none_when_missing(self):
+        backend = MagicMock(table_name="posts")
+        native = _native(AioAwsBackend, backend, FakeTable([]))
+
+        assert anyio.run(native.get_post, "missing") is None
+
+    def test_create_post_writes_post_and_tag_items(self, test_user, sample_post_body):
+        backend = MagicMock(table_name="posts")
+        item = _post_item("p1", tags=["a", "b"])
+        backend._new_post_item.return_value = item
+        table = FakeTable([])
+        native = _native(AioAwsBackend, backend, table)
+
+        anyio.run(native.create_post, sample_post_body, test_user)
+
+        assert [w["PK"] for w in table.puts] == ["POSTS", "TAG#a", "TAG#b"]
+        backend._created_post_dict.assert_called_once_with(item)
+
+
+class TestAsyncBackendSelection:
+    """get_async_backend picks the native implementation when aioboto3 is importable"""
+
+    @pytest.mark.parametrize(
+        ("provider", "available", "expected"),
+        [
+            (CloudProvider.LOCAL, True, AioLocalBackend),
+            (CloudProvider.AWS, True, AioAwsBackend),
+            (CloudProvider.AWS, False, ThreadedAsyncBackend),
+            (CloudProvider.GCP, True, ThreadedAsyncBackend),
+        ],
+    )
+    def test_selection(self, provider, available, expected):
+        get_async_backend.cache_clear()
+        try:
+            with (
+                patch.object(settings, "cloud_provider", provider),
+                patch("app.backends.get_backend", return_value=MagicMock()),
+                patch(
+                    "app.backends.importlib.util.find_spec",
+                    return_value=object() if available else None,
+                ),
+            ):
+                assert type(get_async_backend()) is expected
+        finally:
+            get_async_backend.cache_clear()
@@ -0,0 +1,170 @@
+"""
+DynamoDB helper tests
+Write-sharded timeline merge and batch writes in app.backends.dynamodb_utils
+"""
+from unittest.mock import MagicMock, patch
+
+from app.backends.dynamodb_utils import (
+    BATCH_WRITE_MAX_RETRIES,
+    batch_delete_posts,
+    batch_write_items,
+    encode_post_handle,
+    posts_partition_for,
+    posts_partition_keys,
+    query_posts_page,
+)
+from app.backends.pagination import decode_page_token
+
+
+class FakeTable:
+    """PK ごとに SK 降順 Query (Limit / ExclusiveStartKey) だけを再現するフェイク"""
+
+    def __init__(self, items: list[dict]):
+        self.items = items
+        self.queried: list[str] = []
+
+    def query(self, ExpressionAttributeValues, Limit, ExclusiveStartKey=None, **_kwargs):
+        pk = ExpressionAttributeValues[":pk"]
+        self.queried.append(pk)
+        rows = sorted(
+            (i for i in self.items if i["PK"] == pk), key=lambda i: i["SK"], reverse=True
+        )
+        if ExclusiveStartKey:
+            rows = [i for i in rows if i["SK"] < ExclusiveStartKey["SK"]]
+        page = rows[:Limit]
+        response = {"Items": page}
+        if len(rows) > Limit:
+            response["LastEvaluatedKey"] = {"PK": pk, "SK": page[-1]["SK"]}
+        return response
+
+
+def _posts(count: int, shard_count: int) -> list[dict]:
+    items = []
+    for i in range(count):
+        post_id = f"p{i:03d}"
+        items.append({
+            "PK": posts_partition_for(post_id, shard_count),
+            "SK": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}#{post_id}",
+        })
+    return items
+
+
+def _read_all(table: FakeTable, shard_count: int, limit: int) -> list[str]:
+    seen, token = [], None
+    while True:
+        items, token = query_posts_page(table, shard_count, limit, token)
+        seen.extend(i["SK"] for i in items)
+        if token is None:
+            return seen
+
+
+class TestShardedTimeline:
+    """Scatter-gather merge over POSTS#<n> partitions"""
+
+    def test_single_shard_keeps_legacy_layout_and_token(self):
+        """shard_count=1 writes to POSTS and returns the bare SK as token"""
+        table = FakeTable(_posts(5, 1))
+
+        items, token = query_posts_page(table, 1, 2, None)
+
+        assert posts_partition_keys(1) == ["POSTS"]
+        assert {i["PK"] for i in table.items} == {"POSTS"}
+        assert token == items[-1]["SK"]
+
+    def test_pages_merge_all_shards_in_order(self):
+        """Paging through N shards yields every post once, newest first"""
+        legacy = [{"PK": "POSTS", "SK": "2026-01-01T00:00:30#legacy"}]
+        table = FakeTable(_posts(40, 4) + legacy)
+
+        seen = _read_all(table, 4, 7)
+
+        expected = sorted((i["SK"] for i in table.items), reverse=True)
+        assert seen == expected
+        assert len({i["PK"] for i in table.items}) == 5
+
+    def test_token_carries_per_shard_cursors_and_skips_exhausted(self):
+        """Exhausted partitions are recorded as null and not queried again"""
+        table = FakeTable(_posts(20, 2))  # legacy POSTS partition is empty
+
+        items, token = query_posts_page(table, 2, 5, None)
+        cursors = decode_page_token(token)["s"]
+        assert cursors["POSTS"] is None
+        for pk in ("POSTS#0", "POSTS#1"):
+            consumed = [i["SK"] for i in items if i["PK"] == pk]
+            if consumed:
+                assert cursors[pk] == consumed[-1]
+
+        table.queried.clear()
+        query_posts_page(table, 2, 5, token)
+        assert "POSTS" not in table.queried
+
+    def test_legacy_sk_token_applies_to_every_partition(self):
+        """A bare SK token from before sharding resumes every partition after it"""
+        table = FakeTable(_posts(30, 3))
+        cursor = sorted(i["SK"] for i in table.items)[15]
+
+        items, _ = query_posts_page(table, 3, 50, cursor)
+
+        assert items and all(i["SK"] < cursor for i in items)
+        assert len(items) == 15
+
+
+def _put(pk: str, sk: str) -> dict:
+    return {"PutRequest": {"Item": {"PK": pk, "SK": sk}}}
+
+
+class TestBatchWrite:
+    """BatchWriteItem chunking and UnprocessedItems retry"""
+
+    def test_chunks_of_25_and_retries_unprocessed(self):
+        """Unprocessed requests are resent; nothing is reported failed"""
+        requests = [_put("POSTS", f"s{i:02d}") for i in range(30)]
+        dynamodb = MagicMock()
+        dynamodb.batch_write_item.side_effect = [
+            {"UnprocessedItems": {"t": requests[:2]}},
+            {"UnprocessedItems": {}},
+            {},
+        ]
+
+        with patch("app.backends.dynamodb_utils.time.sleep") as sleep:
+            failed = batch_write_items(dynamodb, "t", requests, list(range(30)))
+
+        sizes = [len(c.kwargs["RequestItems"]["t"]) for c in dynamodb.batch_write_item.call_args_list]
+        assert sizes == [25, 2, 5]
+        assert sleep.call_count == 1
+        assert failed == set()
+
+    def test_owners_of_requests_left_unprocessed_fail(self):
+        """After the retry budget the owning elements are reported"""
+        requests = [_put("POSTS", "a"), _put("TAG#x", "a"), _put("POSTS", "b")]
+        dynamodb = MagicMock()
+        dynamodb.batch_write_item.return_value = {"UnprocessedItems": {"t": [requests[1]]}}
+
+        with patch("app.backends.dynamodb_utils.time.sleep"):
+            failed = batch_write_items(dynamodb, "t", requests, [0, 0, 1])
+
+        assert dynamodb.batch_write_item.call_count == BATCH_WRITE_MAX_RETRIES + 1
+        assert failed == {0}
+
+    def test_batch_delete_reports_each_element(self):
+        """404 / 403 / duplicate / deleted are reported per index"""
+        mine = {"PK": "POSTS", "SK": "t1#p1", "postId": "p1", "userId": "u1", "tags": ["a"]}
+        theirs = {"PK": "POSTS", "SK": "t2#p2", "postId": "p2", "userId": "u2"}
+        table = MagicMock()
+        table.query.side_effect = lambda ExpressionAttributeValues, **_: {
+            "Items": [i for i in (mine, theirs) if i["postId"] == ExpressionAttributeValues[":pid"]]
+        }
+        dynamodb = MagicMock()
+        dynamodb.batch_get_item.return_value = {"Responses": {"t": [mine]}}
+        dynamodb.batch_write_item.return_value = {}
+
+        results = batch_delete_posts(
+            table, dynamodb, "t", ["p1", "missing", "p2", encode_post_handle(mine)], owner_id="u1"
+        )
+
+        assert [r["status"] for r in results] == [200, 404, 403, 200]
+        assert [r["postId"] for r in results] == ["p1", "missing", "p2", "p1"]
+        assert "postHandle" not in results[0]
+        assert results[3]["postHandle"] == encode_post_handle(mine)
+        deleted = dynamodb.batch_write_item.call_args.kwargs["RequestItems"]["t"]
+        assert [d["DeleteRequest"]["Key"]["PK"] for d in deleted] == ["POSTS", "TAG#a"]
@@ -0,0 +1,264 @@
+"""
+JWTVerifier Unit Tests
+Signs real RS256 tokens against an in-memory JWKS (no network)
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import anyio
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwk, jwt
+
+from app.auth import get_current_user
+from app.config import settings
+from app.jwt_verifier import JWTVerifier, get_verifier
+from app.token_cache import VerifiedTokenCache
+
+ISSUER = "https://cognito-idp.ap-northeast-1.amazonaws.com/pool-1"
+CLIENT_ID = "client-1"
+
+
+def _rsa_key(kid: str) -> tuple[str, dict]:
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    return pem, {**public, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+@pytest.fixture(scope="module")
+def signing_keys():
+    """Two RSA keys; the JWKS lists the signing key last"""
+    return [_rsa_key("old"), _rsa_key("current")]
+
+
+@pytest.fixture
+def verifier(signing_keys):
+    verifier = JWTVerifier(
+        "cognito",
+        {"region": "ap-northeast-1", "user_pool_id": "pool-1", "client_id": CLIENT_ID},
+    )
+    verifier._store_jwks({"keys": [jwk_dict for _, jwk_dict in signing_keys]}, datetime.now())
+    return verifier
+
+
+def _token(pem: str, kid: str = "current", **claims) -> str:
+    now = int(time.time())
+    payload = {"sub": "user-1", "iss": ISSUER, "aud": CLIENT_ID,
+               "iat": now, "exp": now + 300, **claims}
+    return jwt.encode(payload, pem, algorithm="RS256", headers={"kid": kid})
+
+
+class TestVerifyToken:
+    """verify_token with the kid -> key index"""
+
+    def test_valid_token_returns_claims(self, verifier, signing_keys):
+        """A token signed by a JWKS key verifies"""
+        claims = verifier.verify_token(_token(signing_keys[1][0]))
+
+        assert claims["sub"] == "user-1"
+
+    def test_keys_are_constructed_once_per_jwks(self, verifier, signing_keys):
+        """Repeated verifications reuse the constructed key objects"""
+        token = _token(signing_keys[1][0])
+
+        with patch("jose.jwk.construct") as construct:
+            for _ in range(3):
+                assert verifier.verify_token(token)
+
+        construct.assert_not_called()
+
+    def test_token_without_aud_is_accepted(self, verifier, signing_keys):
+        """Cognito access tokens carry no 'aud' and still verify"""
+        now = int(time.time())
+        token = jwt.encode(
+            {"sub": "user-1", "iss": ISSUER, "iat": now, "exp": now + 300},
+            signing_keys[1][0], algorithm="RS256", headers={"kid": "current"},
+        )
+
+        assert verifier.verify_token(token)["sub"] == "user-1"
+
+    def test_wrong_audience_is_rejected(self, verifier, signing_keys):
+        """A present but foreign 'aud' fails verification"""
+        assert verifier.verify_token(_token(signing_keys[1][0], aud="other")) is None
+
+    def test_unknown_kid_and_wrong_key_are_rejected(self, verifier, signing_keys):
+        """Unknown kids and signatures from another key fail"""
+        assert verifier.verify_token(_token(signing_keys[1][0], kid="missing")) is None
+        assert verifier.verify_token(_token(signing_keys[0][0], kid="current")) is None
+
+
+class TestVerifiedTokenCache:
+    """sha256(token) -> UserInfo cache"""
+
+    def test_ttl_is_capped_at_token_exp(self):
+        """An entry never outlives the token's exp"""
+        cache = VerifiedTokenCache(max_entries=10, ttl_seconds=300)
+
+        with patch("app.token_cache.time.time", return_value=1000.0):
+            cache.put("t", "user", exp=1010)
+            assert cache.get("t") == "user"
+        with patch("app.token_cache.time.time", return_value=1010.0):
+            assert cache.get("t") is None
+
+    def test_max_entries_evicts_least_recently_used(self):
+        """The bound drops the least recently used token"""
+        cache = VerifiedTokenCache(max_entries=2, ttl_seconds=300)
+        cache.put("a", 1, None)
+        cache.put("b", 2, None)
+        cache.get("a")
+        cache.put("c", 3, None)
+
+        assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+class TestCurrentUserTokenCache:
+    """get_current_user caches successful verifications only"""
+
+    def _current_user(self, verifier, token: str):
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        with patch.object(settings, "auth_disabled", False), \
+                patch("app.auth.get_jwt_verifier", return_value=verifier), \
+                patch("app.auth.get_token_cache", return_value=self.cache):
+            return anyio.run(get_current_user, credentials)
+
+    @pytest.fixture(autouse=True)
+    def _cache(self):
+        self.cache = VerifiedTokenCache(max_entries=100, ttl_seconds=300)
+
+    def test_repeated_token_skips_signature_check(self, verifier, signing_keys):
+        """The second request with the same token is served from the cache"""
+        token = _token(signing_keys[1][0])
+
+        first = self._current_user(verifier, token)
+        with patch.object(verifier, "verify_token") as verify:
+            second = self._current_user(verifier, token)
+
+        assert second == first and second.user_id == "user-1"
+        verify.assert_not_called()
+
+    def test_failed_verification_is_not_cached(self, verifier, signing_keys):
+        """Rejected tokens are verified (and rejected) every time"""
+        token = _token(signing_keys[1][0], aud="other")
+
+        assert self._current_user(verifier, token) is None
+        assert len(self.cache) == 0
+
+    def test_jwks_rotation_drops_cached_tokens(self, verifier, signing_keys):
+        """A changed key set clears the cache"""
+        from app.jwt_verifier import add_jwks_rotation_listener
+
+        add_jwks_rotation_listener(self.cache.clear)
+        self._current_user(verifier, _token(signing_keys[1][0]))
+        assert len(self.cache) == 1
+
+        verifier._store_jwks({"keys": [signing_keys[0][1]]}, datetime.now())
+
+        assert len(self.cache) == 0
+
+
+class TestJwksRefresh:
+    """Singleton registry, single-flight fetch and stale-while-revalidate"""
+
+    def _response(self, jwks: dict, delay: float = 0.0):
+        def get(_url, timeout):
+            time.sleep(delay)
+            response = MagicMock()
+            response.json.return_value = jwks
+            return response
+        return get
+
+    def _verifier(self) -> JWTVerifier:
+        return JWTVerifier(
+            "cognito",
+            {"region": "ap-northeast-1", "user_pool_id": "pool-1", "client_id": CLIENT_ID},
+        )
+
+    def test_registry_returns_one_instance_per_config(self):
+        """get_verifier reuses the instance (and its JWKS cache)"""
+        config = {"region": "ap-northeast-1", "user_pool_id": "pool-x", "client_id": "c"}
+
+        assert get_verifier("cognito", config) is get_verifier("cognito", dict(config))
+        assert get_verifier("cognito", {**config, "client_id": "d"}) is not \
+            get_verifier("cognito", config)
+
+    def test_concurrent_cold_requests_share_one_fetch(self, signing_keys):
+        """Eight threads hitting an empty cache cause a single HTTPS GET"""
+        verifier = self._verifier()
+        jwks = {"keys": [signing_keys[1][1]]}
+
+        with patch("app.jwt_verifier.requests.get",
+                   side_effect=self._response(jwks, delay=0.05)) as get:
+            threads = [threading.Thread(target=verifier.get_jwks) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        assert get.call_count == 1
+        assert verifier.stats()["fetches"] == 1
+        assert verifier.stats()["keys"] == 1
+
+    def test_stale_jwks_is_served_while_refreshing(self, signing_keys):
+        """An expired cache answers immediately and refreshes in the background"""
+        verifier = self._verifier()
+        old = {"keys": [signing_keys[0][1]]}
+        verifier._store_jwks(old, datetime.now() - timedelta(hours=2))
+        refreshed = threading.Event()
+
+        def get(_url, timeout):
+            refreshed.wait(1)
+            response = MagicMock()
+            response.json.return_value = {"keys": [signing_keys[1][1]]}
+            return response
+
+        with patch("app.jwt_verifier.requests.get", side_effect=get):
+            assert verifier.get_jwks() is old
+            refreshed.set()
+            for _ in range(100):
+                if verifier.stats()["fetches"]:
+                    break
+                time.sleep(0.01)
+
+        assert verifier.stats()["stale_served"] == 1
+        assert verifier.get_signing_key("current") is not None
+
+    def test_failed_background_refresh_allows_the_next_one(self, signing_keys):
+        """A refresh that raises still clears the in-flight flag"""
+        verifier = self._verifier()
+        verifier._store_jwks({"keys": [signing_keys[0][1]]}, datetime.now() - timedelta(hours=2))
+
+        with patch("app.jwt_verifier.requests.get", side_effect=ConnectionError("down")) as get:
+            verifier.get_jwks()
+            for _ in range(100):
+                if not verifier._background_refresh:
+                    break
+                time.sleep(0.01)
+            verifier.get_jwks()
+            for _ in range(100):
+                if get.call_count == 2:
+                    break
+                time.sleep(0.01)
+
+        assert get.call_count == 2
+        assert verifier.stats()["fetch_errors"] == 2
+
+    def test_unknown_kid_forces_one_refresh(self, signing_keys):
+        """A kid missing from a non-fresh JWKS triggers a refetch (rotation)"""
+        verifier = self._verifier()
+        verifier._store_jwks({"keys": [signing_keys[0][1]]}, datetime.now() - timedelta(minutes=5))
+        rotated = {"keys": [signing_keys[0][1], signing_keys[1][1]]}
+
+        with patch("app.jwt_verifier.requests.get", side_effect=self._response(rotated)) as get:
+            assert verifier.get_signing_key("current") is not None
+            assert verifier.get_signing_key("unknown") is None
+
+        assert get.call_count == 1
@@ -0,0 +1,386 @@
+"""
+LocalBackend Unit Tests
+Exercises the DynamoDB access patterns of LocalBackend against a mocked table
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+
+from app.backends.dynamodb_utils import decode_post_handle, encode_post_handle
+from app.backends.local_backend import LocalBackend
+from app.backends.pagination import encode_page_token
+from app.models import CreatePostBody, ProfileUpdateRequest, UpdatePostBody
+
+
+@pytest.fixture
+def local_backend():
+    """LocalBackend with mocked DynamoDB resource (no MinIO)"""
+    with patch("app.backends.local_backend.boto3") as mock_boto3:
+        mock_dynamodb = MagicMock()
+        mock_boto3.resource.return_value = mock_dynamodb
+        backend = LocalBackend()
+    backend.table = MagicMock()
+    backend.dynamodb = mock_dynamodb
+    return backend
+
+
+def _post_item(post_id: str, user_id: str) -> dict:
+    now = "2026-01-01T00:00:00+00:00"
+    return {
+        "PK": "POSTS",
+        "SK": f"{now}#{post_id}",
+        "postId": post_id,
+        "userId": user_id,
+        "content": f"post {post_id}",
+        "createdAt": now,
+    }
+
+
+class TestNicknameBatchLookup:
+    """Nickname resolution via BatchGetItem"""
+
+    def test_list_posts_resolves_nicknames_in_one_batch(self, local_backend):
+        """A page with many authors costs a single BatchGetItem"""
+        items = [_post_item(f"p{i}", f"u{i}") for i in range(50)]
+        local_backend.table.query.return_value = {"Items": items}
+        local_backend.dynamodb.batch_get_item.return_value = {
+            "Responses": {
+                local_backend.table_name: [
+                    {"userId": f"u{i}", "nickname": f"nick{i}"} for i in range(50)
+                ]
+            },
+            "UnprocessedKeys": {},
+        }
+
+        posts, _ = local_backend.list_posts(limit=50, next_token=None, tag=None)
+
+        assert local_backend.table.query.call_count == 1
+        assert local_backend.dynamodb.batch_get_item.call_count == 1
+        assert [p.nickname for p in posts] == [f"nick{i}" for i in range(50)]
+
+    def test_unprocessed_keys_are_retried(self, local_backend):
+        """UnprocessedKeys from a throttled batch are requested again"""
+        unprocessed = {
+            local_backend.table_name: {
+                "Keys": [{"PK": "USER#u2", "SK": "PROFILE"}],
+            }
+        }
+        local_backend.dynamodb.batch_get_item.side_effect = [
+            {
+                "Responses": {local_backend.table_name: [{"userId": "u1", "nickname": "a"}]},
+                "UnprocessedKeys": unprocessed,
+            },
+            {
+                "Responses": {local_backend.table_name: [{"userId": "u2", "nickname": "b"}]},
+                "UnprocessedKeys": {},
+            },
+        ]
+
+        with patch("app.backends.dynamodb_utils.time.sleep"):
+            nicknames = local_backend._get_nicknames(["u1", "u2", "u1"])
+
+        assert nicknames == {"u1": "a", "u2": "b"}
+        second_call = local_backend.dynamodb.batch_get_item.call_args_list[1]
+        assert second_call.kwargs["RequestItems"] == unprocessed
+
+    def test_missing_profile_returns_none(self, local_backend):
+        """Authors without a profile item resolve to None"""
+        local_backend.dynamodb.batch_get_item.return_value = {
+            "Responses": {local_backend.table_name: []},
+        }
+
+        assert local_backend._get_nicknames(["ghost"]) == {"ghost": None}
+
+
+class TestAuthorSnapshot:
+    """Denormalized nickname and fan-out on profile update"""
+
+    def test_create_post_writes_snapshot_and_adjacency_item(
+        self, local_backend, test_user, sample_post_body
+    ):
+        """create_post stores the nickname and a USER#/POST# adjacency item"""
+        local_backend.dynamodb.batch_get_item.return_value = {
+            "Responses": {
+                local_backend.table_name: [
+                    {"userId": test_user.user_id, "nickname": "alice"}
+                ]
+            },
+        }
+
+        result = local_backend.create_post(sample_post_body, test_user)
+
+        batch = local_backend.table.batch_writer.return_value.__enter__.return_value
+        post_item, user_post_item = [c.kwargs["Item"] for c in batch.put_item.call_args_list[:2]]
+        assert result["nickname"] == "alice"
+        assert post_item["nickname"] == "alice"
+        assert user_post_item == {
+            "PK": f"USER#{test_user.user_id}",
+            "SK": f"POST#{post_item['SK']}",
+            "postPK": "POSTS",
+        }
+
+    def test_list_posts_uses_snapshot_without_profile_lookup(self, local_backend):
+        """Items carrying a nickname are served without touching profiles"""
+        item = _post_item("p1", "u1")
+        item["nickname"] = "snap"
+        local_backend.table.query.return_value = {"Items": [item]}
+
+        posts, _ = local_backend.list_posts(limit=20, next_token=None, tag=None)
+
+        assert posts[0].nickname == "snap"
+        local_backend.dynamodb.batch_get_item.assert_not_called()
+
+    def test_refresh_author_snapshot_updates_each_post(self, local_backend):
+        """Fan-out queries the adjacency items and updates the referenced posts"""
+        local_backend.table.query.return_value = {
+            "Items": [
+                {"PK": "USER#u1", "SK": "POST#2026-01-01#p1", "postPK": "POSTS"},
+                {"PK": "USER#u1", "SK": "POST#2026-01-02#p2", "postPK": "POSTS"},
+            ]
+        }
+
+        updated = local_backend.refresh_author_snapshot("u1", "new-name")
+
+        assert updated == 2
+        query_kwargs = local_backend.table.query.call_args.kwargs
+        assert query_kwargs["ExpressionAttributeValues"][":pk"] == "USER#u1"
+        keys = [c.kwargs["Key"] for c in local_backend.table.update_item.call_args_list]
+        assert keys == [
+            {"PK": "POSTS", "SK": "2026-01-01#p1"},
+            {"PK": "POSTS", "SK": "2026-01-02#p2"},
+        ]
+
+
+class TestTagIndex:
+    """TAG#<tag> index items for tag timelines"""
+
+    def test_list_posts_by_tag_queries_index_then_batch_gets(self, local_backend):
+        """A tag page is one index Query plus one BatchGetItem, newest first"""
+        older, newer = _post_item("p1", "u1"), _post_item("p2", "u1")
+        newer["SK"] = "2026-01-02T00:00:00+00:00#p2"
+        for item in (older, newer):
+            item["nickname"] = "snap"
+        local_backend.table.name = local_backend.table_name
+        local_backend.table.query.return_value = {
+            "Items": [
+                {"PK": "TAG#news", "SK": newer["SK"], "postPK": "POSTS"},
+                {"PK": "TAG#news", "SK": older["SK"], "postPK": "POSTS"},
+            ],
+            "LastEvaluatedKey": {"PK": "TAG#news", "SK": older["SK"]},
+        }
+        local_backend.dynamodb.batch_get_item.return_value = {
+            "Responses": {local_backend.table_name: [older, newer]},
+        }
+
+        posts, token = local_backend.list_posts(limit=2, next_token=None, tag="news")
+
+        query_kwargs = local_backend.table.query.call_args.kwargs
+        assert query_kwargs["ExpressionAttributeValues"] == {":pk": "TAG#news"}
+        assert "FilterExpression" not in query_kwargs
+        assert [p.id for p in posts] == ["p2", "p1"]
+        assert token == older["SK"]
+
+    def test_create_post_writes_one_index_item_per_tag(
+        self, local_backend, test_user, sample_post_body
+    ):
+        """Each distinct tag gets a TAG#<tag> item pointing at the post"""
+        local_backend.dynamodb.batch_get_item.return_value = {"Responses": {}}
+        sample_post_body.tags = ["b", "a", "b"]
+
+        local_backend.create_post(sample_post_body, test_user)
+
+        batch = local_backend.table.batch_writer.return_value.__enter__.return_value
+        post_item = batch.put_item.call_args_list[0].kwargs["Item"]
+        tag_items = [
+            c.kwargs["Item"] for c in batch.put_item.call_args_list
+            if c.kwargs["Item"]["PK"].startswith("TAG#")
+        ]
+        assert tag_items == [
+            {"PK": "TAG#a", "SK": post_item["SK"], "postPK": "POSTS"},
+            {"PK": "TAG#b", "SK": post_item["SK"], "postPK": "POSTS"},
+        ]
+
+    def test_update_post_only_touches_changed_tags(self, local_backend, test_user):
+        """Removed tags are deleted and added tags written; kept tags are untouched"""
+        item = _post_item("p1", test_user.user_id)
+        item["tags"] = ["keep", "old"]
+        local_backend.table.query.return_value = {"Items": [item]}
+        local_backend.table.update_item.return_value = {"Attributes": item}
+
+        local_backend.update_post(
+            "p1", UpdatePostBody(tags=["keep", "new"]), test_user
+        )
+
+        batch = local_backend.table.batch_writer.return_value.__enter__.return_value
+        assert [c.kwargs["Key"]["PK"] for c in batch.delete_item.call_args_list] == ["TAG#old"]
+        assert [c.kwargs["Item"]["PK"] for c in batch.put_item.call_args_list] == ["TAG#new"]
+
+    def test_delete_post_removes_index_items(self, local_backend, test_user):
+        """delete_post deletes the post, its adjacency item and its tag items"""
+        item = _post_item("p1", test_user.user_id)
+        item["tags"] = ["a", "b"]
+        local_backend.table.query.return_value = {"Items": [item]}
+        local_backend.table.delete_item.return_value = {"Attributes": item}
+
+        local_backend.delete_post("p1", test_user)
+
+        assert local_backend.table.delete_item.call_args.kwargs["Key"]["PK"] == "POSTS"
+        batch = local_backend.table.batch_writer.return_value.__enter__.return_value
+        deleted = [c.kwargs["Key"]["PK"] for c in batch.delete_item.call_args_list]
+        assert deleted == [f"USER#{test_user.user_id}", "TAG#a", "TAG#b"]
+
+
+class TestMutationRoundTrips:
+    """Mutations build their response from ReturnValues=ALL_NEW"""
+
+    def test_update_post_is_one_read_and_one_write(self, local_backend, test_user):
+        """No GSI re-query or nickname lookup after update_item"""
+        item = _post_item("p1", test_user.user_id)
+        item["nickname"] = "alice"
+        local_backend.table.query.return_value = {"Items": [item]}
+        local_backend.table.update_item.return_value = {"Attributes": item}
+
+        result = local_backend.update_post("p1", UpdatePostBody(content="edited"), test_user)
+
+        assert local_backend.table.query.call_count == 1
+        local_backend.table.get_item.assert_not_called()
+        local_backend.dynamodb.batch_get_item.assert_not_called()
+        assert result["content"] == "edited"
+        assert result["nickname"] == "alice"
+        assert result["updatedAt"] > item["createdAt"]
+
+    def test_update_profile_is_a_single_write(self, local_backend, test_user):
+        """Profile upsert keeps createdAt and only sets provided fields"""
+        local_backend.table.update_item.return_value = {
+            "Attributes": {
+                "userId": test_user.user_id,
+                "nickname": "bob",
+                "bio": "existing bio",
+                "createdAt": "2025-01-01T00:00:00+00:00",
+                "updatedAt": "2026-01-01T00:00:00+00:00",
+            }
+        }
+
+        profile = local_backend.update_profile(
+            test_user, ProfileUpdateRequest(nickname="bob")
+        )
+
+        local_backend.table.get_item.assert_not_called()
+        local_backend.table.query.assert_not_called()
+        kwargs = local_backend.table.update_item.call_args.kwargs
+        assert "createdAt = if_not_exists(createdAt, :now)" in kwargs["UpdateExpression"]
+        assert ":bio" not in kwargs["ExpressionAttributeValues"]
+        assert profile.nickname == "bob"
+        assert profile.bio == "existing bio"
+        assert profile.created_at == "2025-01-01T00:00:00+00:00"
+
+
+class TestPostHandles:
+    """Mutations addressed by postHandle skip the PostIdIndex lookup"""
+
+    def _handle(self, item: dict) -> str:
+        return encode_post_handle(item)
+
+    def test_update_by_handle_is_a_single_conditional_write(self, local_backend, test_user):
+        """No GSI query; ownership is enforced by the ConditionExpression"""
+        item = _post_item("p1", test_user.user_id)
+        local_backend.table.update_item.return_value = {"Attributes": item}
+
+        result = local_backend.update_post(
+            self._handle(item), UpdatePostBody(content="edited"), test_user
+        )
+
+        local_backend.table.query.assert_not_called()
+        kwargs = local_backend.table.update_item.call_args.kwargs
+        assert kwargs["Key"] == {"PK": "POSTS", "SK": item["SK"]}
+        assert kwargs["ConditionExpression"] == "postId = :condPostId AND userId = :condUserId"
+        assert kwargs["ExpressionAttributeValues"][":condUserId"] == test_user.user_id
+        assert result["postId"] == "p1"
+        assert result["content"] == "edited"
+
+    def test_delete_by_handle_of_another_users_post_is_forbidden(
+        self, local_backend, another_user
+    ):
+        """A failed userId condition with an existing item maps to 403"""
+        item = _post_item("p1", "owner")
+        local_backend.table.delete_item.side_effect = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException"}, "Item": {"PK": {"S": "POSTS"}}},
+            "DeleteItem",
+        )
+
+        with pytest.raises(HTTPException) as exc_info:
+            local_backend.delete_post(self._handle(item), another_user)
+
+        assert exc_info.value.status_code == 403
+        local_backend.table.query.assert_not_called()
+
+    def test_delete_by_handle_of_missing_post_is_not_found(self, local_backend, test_user):
+        """A failed condition without an item maps to 404"""
+        item = _post_item("p1", test_user.user_id)
+        local_backend.table.delete_item.side_effect = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException"}}, "DeleteItem"
+        )
+
+        with pytest.raises(HTTPException) as exc_info:
+            local_backend.delete_post(self._handle(item), test_user)
+
+        assert exc_info.value.status_code == 404
+
+    def test_get_missing_post_returns_none(self, local_backend):
+        """get_post follows the BackendBase contract (None, not 404) for ids and handles"""
+        local_backend.table.query.return_value = {"Items": []}
+        local_backend.table.get_item.return_value = {}
+
+        assert local_backend.get_post("missing") is None
+        assert local_backend.get_post(self._handle(_post_item("p1", "owner"))) is None
+
+    def test_admin_condition_omits_user_id(self, local_backend, admin_user):
+        """Admins may delete any post; only existence is checked"""
+        item = _post_item("p1", "owner")
+        local_backend.table.delete_item.return_value = {"Attributes": item}
+
+        local_backend.delete_post(self._handle(item), admin_user)
+
+        kwargs = local_backend.table.delete_item.call_args.kwargs
+        assert kwargs["ConditionExpression"] == "postId = :condPostId"
+
+    def test_handles_to_non_post_items_are_rejected(self):
+        """Handles must point into a POSTS partition"""
+        assert decode_post_handle(encode_page_token(pk="USER#u1", sk="PROFILE#x")) is None
+        assert decode_post_handle("0b0e7a9c-4a1e-4f7e-9d7e-3f1f1a2b3c4d") is None
+        assert decode_post_handle(encode_page_token(pk="POSTS#3", sk="t#p1")) == (
+            {"PK": "POSTS#3", "SK": "t#p1"}, "p1",
+        )
+
+
+class TestBatchPosts:
+    """create_posts / delete_posts use BatchWriteItem"""
+
+    def test_create_posts_batches_all_writes(self, local_backend, test_user):
+        """One nickname lookup; post, adjacency and tag items in one BatchWriteItem"""
+        local_backend.dynamodb.batch_get_item.return_value = {"Responses": {}}
+        local_backend.dynamodb.batch_write_item.return_value = {}
+        bodies = [CreatePostBody(content="a", tags=["x"]), CreatePostBody(content="b")]
+
+        results = local_backend.create_posts(bodies, test_user)
+
+        assert local_backend.dynamodb.batch_get_item.call_count == 1
+        written = local_backend.dynamodb.batch_write_item.call_args.kwargs["RequestItems"]
+        assert len(written[local_backend.table_name]) == 5
+        assert [r["status"] for r in results] == [201, 201]
+        assert [r["post"]["content"] for r in results] == ["a", "b"]
+
+    def test_delete_posts_removes_adjacency_items(self, local_backend, test_user):
+        """Each deleted post also drops its USER# adjacency item"""
+        item = _post_item("p1", test_user.user_id)
+        local_backend.table.query.return_value = {"Items": [item]}
+        local_backend.dynamodb.batch_write_item.return_value = {}
+
+        results = local_backend.delete_posts(["p1"], test_user)
+
+        written = local_backend.dynamodb.batch_write_item.call_args.kwargs["RequestItems"]
+        keys = [r["DeleteRequest"]["Key"]["PK"] for r in written[local_backend.table_name]]
+        assert keys == ["POSTS", f"USER#{test_user.user_id}"]
+        assert results == [{"index": 0, "postId": "p1", "status": 200}]
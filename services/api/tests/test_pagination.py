@@ -0,0 +1,142 @@
+"""
+Pagination Token Tests
+Covers the opaque keyset tokens and the backends that consume them
+"""
+from unittest.mock import MagicMock, patch
+
+from app.backends.azure_backend import AzureBackend
+from app.backends.gcp_backend import GcpBackend
+from app.backends.pagination import decode_page_token, encode_page_token
+
+
+class TestPageToken:
+    """encode_page_token / decode_page_token"""
+
+    def test_round_trip(self):
+        """A token decodes back to the fields it was built from"""
+        token = encode_page_token(c="2026-01-01T00:00:00+00:00", id="p1")
+
+        assert decode_page_token(token) == {"c": "2026-01-01T00:00:00+00:00", "id": "p1"}
+        assert "=" not in token
+
+    def test_legacy_tokens_are_not_decoded(self):
+        """Numeric offsets, document IDs and DynamoDB SKs are left to legacy paths"""
+        for legacy in ("40", "0b1f6a3e-8f7c-4c1e-9d8e-3b2a1c0d9e8f",
+                       "2026-01-01T00:00:00+00:00#p1", "", None):
+            assert decode_page_token(legacy) is None
+
+
+def _azure_backend(items: list[dict]) -> AzureBackend:
+    backend = object.__new__(AzureBackend)
+    backend.posts_container = MagicMock()
+    backend.posts_container.query_items.return_value = items
+    backend.storage_account = None
+    backend.images_container = "images"
+    return backend
+
+
+def _cosmos_item(i: int) -> dict:
+    return {
+        "id": f"p{i}",
+        "postId": f"p{i}",
+        "userId": "u1",
+        "content": "hello",
+        "createdAt": f"2026-01-01T00:00:{59 - i:02d}+00:00",
+    }
+
+
+class TestAzureKeysetPagination:
+    """AzureBackend.list_posts keyset tokens"""
+
+    def test_next_token_carries_last_sort_key(self):
+        """The next token encodes (createdAt, id) of the last returned item"""
+        backend = _azure_backend([_cosmos_item(i) for i in range(3)])
+
+        posts, token = backend.list_posts(limit=2, next_token=None, tag=None)
+
+        assert [p.id for p in posts] == ["p0", "p1"]
+        assert decode_page_token(token) == {"c": "2026-01-01T00:00:58+00:00", "id": "p1"}
+
+    def test_keyset_token_filters_instead_of_offset(self):
+        """A keyset token becomes a WHERE clause under TOP, without OFFSET"""
+        backend = _azure_backend([])
+        token = encode_page_token(c="2026-01-01T00:00:58+00:00", id="p1")
+
+        backend.list_posts(limit=2, next_token=token, tag="news")
+
+        kwargs = backend.posts_container.query_items.call_args.kwargs
+        params = {p["name"]: p["value"] for p in kwargs["parameters"]}
+        assert "c.createdAt < @createdAt" in kwargs["query"]
+        assert "ARRAY_CONTAINS(c.tags, @tag)" in kwargs["query"]
+        assert kwargs["query"].startswith("SELECT TOP @limit * FROM c")
+        assert kwargs["query"].endswith("ORDER BY c.createdAt DESC, c.id DESC")
+        assert "OFFSET" not in kwargs["query"]
+        assert "@offset" not in params
+        assert params["@createdAt"] == "2026-01-01T00:00:58+00:00"
+        assert params["@id"] == "p1"
+
+    def test_legacy_numeric_token_still_offsets(self):
+        """Numeric tokens keep working and hand out keyset tokens afterwards"""
+        backend = _azure_backend([_cosmos_item(i) for i in range(3)])
+
+        _, token = backend.list_posts(limit=2, next_token="40", tag=None)
+
+        kwargs = backend.posts_container.query_items.call_args.kwargs
+        params = {p["name"]: p["value"] for p in kwargs["parameters"]}
+        assert params["@offset"] == 40
+        assert kwargs["query"].endswith("ORDER BY c.createdAt DESC, c.id DESC OFFSET @offset LIMIT @limit")
+        assert "@createdAt" not in params
+        assert decode_page_token(token) is not None
+
+
+def _firestore_doc(i: int) -> MagicMock:
+    doc = MagicMock()
+    doc.id = f"p{i}"
+    doc.to_dict.return_value = {
+        "postId": f"p{i}",
+        "userId": "u1",
+        "content": "hello",
+        "createdAt": f"2026-01-01T00:00:{59 - i:02d}+00:00",
+    }
+    return doc
+
+
+class TestFirestoreCursorPagination:
+    """GcpBackend.list_posts self-describing cursor tokens"""
+
+    def _backend(self, docs: list) -> GcpBackend:
+        backend = object.__new__(GcpBackend)
+        backend.db = MagicMock()
+        backend.posts_collection = "posts"
+        col = backend.db.collection.return_value
+        query = col.order_by.return_value.order_by.return_value.limit.return_value
+        query.start_after.return_value = query
+        query.where.return_value = query
+        query.stream.return_value = docs
+        return backend
+
+    def test_token_is_passed_to_start_after_without_extra_read(self):
+        """A cursor token feeds start_after directly (no cursor document get)"""
+        backend = self._backend([_firestore_doc(i) for i in range(3)])
+
+        with patch("app.backends.gcp_backend.firestore", create=True):
+            _, token = backend.list_posts(limit=2, next_token=None, tag=None)
+            backend.list_posts(limit=2, next_token=token, tag=None)
+
+        col = backend.db.collection.return_value
+        query = col.order_by.return_value.order_by.return_value.limit.return_value
+        cursor = query.start_after.call_args.args[0]
+        assert cursor["createdAt"] == "2026-01-01T00:00:58+00:00"
+        col.document.assert_called_once_with("p1")
+        col.document.return_value.get.assert_not_called()
+
+    def test_legacy_document_id_token_still_works(self):
+        """A bare document ID token falls back to the snapshot cursor"""
+        backend = self._backend([])
+
+        with patch("app.backends.gcp_backend.firestore", create=True):
+            backend.list_posts(limit=2, next_token="legacy-doc-id", tag=None)
+
+        col = backend.db.collection.return_value
+        col.document.assert_called_once_with("legacy-doc-id")
+        col.document.return_value.get.assert_called_once()
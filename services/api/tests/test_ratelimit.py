@@ -0,0 +1,220 @@
+"""
+Rate Limiter Tests
+GCRA, the pluggable stores and the middleware in app.main
+"""
+import sys
+from unittest.mock import MagicMock, patch
+
+import anyio
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import add_rate_limit_headers
+from app.ratelimit import (
+    Budget,
+    DynamoDBRateLimitStore,
+    MemoryRateLimitStore,
+    RateLimiter,
+    RedisRateLimitStore,
+    gcra,
+    get_rate_limiter,
+    parse_route_budgets,
+)
+
+BUDGET = Budget(limit=3, window_seconds=60)
+
+
+def _conditional_failure(item: dict | None = None) -> ClientError:
+    response = {"Error": {"Code": "ConditionalCheckFailedException"}}
+    if item is not None:
+        response["Item"] = item
+    return ClientError(response, "UpdateItem")
+
+
+class TestGcra:
+    """Generic cell rate algorithm"""
+
+    def test_allows_burst_then_spaces_requests(self):
+        """limit requests pass at once, then one per window/limit seconds"""
+        tat, remaining = None, []
+        for _ in range(3):
+            decision, tat = gcra(tat, 1000.0, BUDGET)
+            assert decision.allowed
+            remaining.append(decision.remaining)
+        denied, unchanged = gcra(tat, 1000.0, BUDGET)
+
+        assert remaining == [2, 1, 0]
+        assert not denied.allowed
+        assert denied.retry_after == pytest.approx(20.0)
+        assert unchanged == tat
+        assert gcra(tat, 1020.0, BUDGET)[0].allowed
+
+    def test_past_tat_behaves_like_new_key(self):
+        """An idle key (TAT in the past) gets the full burst back"""
+        decision, _ = gcra(500.0, 1000.0, BUDGET)
+
+        assert decision == gcra(None, 1000.0, BUDGET)[0]
+
+
+class TestMemoryStore:
+    """In-process store"""
+
+    def test_idle_keys_are_swept(self):
+        """Keys whose TAT has passed are dropped on the next sweep"""
+        store = MemoryRateLimitStore(sweep_interval_seconds=10)
+        store.acquire("a", BUDGET, 0.0)
+        store.acquire("b", BUDGET, 0.0)
+
+        store.acquire("c", BUDGET, 100.0)
+
+        assert len(store) == 1
+
+    def test_max_keys_bounds_memory(self):
+        """The least recently updated key is evicted beyond max_keys"""
+        store = MemoryRateLimitStore(max_keys=2)
+        for key in ("a", "b", "c"):
+            store.acquire(key, BUDGET, 0.0)
+
+        assert len(store) == 2
+
+
+class TestDynamoDBStore:
+    """Conditional-update store"""
+
+    def test_new_key_is_a_single_conditional_write(self):
+        """An unknown or idle key costs one UpdateItem"""
+        table = MagicMock()
+
+        decision = DynamoDBRateLimitStore(table).acquire("ip:1", BUDGET, 1000.0)
+
+        assert decision.allowed and decision.remaining == 2
+        kwargs = table.update_item.call_args.kwargs
+        assert kwargs["Key"] == {"PK": "RATELIMIT#ip:1", "SK": "GCRA"}
+        assert "tat < :now" in kwargs["ConditionExpression"]
+        assert str(kwargs["ExpressionAttributeValues"][":new"]) == "1020.000000"
+
+    def test_active_key_advances_tat_with_compare_and_set(self):
+        """A busy key is advanced conditionally on the TAT it was judged with"""
+        table = MagicMock()
+        table.update_item.side_effect = [
+            _conditional_failure({"tat": {"N": "1020.000000"}}),
+            {},
+        ]
+
+        decision = DynamoDBRateLimitStore(table).acquire("ip:1", BUDGET, 1000.0)
+
+        assert decision.allowed and decision.remaining == 1
+        cas = table.update_item.call_args_list[1].kwargs
+        assert cas["ConditionExpression"] == "tat = :old"
+        assert str(cas["ExpressionAttributeValues"][":new"]) == "1040.000000"
+
+    def test_exhausted_key_is_rejected_without_writing(self):
+        """An exhausted budget is decided from the failed condition's old item"""
+        table = MagicMock()
+        table.update_item.side_effect = [_conditional_failure({"tat": {"N": "1060"}})]
+
+        decision = DynamoDBRateLimitStore(table).acquire("ip:1", BUDGET, 1000.0)
+
+        assert not decision.allowed
+        assert decision.retry_after == pytest.approx(20.0)
+        assert table.update_item.call_count == 1
+
+
+class TestRedisStore:
+    """Redis-protocol store against fakeredis"""
+
+    def test_budget_is_shared_through_redis(self):
+        """Two store instances on the same server share one budget"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        server = fakeredis.FakeServer()
+        first = RedisRateLimitStore(fakeredis.FakeRedis(server=server))
+        second = RedisRateLimitStore(fakeredis.FakeRedis(server=server))
+
+        results = [
+            store.acquire("ip:1", BUDGET, 1000.0).allowed
+            for store in (first, second, first, second)
+        ]
+
+        assert results == [True, True, True, False]
+        ttl_ms = fakeredis.FakeRedis(server=server).pttl("ratelimit:ip:1")
+        assert 0 < ttl_ms <= 60_000
+
+
+class TestRateLimiter:
+    """Budget selection and middleware"""
+
+    def test_route_budgets_use_longest_prefix(self):
+        """Route rules win over the default /api/ budget, longest prefix first"""
+        limiter = RateLimiter(
+            MemoryRateLimitStore(),
+            BUDGET,
+            parse_route_budgets("POST /posts=20/60, * /posts/batch=2/10"),
+        )
+
+        assert limiter.match("POST", "/posts/batch") == ("* /posts/batch", Budget(2, 10.0))
+        assert limiter.match("POST", "/posts") == ("POST /posts", Budget(20, 60.0))
+        assert limiter.match("GET", "/posts") is None
+        assert limiter.match("GET", "/api/messages/") == ("default", BUDGET)
+
+    def test_invalid_route_budget_is_rejected(self):
+        """Malformed RATE_LIMIT_ROUTE_BUDGETS fails at startup"""
+        with pytest.raises(ValueError):
+            parse_route_budgets("POST /posts=twenty/60")
+
+    def test_store_failure_allows_request(self):
+        """A broken store fails open"""
+        store = MagicMock()
+        store.acquire.side_effect = ConnectionError("down")
+        limiter = RateLimiter(store, BUDGET)
+
+        decision = anyio.run(limiter.hit, "ip:1", BUDGET)
+
+        assert decision.allowed
+
+    def test_unbuildable_store_falls_back_to_memory(self):
+        """RATE_LIMIT_STORE=redis without the package still serves requests"""
+        app = FastAPI()
+        app.middleware("http")(add_rate_limit_headers)
+
+        @app.get("/api/ping")
+        def ping():
+            return {"ok": True}
+
+        get_rate_limiter.cache_clear()
+        try:
+            with (
+                patch.dict(sys.modules, {"redis": None}),
+                patch.object(settings, "rate_limit_store", "redis"),
+                patch.object(settings, "rate_limit_redis_url", "redis://localhost:6379/0"),
+            ):
+                limiter = get_rate_limiter()
+                responses = [TestClient(app).get("/api/ping") for _ in range(2)]
+        finally:
+            get_rate_limiter.cache_clear()
+
+        assert isinstance(limiter.store, MemoryRateLimitStore)
+        assert [r.status_code for r in responses] == [200, 200]
+        assert "X-RateLimit-Remaining" in responses[0].headers
+
+    def test_middleware_returns_429_with_headers(self):
+        """The middleware rejects over-budget clients with Retry-After"""
+        app = FastAPI()
+        app.middleware("http")(add_rate_limit_headers)
+
+        @app.get("/api/ping")
+        def ping():
+            return {"ok": True}
+
+        limiter = RateLimiter(MemoryRateLimitStore(), Budget(2, 60))
+        with patch("app.main.get_rate_limiter", return_value=limiter):
+            client = TestClient(app)
+            statuses = [client.get("/api/ping").status_code for _ in range(3)]
+            denied = client.get("/api/ping")
+
+        assert statuses == [200, 200, 429]
+        assert denied.headers["X-RateLimit-Remaining"] == "0"
+        assert int(denied.headers["Retry-After"]) >= 1
@@ -0,0 +1,106 @@
+"""
+Search Index Tests
+Tokenizer, ranking, pagination and incremental updates of the in-process index
+"""
+from app.models import Post
+from app.search_index import SearchIndex, query_terms, tokenize
+
+
+def _post(post_id: str, content: str, tags=None, created_at="2026-01-01T00:00:00Z", handle=None) -> Post:
+    return Post(
+        postId=post_id, userId="u1", content=content, tags=tags,
+        createdAt=created_at, postHandle=handle,
+    )
+
+
+class TestTokenize:
+    """NFKC + lower-case, words for Latin, bigrams for CJK"""
+
+    def test_latin_words_and_cjk_bigrams(self):
+        assert tokenize("Hello ＡＷＳ 東京タワー!") == ["hello", "aws", "東京", "京タ", "タワ", "ワー"]
+
+    def test_single_cjk_character_is_kept(self):
+        assert tokenize("猫 と 犬") == ["猫", "と", "犬"]
+
+    def test_query_terms_keep_hash_tags(self):
+        assert query_terms("#Travel 京都 京都") == ["#travel", "京都"]
+
+
+class TestSearchIndex:
+    """AND matching, BM25 ranking and incremental updates"""
+
+    def _index(self) -> SearchIndex:
+        index = SearchIndex()
+        index.add_many([
+            _post("p1", "今日は東京タワーに行った", created_at="2026-01-01T00:00:00Z"),
+            _post("p2", "東京の天気は晴れ", tags=["東京"], created_at="2026-01-02T00:00:00Z"),
+            _post("p3", "大阪で食べ歩き", tags=["travel"], created_at="2026-01-03T00:00:00Z"),
+            _post("p4", "Tokyo trip with friends", created_at="2026-01-04T00:00:00Z"),
+        ])
+        return index
+
+    def test_matches_every_query_term(self):
+        index = self._index()
+
+        post_ids, total = index.search("東京 タワー", limit=10)
+
+        assert post_ids == ["p1"]
+        assert total == 1
+
+    def test_tag_match_ranks_first(self):
+        post_ids, _ = self._index().search("東京", limit=10)
+
+        assert post_ids == ["p2", "p1"]
+
+    def test_single_character_and_tag_queries(self):
+        index = self._index()
+
+        assert set(index.search("京", limit=10)[0]) == {"p1", "p2"}
+        assert index.search("#TRAVEL", limit=10)[0] == ["p3"]
+        assert index.search("trip", limit=10, tag="travel")[0] == []
+        assert index.search("TOKYO", limit=10)[0] == ["p4"]
+
+    def test_pagination_is_stable(self):
+        index = SearchIndex()
+        index.add_many(
+            _post(f"p{n}", "同じ内容の投稿", created_at=f"2026-01-{n + 1:02d}T00:00:00Z")
+            for n in range(5)
+        )
+
+        first, total = index.search("投稿", limit=2)
+        second, _ = index.search("投稿", limit=2, offset=2)
+
+        assert total == 5
+        # 同点は新しい順
+        assert first + second == ["p4", "p3", "p2", "p1"]
+
+    def test_update_and_delete_are_incremental(self):
+        index = self._index()
+        index.add(_post("p1", "京都に行った", handle="h1"))
+        assert index.search("東京", limit=10)[0] == ["p2"]
+        assert index.search("京都", limit=10)[0] == ["p1"]
+
+        assert index.remove("h1") is True
+        assert index.search("京都", limit=10) == ([], 0)
+        assert len(index) == 3
+
+    def test_compaction_keeps_results(self):
+        """Renumbering drops dead postings and keeps ranks, handles and 1-char lookups"""
+        index = SearchIndex()
+        for n in range(3000):
+            index.add(_post(f"p{n}", f"投稿 {n}", created_at=f"2026-01-01T00:{n // 60:02d}:{n % 60:02d}Z", handle=f"h{n}"))
+        index.add(_post("gone", "猫の写真"))
+        index.remove("gone")
+        for n in range(2500):
+            index.remove(f"p{n}")
+
+        post_ids, total = index.search("2999", limit=10)
+
+        assert post_ids == ["p2999"]
+        assert total == 1
+        assert len(index) == 500
+        assert index.search("投", limit=2) == (["p2999", "p2998"], 500)
+        assert index.search("猫", limit=10) == ([], 0)
+        assert "猫" not in index._terms_by_char
+        assert index.remove("h2999") is True
+        assert index.search("2999", limit=10) == ([], 0)
@@ -0,0 +1,84 @@
+"""
+SignedUrlCache Unit Tests
+"""
+from unittest.mock import MagicMock, patch
+
+from app.backends.signed_url_cache import SignedUrlCache
+
+
+def _signer():
+    sign = MagicMock(side_effect=lambda key: f"https://signed/{key}?sig={sign.call_count}")
+    return sign
+
+
+class TestSignedUrlCache:
+    """TTL + LRU behaviour of the signed URL cache"""
+
+    def test_hit_returns_same_url_without_resigning(self):
+        """Repeated lookups return the identical URL and count hits"""
+        cache = SignedUrlCache(3600, 900, 100)
+        sign = _signer()
+
+        first = cache.get_or_sign("a.jpg", sign)
+        second = cache.get_or_sign("a.jpg", sign)
+
+        assert first == second
+        assert sign.call_count == 1
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_entry_expires_refresh_margin_before_url(self):
+        """Entries are re-signed once url_expiry - refresh_margin has elapsed"""
+        cache = SignedUrlCache(3600, 900, 100)
+        sign = _signer()
+
+        with patch("app.backends.signed_url_cache.time.monotonic", return_value=1000.0):
+            cache.get_or_sign("a.jpg", sign)
+        with patch("app.backends.signed_url_cache.time.monotonic", return_value=1000.0 + 2699):
+            cache.get_or_sign("a.jpg", sign)
+        assert sign.call_count == 1
+        with patch("app.backends.signed_url_cache.time.monotonic", return_value=1000.0 + 2700):
+            cache.get_or_sign("a.jpg", sign)
+        assert sign.call_count == 2
+
+    def test_max_entries_evicts_least_recently_used(self):
+        """The least recently used key is dropped when the bound is exceeded"""
+        cache = SignedUrlCache(3600, 900, 2)
+        sign = _signer()
+
+        cache.get_or_sign("a", sign)
+        cache.get_or_sign("b", sign)
+        cache.get_or_sign("a", sign)
+        cache.get_or_sign("c", sign)
+
+        assert len(cache) == 2
+        cache.get_or_sign("a", sign)
+        cache.get_or_sign("b", sign)
+        assert sign.call_count == 4
+
+    def test_margin_larger_than_expiry_disables_caching(self):
+        """A refresh margin >= URL expiry never serves cached URLs"""
+        cache = SignedUrlCache(300, 900, 100)
+        sign = _signer()
+
+        cache.get_or_sign("a", sign)
+        cache.get_or_sign("a", sign)
+
+        assert sign.call_count == 2
+        assert len(cache) == 0
+
+    def test_full_cache_drops_expired_entries_before_lru(self):
+        """At capacity, expired entries are purged before live LRU entries"""
+        cache = SignedUrlCache(3600, 900, 2)
+        sign = _signer()
+
+        with patch("app.backends.signed_url_cache.time.monotonic", return_value=0.0):
+            cache.get_or_sign("a", sign)
+        with patch("app.backends.signed_url_cache.time.monotonic", return_value=2000.0):
+            cache.get_or_sign("b", sign)
+            cache.get_or_sign("a", sign)  # "a" becomes most recently used
+        with patch("app.backends.signed_url_cache.time.monotonic", return_value=3000.0):
+            cache.get_or_sign("c", sign)  # "a" has expired, "b" is the LRU entry
+            cache.get_or_sign("b", sign)
+
+        assert sign.call_count == 3
+        assert cache.stats() == {"hits": 2, "misses": 3, "size": 2}
@@ -0,0 +1,46 @@
+"""
+Startup Profile Tests
+Parsing and subsystem aggregation of -X importtime output
+"""
+from app.startup_profile import aggregate, parse_importtime, subsystem_of
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       800 |       2500 |     botocore.session
+import time:      1700 |       1700 |       botocore.loaders
+import time:       300 |       3000 |   boto3
+import time:       450 |        450 |   app.config
+Some unrelated stderr line
+"""
+
+
+class TestStartupProfile:
+    """python -m app.startup_profile helpers"""
+
+    def test_parse_importtime(self):
+        """Header and foreign lines are skipped, depth follows indentation"""
+        records = parse_importtime(SAMPLE)
+
+        assert [r.module for r in records] == [
+            "_io", "botocore.session", "botocore.loaders", "boto3", "app.config",
+        ]
+        assert records[1].self_us == 800
+        assert records[1].cumulative_us == 2500
+        assert [r.depth for r in records] == [1, 2, 3, 1, 1]
+
+    def test_subsystem_of(self):
+        """Top-level package decides the subsystem"""
+        assert subsystem_of("botocore.loaders") == "aws-sdk"
+        assert subsystem_of("aws_lambda_powertools.metrics") == "powertools"
+        assert subsystem_of("google.cloud.firestore") == "gcp-sdk"
+        assert subsystem_of("jose.jwk") == "auth"
+        assert subsystem_of("app.routes.posts") == "app"
+        assert subsystem_of("json.decoder") == "stdlib"
+        assert subsystem_of("somevendor") == "other"
+
+    def test_aggregate_sums_self_time(self):
+        """Cumulative time is not double counted"""
+        totals = aggregate(parse_importtime(SAMPLE))
+
+        assert totals == {"stdlib": 120, "aws-sdk": 2800, "app": 450}
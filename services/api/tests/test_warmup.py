@@ -0,0 +1,91 @@
+"""
+Warm-up Tests
+Concurrent cold-start initialisation of JWKS, backend and SDK clients
+"""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from app.warmup import run_warmup
+
+
+def _patch(verifier, backend_factory):
+    return (
+        patch("app.auth.get_jwt_verifier", return_value=verifier),
+        patch("app.backends.get_backend", side_effect=backend_factory),
+    )
+
+
+class TestRunWarmup:
+    """run_warmup reports a per-component breakdown"""
+
+    def test_warms_all_components(self):
+        """JWKS is fetched, the backend is built and warm_up() is called"""
+        verifier = MagicMock()
+        backend = MagicMock()
+        p1, p2 = _patch(verifier, lambda: backend)
+        with p1, p2:
+            report = run_warmup(timeout_seconds=5)
+
+        verifier.get_jwks.assert_called_once_with()
+        backend.warm_up.assert_called_once_with()
+        for name in ("jwks", "backend", "sdk_clients", "total"):
+            assert report[name]["status"] == "ok"
+            assert report[name]["ms"] >= 0
+
+    def test_jwks_and_backend_run_concurrently(self):
+        """Both branches are in flight at the same time"""
+        barrier = threading.Barrier(2, timeout=2)
+        verifier = MagicMock()
+        verifier.get_jwks.side_effect = lambda: barrier.wait()
+        backend = MagicMock()
+
+        def build_backend():
+            barrier.wait()
+            return backend
+
+        p1, p2 = _patch(verifier, build_backend)
+        with p1, p2:
+            report = run_warmup(timeout_seconds=5)
+
+        assert report["jwks"]["status"] == "ok"
+        assert report["backend"]["status"] == "ok"
+
+    def test_failures_are_reported_not_raised(self):
+        """A failing component does not abort start-up"""
+        verifier = MagicMock()
+        verifier.get_jwks.side_effect = RuntimeError("jwks down")
+        p1, p2 = _patch(verifier, MagicMock(side_effect=ValueError("no table")))
+        with p1, p2:
+            report = run_warmup(timeout_seconds=5)
+
+        assert report["jwks"]["status"] == "error"
+        assert "jwks down" in report["jwks"]["error"]
+        assert report["backend"]["status"] == "error"
+        assert report["sdk_clients"]["status"] == "skipped"
+
+    def test_auth_disabled_skips_jwks(self):
+        """No verifier configured -> jwks is skipped"""
+        p1, p2 = _patch(None, MagicMock)
+        with p1, p2:
+            report = run_warmup(timeout_seconds=5)
+
+        assert report["jwks"]["status"] == "skipped"
+
+    def test_timeout_does_not_block_startup(self):
+        """Slow components are reported as timeout after timeout_seconds"""
+        release = threading.Event()
+        verifier = MagicMock()
+        verifier.get_jwks.side_effect = lambda: release.wait(5)
+        p1, p2 = _patch(verifier, MagicMock)
+        try:
+            with p1, p2:
+                started = time.perf_counter()
+                report = run_warmup(timeout_seconds=0.1)
+                elapsed = time.perf_counter() - started
+        finally:
+            release.set()
+
+        assert elapsed < 1
+        assert report["jwks"] == {"status": "timeout", "ms": None}
+        assert report["backend"]["status"] == "ok"
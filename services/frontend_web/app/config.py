@@ -38,6 +38,21 @@ class Settings(BaseSettings):
 
     oidc_scope: str = "openid email profile"
 
+    # Outbound HTTP (API / storage) — app/http_client.py の共有セッション
+    http_pool_hosts: int = 4
+    http_pool_maxsize: int = 32
+    http_connect_timeout_seconds: float = 3.05
+    api_timeout_seconds: float = 20.0
+    storage_timeout_seconds: float = 30.0
+    http_retries: int = 2
+    http_retry_backoff_seconds: float = 0.2
+    # /storage/* の中継先 (ローカル開発の MinIO)
+    storage_proxy_url: str = "http://minio:9000"
+    # 投稿作成時の画像アップロードの同時実行数
+    upload_concurrency: int = 16
+    # 投稿作成後の再描画に使う先頭ページのキャッシュ期間 (0 で無効)
+    timeline_cache_ttl_seconds: float = 30.0
+
     model_config = {
         "env_file": ".env",
         "env_ignore_empty": True,
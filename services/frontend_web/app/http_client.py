@@ -0,0 +1,114 @@
+"""API / ストレージ呼び出し用の HTTP クライアント
+
+モジュール関数の ``requests.get`` などは呼び出しごとに新しいセッションを作り、
+毎回 TCP (+TLS) ハンドシェイクをやり直す。同期ルートでは 1 プロセス 1 つの
+``requests.Session`` を共有し、ホストごとのコネクションプールで keep-alive する。
+
+async ルート (投稿作成の画像アップロードなど) はイベントループを塞がないよう
+``async_http_client()`` の ``httpx.AsyncClient`` を使う。リクエストごとに閉じない
+ストリーミング中継 (storage_proxy) は ``shared_async_http_client()`` を共有し、
+終了時に ``close_shared_async_http_client()`` で閉じる。
+"""
+
+import asyncio
+from functools import lru_cache
+from http.cookiejar import DefaultCookiePolicy
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.config import get_settings
+
+
+@lru_cache
+def get_http_session() -> requests.Session:
+    """プロセス共有の requests.Session (スレッド間で共有するのはコネクションプールだけ)
+
+    requests.Session 自体はスレッドセーフを保証しないため、セッションの headers /
+    cookies / auth は変更しない。ユーザーごとの値 (Authorization など) は各リクエストの
+    引数で渡す。
+    """
+    settings = get_settings()
+    session = requests.Session()
+    # セッションはユーザー間で共有するため、レスポンスの Cookie を保持しない
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    retry = Retry(
+        total=settings.http_retries,
+        connect=settings.http_retries,
+        read=settings.http_retries,
+        status=settings.http_retries,
+        backoff_factor=settings.http_retry_backoff_seconds,
+        status_forcelist=(502, 503, 504),
+        # 冪等なメソッドのみ再試行する (POST は二重投稿になりうる)
+        allowed_methods=frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.http_pool_hosts,
+        pool_maxsize=settings.http_pool_maxsize,
+        max_retries=retry,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def api_timeout() -> tuple[float, float]:
+    """API 呼び出しの (接続, 読み取り) タイムアウト"""
+    settings = get_settings()
+    return settings.http_connect_timeout_seconds, settings.api_timeout_seconds
+
+
+def storage_timeout() -> tuple[float, float]:
+    """ストレージ (署名付き URL / MinIO) 呼び出しの (接続, 読み取り) タイムアウト"""
+    settings = get_settings()
+    return settings.http_connect_timeout_seconds, settings.storage_timeout_seconds
+
+
+def async_http_client() -> httpx.AsyncClient:
+    """async ルート用のクライアント (async with で 1 リクエストの間だけ使う)
+
+    AsyncClient は作成したイベントループに紐づく (共有は shared_async_http_client() 経由)。
+    接続エラーのみ再試行する (httpx のトランスポートはステータスでは再試行しない)。
+    """
+    settings = get_settings()
+    limits = httpx.Limits(
+        max_connections=settings.http_pool_maxsize,
+        max_keepalive_connections=settings.http_pool_maxsize,
+    )
+    return httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(limits=limits, retries=settings.http_retries),
+        timeout=httpx.Timeout(
+            settings.api_timeout_seconds, connect=settings.http_connect_timeout_seconds
+        ),
+    )
+
+
+_shared_async_client: httpx.AsyncClient | None = None
+_shared_async_loop: asyncio.AbstractEventLoop | None = None
+
+
+def shared_async_http_client() -> httpx.AsyncClient:
+    """プロセス共有の httpx.AsyncClient (ストレージへのコネクションを keep-alive で再利用する)
+
+    実行中のイベントループで遅延作成し、ループが変わったとき (Lambda の再初期化など) は
+    作り直す。閉じるのはアプリ終了時の close_shared_async_http_client() のみ。
+    """
+    global _shared_async_client, _shared_async_loop
+    loop = asyncio.get_running_loop()
+    client = _shared_async_client
+    if client is None or client.is_closed or _shared_async_loop is not loop:
+        client = _shared_async_client = async_http_client()
+        _shared_async_loop = loop
+    return client
+
+
+async def close_shared_async_http_client() -> None:
+    """共有 AsyncClient を閉じる (lifespan の終了時に呼ぶ)"""
+    global _shared_async_client, _shared_async_loop
+    client, _shared_async_client, _shared_async_loop = _shared_async_client, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
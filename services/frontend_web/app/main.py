@@ -1,10 +1,13 @@
 import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.config import Settings
+from app.http_client import close_shared_async_http_client
 from app.routers import auth, views
 
 # Azure Functions / Lambda では CWD が保証されないため __file__ 基準で解決
@@ -16,10 +19,18 @@ _APP_DIR = os.path.dirname(os.path.abspath(__file__))
 _stage = Settings().stage_name
 prefix = f"/{_stage}" if _stage else ""
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # storage_proxy の共有 AsyncClient (コネクションプール) を閉じる
+    await close_shared_async_http_client()
+
+
 # NOTE: root_path は設定しない。GCP/AWS/Azure のロードバランサーは
 # /sns/* を Cloud Run/Lambda に転送する際にパスをストリップしないため、
 # root_path を設定するとStarlette 0.50+ がパスを二重にストリップして404になる。
-app = FastAPI(title="Simple SNS Web")
+app = FastAPI(title="Simple SNS Web", lifespan=lifespan)
 
 
 class COOPMiddleware(BaseHTTPMiddleware):
@@ -32,8 +43,21 @@ class COOPMiddleware(BaseHTTPMiddleware):
         return response
 
 
+class _GZipExceptStorage(GZipMiddleware):
+    """storage_proxy のストリーミング応答は圧縮しない
+
+    画像は圧縮が効かず、圧縮すると Content-Length が外れて Range (206) の応答が壊れる。
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(f"{prefix}/storage/"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 app.add_middleware(COOPMiddleware)
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+app.add_middleware(_GZipExceptStorage, minimum_size=1000)
 
 _static_path = f"{prefix}/static" if prefix else "/static"
 app.mount(_static_path, StaticFiles(
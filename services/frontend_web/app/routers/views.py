@@ -1,13 +1,30 @@
 from typing import Any
+import asyncio
 import os
 
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import RedirectResponse, Response as _Response
+from fastapi.responses import RedirectResponse, Response as _Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
+import httpx
 import requests
 
 from app.config import Settings, get_settings
+from app.http_client import (
+    api_timeout,
+    async_http_client,
+    get_http_session,
+    shared_async_http_client,
+    storage_timeout,
+)
 from app.routers.auth import _template_context, _get_auth_urls
+from app.timeline_cache import (
+    TIMELINE_PAGE_SIZE,
+    cached_timeline,
+    forget_post,
+    remember_timeline,
+    timeline_with_created,
+)
 
 router = APIRouter()
 _TEMPLATES_DIR = os.path.join(os.path.dirname(
@@ -38,7 +55,8 @@ def _fetch_json_with_headers(
     url: str, params: dict[str, Any] | None, headers: dict[str, str]
 ) -> Any:
     try:
-        res = requests.get(url, params=params, headers=headers, timeout=20)
+        res = get_http_session().get(
+            url, params=params, headers=headers, timeout=api_timeout())
         res.raise_for_status()
     except requests.RequestException as exc:
         raise HTTPException(status_code=502, detail=str(exc)) from exc
@@ -50,8 +68,8 @@ def _post_json_with_headers(
     method: str = "POST",
 ) -> Any:
     try:
-        res = requests.request(method, url, json=payload,
-                               headers=headers, timeout=20)
+        res = get_http_session().request(
+            method, url, json=payload, headers=headers, timeout=api_timeout())
         if not res.ok:
             detail = res.text or res.reason or "Request failed"
             raise HTTPException(
@@ -69,12 +87,12 @@ def home(request: Request, settings: Settings = Depends(get_settings)):
     posts = []
     success = None
     tag_filter = request.query_params.get("tag")
-    search_keyword = request.query_params.get("q")
+    search_keyword = (request.query_params.get("q") or "").strip() or None
 
     api_url = f"{settings.clean_api_base_url}/posts"
 
     try:
-        params: dict[str, Any] = {"limit": 20}
+        params: dict[str, Any] = {"limit": TIMELINE_PAGE_SIZE}
         if tag_filter:
             params["tag"] = tag_filter
 
@@ -85,17 +103,16 @@ def home(request: Request, settings: Settings = Depends(get_settings)):
         # So it is public.
 
         headers = {}
-        data = _fetch_json_with_headers(api_url, params, headers)
-        posts = data.get("items", [])
-
         if search_keyword:
-            needle = search_keyword.strip().lower()
-            if needle:
-                posts = [
-                    item
-                    for item in posts
-                    if str(item.get("content") or "").lower().find(needle) >= 0
-                ]
+            # 全投稿を対象にした API 側の全文検索 (関連度順)
+            params["q"] = search_keyword
+            data = _fetch_json_with_headers(f"{api_url}/search", params, headers)
+            posts = data.get("items", [])
+        else:
+            data = _fetch_json_with_headers(api_url, params, headers)
+            posts = data.get("items", [])
+            if not tag_filter:
+                remember_timeline(posts)
     except HTTPException as exc:
         error = exc.detail
 
@@ -113,6 +130,74 @@ def home(request: Request, settings: Settings = Depends(get_settings)):
     )
 
 
+async def _post_json_async(
+    client: httpx.AsyncClient, url: str, payload: dict[str, Any], headers: dict[str, str],
+) -> Any:
+    """_post_json_with_headers の async 版"""
+    try:
+        res = await client.post(url, json=payload, headers=headers)
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=str(exc) or repr(exc)) from exc
+    if not res.is_success:
+        detail = res.text or res.reason_phrase or "Request failed"
+        raise HTTPException(
+            status_code=502,
+            detail=f"{res.status_code} {res.reason_phrase}: {detail}",
+        )
+    return res.json()
+
+
+async def _upload_images(
+    client: httpx.AsyncClient,
+    files: list[Any],
+    upload_urls: list[dict[str, Any]],
+    concurrency: int,
+) -> tuple[list[str], list[str]]:
+    """署名付き URL へ画像を並行アップロードする (同時実行数は concurrency まで)
+
+    Returns:
+        (成功したキー (files の順), 失敗したファイルごとのエラーメッセージ)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    timeout = httpx.Timeout(storage_timeout()[1], connect=storage_timeout()[0])
+
+    async def upload(upload_file: Any, upload_info: dict[str, Any]) -> str:
+        url = upload_info.get("url")
+        key = upload_info.get("key")
+        try:
+            if not url or not key:
+                raise ValueError("Upload URL missing")
+            async with semaphore:
+                content_bytes = await upload_file.read()
+                put_res = await client.put(
+                    url,
+                    content=content_bytes,
+                    headers={"Content-Type": getattr(upload_file, "content_type", "")},
+                    timeout=timeout,
+                )
+                put_res.raise_for_status()
+        finally:
+            await upload_file.close()
+        return key
+
+    results = await asyncio.gather(
+        *(upload(f, info) for f, info in zip(files, upload_urls, strict=True)),
+        return_exceptions=True,
+    )
+    keys: list[str] = []
+    failures: list[str] = []
+    for upload_file, result in zip(files, results, strict=True):
+        if isinstance(result, BaseException):
+            if isinstance(result, httpx.HTTPStatusError):
+                reason = f"{result.response.status_code} {result.response.reason_phrase}"
+            else:
+                reason = str(result) or type(result).__name__
+            failures.append(f"{upload_file.filename}: {reason}")
+        else:
+            keys.append(result)
+    return keys, failures
+
+
 @router.post("/posts", name="post_create")
 async def post_create(request: Request, settings: Settings = Depends(get_settings)):
     error = None
@@ -133,85 +218,80 @@ async def post_create(request: Request, settings: Settings = Depends(get_setting
     }
 
     headers = _auth_header(request, settings)
-    if not headers and not settings.auth_disabled:
-        error = "Authentication required"
-    elif not content:
-        error = "Content is required"
-    elif len(files) > 16:
-        error = "Too many images (max 16)"
-    else:
-        tags = [tag for tag in raw_tags.split() if tag]
-        payload: dict[str, Any] = {"content": content}
-        if tags:
-            payload["tags"] = tags
-        if image_keys:
-            payload["imageKeys"] = [key for key in image_keys if key]
-        try:
-            if files and not image_keys:
-                content_types = []
-                for upload in files:
-                    content_type = getattr(upload, "content_type", "")
-                    if content_type not in allowed_content_types:
+    async with async_http_client() as client:
+        if not headers and not settings.auth_disabled:
+            error = "Authentication required"
+        elif not content:
+            error = "Content is required"
+        elif len(files) > 16:
+            error = "Too many images (max 16)"
+        else:
+            tags = [tag for tag in raw_tags.split() if tag]
+            payload: dict[str, Any] = {"content": content}
+            if tags:
+                payload["tags"] = tags
+            if image_keys:
+                payload["imageKeys"] = [key for key in image_keys if key]
+            try:
+                if files and not image_keys:
+                    content_types = []
+                    for upload in files:
+                        content_type = getattr(upload, "content_type", "")
+                        if content_type not in allowed_content_types:
+                            raise HTTPException(
+                                status_code=400,
+                                detail="Only JPEG/PNG/HEIC/HEIF images are supported",
+                            )
+                        content_types.append(content_type)
+
+                    upload_res = await _post_json_async(
+                        client,
+                        f"{settings.clean_api_base_url}/uploads/presigned-urls",
+                        {"count": len(files), "contentTypes": content_types},
+                        headers,
+                    )
+                    upload_urls = upload_res.get("urls") or []
+                    if len(upload_urls) != len(files):
                         raise HTTPException(
-                            status_code=400,
-                            detail="Only JPEG/PNG/HEIC/HEIF images are supported",
+                            status_code=502,
+                            detail="Upload URL count mismatch",
                         )
-                    content_types.append(content_type)
 
-                upload_res = _post_json_with_headers(
-                    f"{settings.clean_api_base_url}/uploads/presigned-urls",
-                    {"count": len(files), "contentTypes": content_types},
-                    headers,
-                )
-                upload_urls = upload_res.get("urls") or []
-                if len(upload_urls) != len(files):
-                    raise HTTPException(
-                        status_code=502,
-                        detail="Upload URL count mismatch",
+                    image_keys_new, failures = await _upload_images(
+                        client, files, upload_urls, settings.upload_concurrency
                     )
-
-                image_keys_new: list[str] = []
-                for upload_file, upload_info in zip(files, upload_urls):
-                    url = upload_info.get("url")
-                    key = upload_info.get("key")
-                    if not url or not key:
+                    if failures:
+                        # 一部でも失敗したら投稿は作らない (画像が欠けた投稿になるため)
                         raise HTTPException(
                             status_code=502,
-                            detail="Upload URL missing",
+                            detail=f"Failed to upload {len(failures)} of {len(files)} "
+                            f"images: " + "; ".join(failures),
                         )
-                    content_bytes = await upload_file.read()
-                    content_type = getattr(upload_file, "content_type", "")
-                    try:
-                        put_res = requests.put(
-                            url,
-                            data=content_bytes,
-                            headers={"Content-Type": content_type},
-                            timeout=30,
-                        )
-                        put_res.raise_for_status()
-                    finally:
-                        await upload_file.close()
-                    image_keys_new.append(key)
-
-                payload["imageKeys"] = image_keys_new
 
-            _post_json_with_headers(
-                f"{settings.clean_api_base_url}/posts", payload, headers)
-            success = "Post created"
-        except HTTPException as exc:
-            error = exc.detail
-        except requests.RequestException as exc:
-            error = str(exc)
-
-    try:
-        # Fetch posts again to update view
-        headers_fetch = {}
-        data = _fetch_json_with_headers(
-            f"{settings.clean_api_base_url}/posts", {"limit": 20}, headers_fetch)
-        posts = data.get("items", [])
-    except HTTPException as exc:
-        if not error:
-            error = exc.detail
+                    payload["imageKeys"] = image_keys_new
+
+                created = await _post_json_async(
+                    client, f"{settings.clean_api_base_url}/posts", payload, headers)
+                success = "Post created"
+            except HTTPException as exc:
+                error = exc.detail
+
+        # 作成した投稿をキャッシュ済みの先頭ページに差し込んで描画する (再取得しない)
+        cached = timeline_with_created(created) if success else cached_timeline()
+        if cached is not None:
+            posts = cached
+        else:
+            try:
+                # Fetch posts again to update view
+                res = await client.get(
+                    f"{settings.clean_api_base_url}/posts",
+                    params={"limit": TIMELINE_PAGE_SIZE})
+                res.raise_for_status()
+                posts = res.json().get("items", [])
+                remember_timeline(posts)
+            except httpx.HTTPError as exc:
+                if not error:
+                    error = str(exc) or repr(exc)
 
     return templates.TemplateResponse(
         "home.html",
@@ -250,10 +330,10 @@ def post_delete(post_id: str, request: Request, settings: Settings = Depends(get
             raise HTTPException(
                 status_code=401, detail="Authentication required")
 
-        delete_res = requests.delete(
+        delete_res = get_http_session().delete(
             f"{settings.clean_api_base_url}/posts/{post_id}",
             headers=headers,
-            timeout=10,
+            timeout=api_timeout(),
         )
 
         if not delete_res.ok:
@@ -264,6 +344,7 @@ def post_delete(post_id: str, request: Request, settings: Settings = Depends(get
                 detail=detail,
             )
 
+        forget_post(post_id)
         return delete_res.json()
     except requests.RequestException as exc:
         raise HTTPException(status_code=502, detail=str(exc))
@@ -356,30 +437,71 @@ async def uploads(request: Request, settings: Settings = Depends(get_settings)):
     return data
 
 
+# 転送しない hop-by-hop ヘッダー (RFC 9110 7.6.1) と Host
+_HOP_BY_HOP_HEADERS = frozenset({
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade", "host",
+})
+
+
+class _UpstreamStreamingResponse(StreamingResponse):
+    """中継先の応答本文をそのまま流し、送信の完了・切断・失敗のいずれでも閉じる
+
+    閉じるとコネクションが共有クライアントのプールに戻る。BackgroundTask は
+    送信が例外で終わると実行されず、コネクションがプールに残り続けるため使わない。
+    """
+
+    def __init__(self, upstream: httpx.Response, headers: dict[str, str]):
+        super().__init__(upstream.aiter_raw(), status_code=upstream.status_code, headers=headers)
+        self.upstream = upstream
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.upstream.aclose()
+
+
 @router.api_route("/storage/{path:path}", methods=["GET", "PUT", "HEAD"])
 async def storage_proxy(path: str, request: Request):
-    """MinIO リバースプロキシ（ローカル開発用：ブラウザからのストレージアクセスを中継）"""
-    body = await request.body()
+    """MinIO リバースプロキシ（ローカル開発用：ブラウザからのストレージアクセスを中継）
+
+    本文はリクエスト・レスポンスともチャンク単位で中継し、オブジェクト全体を
+    メモリに載せない。Range / If-None-Match などのヘッダーはそのまま転送し、
+    206 / 304 もそのまま返す。
+    """
+    settings = get_settings()
     headers = {
         k: v for k, v in request.headers.items()
-        if k.lower() not in ("host", "content-length")
+        if k.lower() not in _HOP_BY_HOP_HEADERS
     }
+    # Content-Length があればそのまま転送 (S3/MinIO の PUT は長さ必須)。
+    # 無ければ chunked で中継する
+    has_body = request.method == "PUT"
+    client = shared_async_http_client()
     try:
-        resp = requests.request(
-            method=request.method,
-            url=f"http://minio:9000/{path}",
-            params=dict(request.query_params),
-            headers=headers,
-            data=body,
-            timeout=30,
+        upstream = await client.send(
+            client.build_request(
+                request.method,
+                f"{settings.storage_proxy_url.rstrip('/')}/{path}",
+                params=request.query_params.multi_items(),
+                headers=headers,
+                content=request.stream() if has_body else None,
+                timeout=httpx.Timeout(storage_timeout()[1], connect=storage_timeout()[0]),
+            ),
+            stream=True,
         )
-    except requests.RequestException as exc:
-        raise HTTPException(status_code=502, detail=str(exc)) from exc
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=str(exc) or repr(exc)) from exc
+
+    # aiter_raw は content-encoding を解かないため、Content-Length / Content-Encoding も保持する
+    # Date / Server は uvicorn が付けるので重複させない
     resp_headers = {
-        k: v for k, v in resp.headers.items()
-        if k.lower() not in ("transfer-encoding", "connection", "content-encoding")
+        k: v for k, v in upstream.headers.items()
+        if k.lower() not in _HOP_BY_HOP_HEADERS | {"date", "server"}
     }
-    return _Response(content=resp.content, status_code=resp.status_code, headers=resp_headers)
+    return _UpstreamStreamingResponse(upstream, headers=resp_headers)
 
 
 @router.get("/{path:path}", name="catch_all", include_in_schema=False)
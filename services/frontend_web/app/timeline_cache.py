@@ -0,0 +1,69 @@
+"""最新タイムライン (タグなしの先頭ページ) の短命キャッシュ
+
+ホーム画面の描画で取得した先頭ページをプロセス内に保持し、投稿作成後は
+API が返した作成済み投稿をその先頭に差し込んで描画する。これで書き込み 1 回あたりの
+API 呼び出しは POST /posts の 1 回になる (以前は再描画用に GET /posts も呼んでいた)。
+
+キャッシュはホーム画面の取得のたびに更新され、TIMELINE_CACHE_TTL_SECONDS を
+過ぎたもの、または未取得のときは従来どおり GET /posts にフォールバックする。
+"""
+
+import threading
+import time
+from typing import Any
+
+from app.config import get_settings
+
+TIMELINE_PAGE_SIZE = 20
+
+_lock = threading.Lock()
+_page: list[dict[str, Any]] | None = None
+_stored_at = 0.0
+
+
+def remember_timeline(posts: list[dict[str, Any]]) -> None:
+    """GET /posts?limit=20 (タグなし) の結果を保持する"""
+    global _page, _stored_at
+    with _lock:
+        _page = list(posts[:TIMELINE_PAGE_SIZE])
+        _stored_at = time.monotonic()
+
+
+def cached_timeline() -> list[dict[str, Any]] | None:
+    """TTL 内のキャッシュ済み先頭ページ (無ければ None)"""
+    ttl = get_settings().timeline_cache_ttl_seconds
+    with _lock:
+        if _page is None or time.monotonic() - _stored_at > ttl:
+            return None
+        return list(_page)
+
+
+def timeline_with_created(post: dict[str, Any]) -> list[dict[str, Any]] | None:
+    """作成済み投稿を先頭に差し込んだページを返し、キャッシュも更新する
+
+    キャッシュが無い・期限切れのときは None (呼び出し側で GET /posts する)。
+    """
+    global _page
+    page = cached_timeline()
+    if page is None or not post.get("postId"):
+        return None
+    merged = [post, *(item for item in page if item.get("postId") != post["postId"])]
+    merged = merged[:TIMELINE_PAGE_SIZE]
+    with _lock:
+        # 取得時刻は更新しない (API からの再取得を TTL より先延ばしにしない)
+        _page = list(merged)
+    return merged
+
+
+def forget_post(post_id: str) -> None:
+    """削除された投稿をキャッシュから除く (次の差し込みで復活させない)"""
+    global _page
+    with _lock:
+        if _page is not None:
+            _page = [item for item in _page if item.get("postId") != post_id]
+
+
+def clear_timeline() -> None:
+    global _page
+    with _lock:
+        _page = None
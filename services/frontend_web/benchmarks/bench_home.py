@@ -0,0 +1,125 @@
+"""Home page (GET /) latency: one connection per API call vs the shared pooled session
+
+Renders GET / through the ASGI app against a stub API on 127.0.0.1 that
+serves GET /posts (HTTP/1.1 keep-alive). Every new connection to the stub
+sleeps --connect-delay-ms before it is served, standing in for the TCP + TLS
+handshake to a remote api_base_url.
+
+- per-call: views call the module-level requests functions (the previous
+            behaviour), i.e. a fresh connection per API call.
+- pooled:   views use app.http_client.get_http_session().
+
+    python -m benchmarks.bench_home [--requests 200] [--connect-delay-ms 30] [--posts 20]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import requests
+
+
+class _StubAPI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b"{}"
+    connect_delay = 0.0
+    connections = 0
+    _lock = threading.Lock()
+
+    def setup(self) -> None:
+        super().setup()
+        # uvicorn と同様にヘッダーと本文の分割送信で Nagle 遅延が出ないようにする
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            type(self).connections += 1
+        time.sleep(self.connect_delay)
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def _posts_body(count: int) -> bytes:
+    items = [
+        {
+            "postId": f"p{n}",
+            "userId": "bench",
+            "nickname": "bench",
+            "content": f"bench post {n} #bench",
+            "tags": ["bench"],
+            "imageUrls": [],
+            "createdAt": "2026-01-01T00:00:00Z",
+        }
+        for n in range(count)
+    ]
+    return json.dumps({"items": items, "limit": count, "nextToken": None}).encode()
+
+
+def _measure(client, count: int) -> tuple[list[float], float]:
+    client.get("/")  # テンプレートのコンパイルなど初回コストを除く
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        response = client.get("/")
+        latencies.append((time.perf_counter() - t0) * 1000)
+        assert response.status_code == 200 and "bench post 0" in response.text
+    return latencies, time.perf_counter() - started
+
+
+def run(count: int, connect_delay_ms: float, posts: int) -> None:
+    _StubAPI.body = _posts_body(posts)
+    _StubAPI.connect_delay = connect_delay_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubAPI)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ["API_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["AUTH_DISABLED"] = "true"
+    from fastapi.testclient import TestClient
+
+    from app.config import get_settings
+    from app.http_client import get_http_session
+    from app.main import app
+
+    get_settings.cache_clear()
+    get_http_session.cache_clear()
+
+    print(f"requests={count} connect delay={connect_delay_ms}ms posts/page={posts}")
+    print(f"{'mode':<9} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'req/s':>7} {'conns':>6}")
+    modes = (("per-call", lambda: requests), ("pooled", get_http_session))
+    try:
+        for mode, session in modes:
+            _StubAPI.connections = 0
+            with patch("app.routers.views.get_http_session", session), TestClient(app) as client:
+                latencies, elapsed = _measure(client, count)
+            latencies.sort()
+            print(
+                f"{mode:<9} {statistics.median(latencies):>8.2f} "
+                f"{latencies[int(len(latencies) * 0.95) - 1]:>8.2f} "
+                f"{statistics.fmean(latencies):>8.2f} {count / elapsed:>7.0f} "
+                f"{_StubAPI.connections:>6}"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--connect-delay-ms", type=float, default=30.0)
+    parser.add_argument("--posts", type=int, default=20)
+    args = parser.parse_args()
+    run(args.requests, args.connect_delay_ms, args.posts)
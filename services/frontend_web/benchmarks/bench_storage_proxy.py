@@ -0,0 +1,233 @@
+"""/storage/* proxy: peak server memory for large objects, buffered vs streaming
+
+Runs the frontend under uvicorn in a subprocess with STORAGE_PROXY_URL pointing
+at a stub object store in this process (GET with Range / If-None-Match, PUT).
+It downloads and uploads one object of each size through /storage/ and reports
+how far the server's peak RSS (VmHWM) rose above its idle RSS, then times a
+burst of small Range GETs and counts the connections opened to the store.
+
+- buffered:  the previous storage_proxy, reproduced below (await request.body(),
+             requests.request, resp.content).
+- streaming: app.routers.views.storage_proxy.
+
+    python -m benchmarks.bench_storage_proxy [--sizes-mb 16,64] [--small-gets 200]
+"""
+
+import argparse
+import io
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
+
+CHUNK = 64 * 1024
+ETAG = '"bench-etag"'
+
+# --- buffered: 改修前の storage_proxy -------------------------------------------
+legacy_app = FastAPI()
+
+
+@legacy_app.api_route("/storage/{path:path}", methods=["GET", "PUT", "HEAD"])
+async def legacy_storage_proxy(path: str, request: Request):
+    body = await request.body()
+    headers = {
+        k: v for k, v in request.headers.items()
+        if k.lower() not in ("host", "content-length")
+    }
+    try:
+        # 改修前どおりイベントループ上でブロックする呼び出し
+        resp = requests.request(  # noqa: ASYNC210
+            method=request.method,
+            url=f"{os.environ['STORAGE_PROXY_URL']}/{path}",
+            params=dict(request.query_params),
+            headers=headers,
+            data=body,
+            timeout=30,
+        )
+    except requests.RequestException as exc:
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
+    resp_headers = {
+        k: v for k, v in resp.headers.items()
+        if k.lower() not in ("transfer-encoding", "connection", "content-encoding")
+    }
+    return Response(content=resp.content, status_code=resp.status_code, headers=resp_headers)
+
+
+# --- stub object store -----------------------------------------------------------
+class _Store(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    size = 0
+    connections = 0
+    _lock = threading.Lock()
+
+    def setup(self) -> None:
+        super().setup()
+        # keep-alive でヘッダーと本文を分けて送るため Nagle 遅延を避ける
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            type(self).connections += 1
+
+    def do_GET(self) -> None:
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start, end = 0, self.size - 1
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{self.size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "image/heic")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        remaining = end - start + 1
+        chunk = bytes(CHUNK)
+        while remaining:
+            n = min(remaining, CHUNK)
+            self.wfile.write(chunk[:n])
+            remaining -= n
+
+    def do_PUT(self) -> None:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                n = int(self.rfile.readline().split(b";")[0], 16)
+                self.rfile.read(n + 2)
+                if n == 0:
+                    break
+        else:
+            remaining = int(self.headers.get("Content-Length") or 0)
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, CHUNK)))
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_mb(pid: int, field: str) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} not found")
+
+
+def _serve(app_path: str, port: int, env: dict[str, str]) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/storage/warmup", headers={"Range": "bytes=0-0"}, timeout=1)
+            return proc
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{app_path} did not start")
+
+
+def _check_conditional(base: str) -> str:
+    ranged = requests.get(f"{base}/obj", headers={"Range": "bytes=10-19"}, timeout=30)
+    cached = requests.get(f"{base}/obj", headers={"If-None-Match": ETAG}, timeout=30)
+    ok = ranged.status_code == 206 and len(ranged.content) == 10 and cached.status_code == 304
+    return "ok" if ok else f"range={ranged.status_code} inm={cached.status_code}"
+
+
+def _small_gets(base: str, count: int) -> tuple[float, int]:
+    """小さな Range GET を count 回: (1 回あたり ms, 中継先への新規接続数)"""
+    connections = _Store.connections
+    with requests.Session() as session:
+        started = time.perf_counter()
+        for _ in range(count):
+            res = session.get(f"{base}/obj", headers={"Range": "bytes=0-1023"}, timeout=30)
+            assert res.status_code == 206, res.status_code
+        elapsed = time.perf_counter() - started
+    return elapsed / count * 1000, _Store.connections - connections
+
+
+def run(sizes_mb: list[int], small_gets: int) -> None:
+    store = ThreadingHTTPServer(("127.0.0.1", 0), _Store)
+    store.daemon_threads = True
+    threading.Thread(target=store.serve_forever, daemon=True).start()
+    env = {
+        **os.environ,
+        "STORAGE_PROXY_URL": f"http://127.0.0.1:{store.server_port}",
+        "API_BASE_URL": "http://127.0.0.1:9",
+    }
+
+    print(f"{'mode':<10} {'MB':>4} {'idle MB':>8} {'GET +MB':>8} {'PUT +MB':>8} {'GET s':>6} {'PUT s':>6}  range/304")
+    modes = (("buffered", "benchmarks.bench_storage_proxy:legacy_app"), ("streaming", "app.main:app"))
+    try:
+        for size_mb in sizes_mb:
+            _Store.size = size_mb * 1024 * 1024
+            payload = bytes(_Store.size)
+            for mode, app_path in modes:
+                port = _free_port()
+                proc = _serve(app_path, port, env)
+                base = f"http://127.0.0.1:{port}/storage"
+                try:
+                    idle = _rss_mb(proc.pid, "VmRSS")
+                    started = time.perf_counter()
+                    with requests.get(f"{base}/obj", stream=True, timeout=60) as res:
+                        received = sum(len(c) for c in res.iter_content(CHUNK))
+                    get_s = time.perf_counter() - started
+                    assert received == _Store.size, received
+                    get_peak = _rss_mb(proc.pid, "VmHWM")
+                    started = time.perf_counter()
+                    res = requests.put(f"{base}/obj", data=io.BytesIO(payload), timeout=60)
+                    put_s = time.perf_counter() - started
+                    assert res.status_code == 200, res.status_code
+                    put_peak = _rss_mb(proc.pid, "VmHWM")
+                    print(
+                        f"{mode:<10} {size_mb:>4} {idle:>8.1f} {get_peak - idle:>8.1f} "
+                        f"{put_peak - idle:>8.1f} {get_s:>6.2f} {put_s:>6.2f}  {_check_conditional(base)}"
+                    )
+                finally:
+                    proc.terminate()
+                    proc.wait()
+
+        print(f"\n{small_gets} x 1 KiB Range GET\n{'mode':<10} {'ms/req':>7} {'upstream conns':>15}")
+        _Store.size = CHUNK
+        for mode, app_path in modes:
+            proc = _serve(app_path, port := _free_port(), env)
+            try:
+                per_request_ms, connections = _small_gets(f"http://127.0.0.1:{port}/storage", small_gets)
+                print(f"{mode:<10} {per_request_ms:>7.2f} {connections:>15}")
+            finally:
+                proc.terminate()
+                proc.wait()
+    finally:
+        store.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-mb", default="16,64")
+    parser.add_argument("--small-gets", type=int, default=200)
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes_mb.split(",")], args.small_gets)
@@ -0,0 +1,114 @@
+"""POST /posts with images: sequential vs concurrent presigned uploads
+
+Submits the post form with --images files through the ASGI app against a
+stub on 127.0.0.1 that plays both the API (presigned URLs, POST / GET /posts)
+and the storage. Each PUT sleeps --put-ms, every fourth one --slow-put-ms.
+
+- concurrency=1: one upload at a time, the previous behaviour (sum of uploads).
+- concurrency=N: UPLOAD_CONCURRENCY; a post should take about its slowest
+                 upload when N >= images.
+
+    python -m benchmarks.bench_uploads [--images 16] [--put-ms 50] [--slow-put-ms 150] [--rounds 5]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    put_delay = 0.0
+    slow_put_delay = 0.0
+
+    def setup(self) -> None:
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_POST(self) -> None:
+        payload = json.loads(self._read_body() or b"{}")
+        if self.path == "/uploads/presigned-urls":
+            base = f"http://127.0.0.1:{self.server.server_port}/storage"
+            urls = [
+                {"url": f"{base}/{n}.jpg", "key": f"bench/{n}.jpg"}
+                for n in range(payload["count"])
+            ]
+            self._json(200, {"urls": urls})
+        else:
+            self._json(201, {"postId": "p1", **payload})
+
+    def do_PUT(self) -> None:
+        self._read_body()
+        index = int(self.path.rsplit("/", 1)[-1].split(".")[0])
+        time.sleep(self.slow_put_delay if index % 4 == 3 else self.put_delay)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        self._json(200, {"items": [], "limit": 20, "nextToken": None})
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def run(images: int, put_ms: float, slow_put_ms: float, rounds: int) -> None:
+    _Stub.put_delay = put_ms / 1000
+    _Stub.slow_put_delay = slow_put_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ["API_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["AUTH_DISABLED"] = "true"
+    from fastapi.testclient import TestClient
+
+    from app.config import get_settings
+    from app.main import app
+
+    get_settings.cache_clear()
+    settings = get_settings()
+    files = [("images", (f"{n}.jpg", b"\xff\xd8" + bytes(64 * 1024), "image/jpeg")) for n in range(images)]
+
+    print(f"images={images} put={put_ms}ms slow put={slow_put_ms}ms rounds={rounds}")
+    print(f"{'concurrency':>11} {'median ms':>10} {'min ms':>8}")
+    try:
+        with TestClient(app, cookies={"local_user": "bench"}) as client:
+            for concurrency in sorted({1, min(4, images), settings.upload_concurrency, images}):
+                timings = []
+                with patch.object(settings, "upload_concurrency", concurrency):
+                    for _ in range(rounds):
+                        started = time.perf_counter()
+                        response = client.post("/posts", data={"content": "bench"}, files=files)
+                        timings.append((time.perf_counter() - started) * 1000)
+                        assert "Post created" in response.text, response.text[:500]
+                print(f"{concurrency:>11} {statistics.median(timings):>10.1f} {min(timings):>8.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--put-ms", type=float, default=50.0)
+    parser.add_argument("--slow-put-ms", type=float, default=150.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    run(args.images, args.put_ms, args.slow_put_ms, args.rounds)